@@ -20,6 +20,8 @@ from flask import Flask, render_template, request, redirect, url_for
 from flask_cors import CORS
 from flask_restx import Api, Namespace, Resource
 from urllib.parse import unquote
+from unfurl import lookup_cache
+from unfurl import result_cache
 from unfurl.core import run
 
 unfurl_app_host = None
@@ -30,7 +32,8 @@ CORS(app)
 
 
 class UnfurlApp:
-    def __init__(self, unfurl_debug=False, unfurl_host='localhost', unfurl_port=5000, remote_lookups=False):
+    def __init__(self, unfurl_debug=False, unfurl_host='localhost', unfurl_port=5000, remote_lookups=False,
+                 cached_results=None, cached_lookups=None):
         self.unfurl_debug = unfurl_debug
         self.unfurl_host = unfurl_host
         self.unfurl_port = unfurl_port
@@ -44,6 +47,8 @@ class UnfurlApp:
         unfurl_remote_lookups = self.remote_lookups
 
         app.config['remote_lookups'] = remote_lookups
+        app.config['result_cache'] = cached_results
+        app.config['lookup_cache'] = cached_lookups
         app.run(debug=unfurl_debug, host=unfurl_host, port=unfurl_port)
 
 
@@ -93,13 +98,17 @@ class JsonVisJS(Resource):
             unfurl_this,
             return_type='json',
             remote_lookups=app.config['remote_lookups'],
-            extra_options={'widthConstraint': {'maximum': 1200}})
+            extra_options={'widthConstraint': {'maximum': 1200}},
+            result_cache=app.config.get('result_cache'),
+            lookup_cache=app.config.get('lookup_cache'))
 
 
 def web_app(host='localhost', port='5000', debug='True', remote_lookups=False):
 
     config = configparser.ConfigParser()
     config.read('unfurl.ini')
+    cached_results = None
+    cached_lookups = None
 
     if config.has_section('UNFURL_APP'):
         host = config['UNFURL_APP'].get('host')
@@ -110,9 +119,21 @@ def web_app(host='localhost', port='5000', debug='True', remote_lookups=False):
         # If we can't interpret it as a boolean, fail "safe" to not allowing lookups
         except ValueError:
             remote_lookups = False
+        try:
+            if config['UNFURL_APP'].getboolean('result_cache'):
+                cached_results = result_cache.get_result_cache(config['UNFURL_APP'].get('result_cache_path') or None)
+        except ValueError:
+            cached_results = None
+        try:
+            if config['UNFURL_APP'].getboolean('lookup_cache'):
+                cached_lookups = lookup_cache.get_lookup_cache(config['UNFURL_APP'].get('lookup_cache_path') or None)
+        except ValueError:
+            cached_lookups = None
 
     UnfurlApp(
         unfurl_debug=debug,
         unfurl_host=host,
         unfurl_port=port,
-        remote_lookups=remote_lookups)
+        remote_lookups=remote_lookups,
+        cached_results=cached_results,
+        cached_lookups=cached_lookups)
@@ -0,0 +1,322 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+
+from unfurl import core
+from unfurl import dispatch
+from unfurl import known_domains
+
+log = logging.getLogger(__name__)
+
+# How many items to send to a worker process at a time
+DEFAULT_CHUNK_SIZE = 64
+
+# How many distinct items (and their results) deduplicate() remembers
+DEFAULT_DEDUPE_CACHE_SIZE = 10_000
+
+# How many items deduplicate() reads ahead of the results it has yielded
+DEFAULT_READ_AHEAD = 10_000
+
+_PENDING = object()
+_ITEM = object()
+_RESULT = object()
+_ERROR = object()
+_END = object()
+
+# The Unfurl instance (and how to output its results) in a worker process; set by _init_worker()
+_worker = {}
+
+# A result, with how long it can be saved in a result cache (see with_result_ttl())
+ResultWithTTL = collections.namedtuple('ResultWithTTL', ['result', 'ttl'])
+
+
+class _Waiting(list):
+    # The entries waiting on the result of an item that deduplicate() is unfurling
+    pass
+
+
+def unfurl_one(unfurl_instance, item, data_type, output):
+    """Unfurl item with unfurl_instance, then reset it for the next item. Returns output(unfurl_instance).
+
+    item is the value to unfurl, or a (value, data_type) tuple to unfurl it as something other than data_type.
+    """
+    value = item
+    if isinstance(item, tuple):
+        value, data_type = item
+    unfurl_instance.add_to_queue(data_type=data_type, key=None, value=value)
+    unfurl_instance.parse_queue()
+    result = output(unfurl_instance)
+    unfurl_instance.reset_graph_state()
+    return result
+
+
+def with_result_ttl(unfurl_instance, output):
+    """ResultWithTTL(output(unfurl_instance), unfurl_instance.result_ttl()). Use it (in a functools.partial) as
+    the output of the unfurl_items given to deduplicate() with a result_cache, so results that are missing
+    remote lookups aren't saved, and the rest are only kept as long as their lookups would be."""
+    return ResultWithTTL(output(unfurl_instance), unfurl_instance.result_ttl())
+
+
+def unfurl_serially(unfurl_instance, items, data_type, output):
+    """Unfurl items one at a time with unfurl_instance, yielding (item, output(unfurl_instance)) for each."""
+    for item in items:
+        yield item, unfurl_one(unfurl_instance, item, data_type, output)
+
+
+def _init_worker(unfurl_options, data_type, output):
+    # If the pool was forked, these were loaded before the fork and are already here
+    known_domains.get_known_domains()
+    dispatch.get_parser_dispatch()
+
+    _worker['unfurl'] = core.Unfurl(**unfurl_options)
+    _worker['data_type'] = data_type
+    _worker['output'] = output
+
+
+def _unfurl_chunk(chunk):
+    return [(item, unfurl_one(_worker['unfurl'], item, _worker['data_type'], _worker['output'])) for item in chunk]
+
+
+def _chunks(items, chunk_size):
+    items = iter(items)
+    while chunk := list(itertools.islice(items, chunk_size)):
+        yield chunk
+
+
+def unfurl_in_parallel(items, output, jobs, data_type='url', unfurl_options=None, ordered=True,
+                       chunk_size=DEFAULT_CHUNK_SIZE):
+    """Unfurl items in jobs worker processes, yielding (item, output(unfurl_instance)) for each.
+
+    Each item is the value to unfurl, or a (value, data_type) tuple (see unfurl_one()).
+
+    Each worker keeps one Unfurl instance (made with unfurl_options) for all the items it's sent. output must
+    be picklable (a module-level function or class method, or a functools.partial of one), as it's sent to the workers.
+
+    Items are read from the items iterable only as fast as the workers get through them, so it can be a
+    stream of any length. Results are yielded in the same order as items, unless ordered is False; then
+    they're yielded as soon as they're done, which keeps all the workers busy when some items are slow.
+    """
+    # Load the known domains and parsers before starting the workers, so forked workers share them
+    known_domains.get_known_domains()
+    dispatch.get_parser_dispatch()
+
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    max_in_flight = jobs * 4
+    with context.Pool(jobs, _init_worker, (unfurl_options or {}, data_type, output)) as pool:
+        if ordered:
+            in_flight = collections.deque()
+            for chunk in _chunks(items, chunk_size):
+                in_flight.append(pool.apply_async(_unfurl_chunk, (chunk,)))
+                if len(in_flight) >= max_in_flight:
+                    yield from in_flight.popleft().get()
+            while in_flight:
+                yield from in_flight.popleft().get()
+
+        else:
+            done = queue.SimpleQueue()
+            in_flight = 0
+            for chunk in _chunks(items, chunk_size):
+                pool.apply_async(_unfurl_chunk, (chunk,), callback=done.put, error_callback=done.put)
+                in_flight += 1
+                if in_flight >= max_in_flight:
+                    yield from _get_done(done)
+                    in_flight -= 1
+            while in_flight:
+                yield from _get_done(done)
+                in_flight -= 1
+
+
+def _get_done(done):
+    results = done.get()
+    if isinstance(results, BaseException):
+        raise results
+    return results
+
+
+def deduplicate(items, unfurl_items, cache_size=DEFAULT_DEDUPE_CACHE_SIZE, ordered=True, counts=None,
+                result_cache=None, read_ahead=DEFAULT_READ_AHEAD):
+    """Unfurl each distinct item only once, yielding (item, result) for every item (duplicates included).
+
+    unfurl_items is a function that takes an iterable of items and yields (item, result) for each, like
+    unfurl_serially() or unfurl_in_parallel() (with the other arguments filled in with functools.partial).
+    Only items that aren't a duplicate of one of the last cache_size distinct items (or, if cache_size is 0,
+    of one being unfurled) are passed on to it; the rest get the same result as the earlier item (the same
+    object, not a copy).
+
+    If result_cache is given (like a ResultCache.for_options()), items are looked up there before they're
+    unfurled, and new results are saved to it. If unfurl_items yields a ResultWithTTL (see with_result_ttl()),
+    the result is saved for that long (and not at all if it's 0); the result alone is yielded.
+
+    Results are yielded in the same order as items, unless ordered is False. Each is yielded as soon as it's
+    known (and, if ordered, everything before it has been yielded), so a run of duplicates streams straight
+    through rather than waiting on the next distinct item. Items are read in a background thread, at most
+    read_ahead of them ahead of what's been yielded (unless unfurl_items needs more to get going, like
+    unfurl_in_parallel() filling a chunk). If counts (a Counter) is given, it's updated with how many items
+    were 'unfurled', how many were 'duplicates', and how many were found in the result_cache ('cached').
+    """
+    counts = collections.Counter() if counts is None else counts
+    # Each distinct item recently read, and its result (or the _Waiting entries, if it's still being unfurled)
+    cache = collections.OrderedDict()
+    # The _Waiting entries for each time an item is being unfurled, oldest first
+    in_flight = collections.defaultdict(collections.deque)
+    # Each item not yielded yet is an [item, result] list, with the result _PENDING until it's known
+    waiting = collections.deque()
+    ready = collections.deque()
+
+    # Items are read, and unfurled, in their own threads; what they do comes back through events
+    events = queue.SimpleQueue()
+    to_unfurl = queue.SimpleQueue()
+    condition = threading.Condition()
+    state = {'read_ahead': 0, 'held': 0, 'starving': False, 'stopped': False}
+
+    def can_read():
+        # Past read_ahead, only read more if unfurl_items is holding items and waiting on more before going on
+        return state['stopped'] or state['read_ahead'] < read_ahead or (state['starving'] and state['held'])
+
+    def read_items():
+        try:
+            items_left = iter(items)
+            while True:
+                # Wait before reading the next item, not after, so nothing is read early
+                with condition:
+                    condition.wait_for(can_read)
+                    if state['stopped']:
+                        return
+                    state['read_ahead'] += 1
+                item = next(items_left, _END)
+                if item is _END:
+                    break
+                events.put((_ITEM, item))
+            events.put((_END, None))
+        except BaseException as e:
+            events.put((_ERROR, e))
+
+    def distinct_items():
+        while True:
+            with condition:
+                state['starving'] = True
+                condition.notify_all()
+            item = to_unfurl.get()
+            with condition:
+                state['starving'] = False
+            if item is _END:
+                return
+            with condition:
+                state['held'] += 1
+            yield item
+
+    def unfurl_distinct_items():
+        try:
+            for item, result in unfurl_items(distinct_items()):
+                with condition:
+                    state['held'] -= 1
+                events.put((_RESULT, (item, result)))
+            events.put((_END, None))
+        except BaseException as e:
+            events.put((_ERROR, e))
+
+    def remember(item, result):
+        if cache_size:
+            cache[item] = result
+            if len(cache) > cache_size:
+                cache.popitem(last=False)
+
+    def add_item(item):
+        entry = [item, _PENDING]
+        if item in cache or (not cache_size and item in in_flight):
+            counts['duplicates'] += 1
+            if item in cache:
+                cache.move_to_end(item)
+                result = cache[item]
+            else:
+                result = in_flight[item][-1]
+            if isinstance(result, _Waiting):
+                result.append(entry)
+            else:
+                entry[1] = result
+        else:
+            cached_result = result_cache.get(item) if result_cache is not None else None
+            if cached_result is not None:
+                entry[1] = cached_result
+                counts['cached'] += 1
+                remember(item, cached_result)
+            else:
+                entries = _Waiting([entry])
+                in_flight[item].append(entries)
+                remember(item, entries)
+                counts['unfurled'] += 1
+                to_unfurl.put(item)
+
+        if ordered:
+            waiting.append(entry)
+        elif entry[1] is not _PENDING:
+            ready.append(entry)
+
+    def add_result(item, result):
+        ttl = None
+        if isinstance(result, ResultWithTTL):
+            result, ttl = result
+        entries = in_flight[item].popleft()
+        if not in_flight[item]:
+            del in_flight[item]
+        if cache.get(item) is entries:
+            cache[item] = result
+        if result_cache is not None and ttl != 0:
+            result_cache.put(item, result, ttl=ttl)
+        for entry in entries:
+            entry[1] = result
+            if not ordered:
+                ready.append(entry)
+
+    def done_items():
+        done = 0
+        while waiting and waiting[0][1] is not _PENDING:
+            yield tuple(waiting.popleft())
+            done += 1
+        while ready:
+            yield tuple(ready.popleft())
+            done += 1
+        if done:
+            with condition:
+                state['read_ahead'] -= done
+                condition.notify_all()
+
+    threading.Thread(target=read_items, name='unfurl-dedupe-reader', daemon=True).start()
+    threading.Thread(target=unfurl_distinct_items, name='unfurl-dedupe-unfurler', daemon=True).start()
+    try:
+        ended = 0
+        while ended < 2:
+            event, value = events.get()
+            if event is _ITEM:
+                add_item(value)
+            elif event is _RESULT:
+                add_result(*value)
+            elif event is _ERROR:
+                raise value
+            else:
+                ended += 1
+                # Once every item has been read, unfurl_items can finish with the ones it has
+                to_unfurl.put(_END)
+            yield from done_items()
+    finally:
+        with condition:
+            state['stopped'] = True
+            condition.notify_all()
+        to_unfurl.put(_END)
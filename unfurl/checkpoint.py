@@ -0,0 +1,136 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import json
+import logging
+import os
+import time
+
+log = logging.getLogger(__name__)
+
+# Save a checkpoint after this many items have been written, or this many seconds, whichever comes first
+DEFAULT_CHECKPOINT_EVERY = 1000
+DEFAULT_CHECKPOINT_SECONDS = 30
+
+
+class CheckpointError(ValueError):
+    """The checkpoint can't be used to resume (it's missing, or from a different input, output or options)."""
+
+
+class Checkpoint:
+    """Progress through a batch that reads lines from input_path and writes a result for each to output_path.
+
+    The checkpoint is saved next to the output (as output_path + '.checkpoint'), and records how far into the
+    input (in bytes) the results written so far go, how many items that is, and how big the output was then.
+    It is only saved after the output has been flushed to disk, so everything it counts has been written.
+
+    To resume, load() the checkpoint, truncate the output back to output_offset (dropping anything written
+    after the checkpoint was saved), and read_lines() from input_offset. Each input line then ends up in
+    the output exactly once, however the earlier run was stopped.
+    """
+
+    def __init__(self, output_path, input_path, options=None, every=DEFAULT_CHECKPOINT_EVERY,
+                 seconds=DEFAULT_CHECKPOINT_SECONDS):
+        self.path = f'{output_path}.checkpoint'
+        self.output_path = output_path
+        self.input_path = os.path.abspath(input_path)
+        # Anything that changes the output; a checkpoint saved with other options can't be resumed
+        self.options = options or {}
+        self.every = every
+        self.seconds = seconds
+
+        self.input_offset = 0
+        self.output_offset = 0
+        self.items_done = 0
+
+        # The input offset after each line that has been read, but not written yet
+        self._pending_offsets = collections.deque()
+        self._items_since_save = 0
+        self._last_save = time.monotonic()
+
+    def load(self) -> None:
+        """Load the saved checkpoint. Raises CheckpointError if there isn't one, or it doesn't match this batch."""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            raise CheckpointError(f'no checkpoint to resume from ({self.path} not found)')
+        except ValueError as e:
+            raise CheckpointError(f'checkpoint {self.path} could not be read: {e}')
+
+        if state.get('input_path') != self.input_path:
+            raise CheckpointError(f'checkpoint {self.path} is for a different input ({state.get("input_path")})')
+        if state.get('options') != json.loads(json.dumps(self.options)):
+            raise CheckpointError(f'checkpoint {self.path} was saved with different options: {state.get("options")}')
+        if os.path.getsize(self.input_path) < state['input_offset']:
+            raise CheckpointError(f'{self.input_path} is shorter than when checkpoint {self.path} was saved')
+        if not os.path.isfile(self.output_path) or os.path.getsize(self.output_path) < state['output_offset']:
+            raise CheckpointError(f'{self.output_path} is shorter than when checkpoint {self.path} was saved')
+
+        self.input_offset = state['input_offset']
+        self.output_offset = state['output_offset']
+        self.items_done = state['items_done']
+
+    def read_lines(self):
+        """Yield each line of the input (without trailing whitespace), starting from input_offset."""
+        offset = self.input_offset
+        with open(self.input_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                offset += len(line)
+                self._pending_offsets.append(offset)
+                yield line.decode('utf-8', errors='ignore').rstrip()
+
+    def item_written(self) -> bool:
+        """Count the result for the next line read as written (results must be written in input order).
+
+        Returns True when it's time to save() the checkpoint.
+        """
+        self.input_offset = self._pending_offsets.popleft()
+        self.items_done += 1
+        self._items_since_save += 1
+        return self._items_since_save >= self.every or time.monotonic() - self._last_save >= self.seconds
+
+    def save(self, output_file) -> None:
+        """Save the checkpoint. output_file is the open output; anything buffered for it must be flushed first."""
+        output_file.flush()
+        os.fsync(output_file.fileno())
+        self.output_offset = os.fstat(output_file.fileno()).st_size
+
+        state = {
+            'input_path': self.input_path,
+            'input_offset': self.input_offset,
+            'output_offset': self.output_offset,
+            'items_done': self.items_done,
+            'options': self.options,
+        }
+        # Write a new file and replace the old one with it, so there is always one whole checkpoint on disk
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+        self._items_since_save = 0
+        self._last_save = time.monotonic()
+        log.debug(f'Saved checkpoint after {self.items_done:,} items to {self.path}')
+
+    def remove(self) -> None:
+        """Delete the checkpoint (once the whole batch is done)."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
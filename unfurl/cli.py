@@ -15,12 +15,76 @@
 # limitations under the License.
 
 import argparse
+import collections
+import contextlib
 import csv
+import functools
 import os
+import sys
+import unfurl
+from unfurl import batch
+from unfurl import checkpoint as checkpoints
 from unfurl import core
+from unfurl import csv_columns
+from unfurl import hash_lookups
+from unfurl import http_client
+from unfurl import jsonl
+from unfurl import lookup_cache
+from unfurl import lookups
+from unfurl import result_cache
+from unfurl import known_domains
+
+
+def snapshot_command(arguments):
+    parser = argparse.ArgumentParser(
+        prog='unfurl snapshot',
+        description='compile the known domain lists (MISP warning lists) and the Public Suffix List into a '
+                    'snapshot file. unfurl memory-maps the snapshot instead of loading the lists at startup, '
+                    'which makes starting up much faster. rebuild the snapshot after upgrading unfurl or its '
+                    'dependencies (an outdated snapshot is ignored).')
+    parser.add_argument(
+        '-o', '--output', default=known_domains.default_snapshot_path(),
+        help='file to write the snapshot to. unfurl only uses a snapshot from the default location '
+             '(or the location in the UNFURL_DOMAIN_SNAPSHOT environment variable). '
+             f'default: {known_domains.default_snapshot_path()}')
+    args = parser.parse_args(arguments)
+
+    snapshot_path = known_domains.compile_snapshot(args.output)
+    print(f'Wrote domain snapshot to {snapshot_path}')
+
+
+def iter_items_to_unfurl(what_to_unfurl):
+    """Yield each item to unfurl: the lines of a file (or stdin, if what_to_unfurl is '-'), or what_to_unfurl itself.
+
+    Lines are read one at a time as they're needed, so input of any size can be unfurled.
+    """
+    if what_to_unfurl == '-':
+        sys.stdin.reconfigure(errors='ignore')
+        for input_url in sys.stdin:
+            yield input_url.rstrip()
+
+    elif os.path.isfile(what_to_unfurl):
+        with open(what_to_unfurl, errors='ignore') as f:
+            for input_url in f:
+                yield input_url.rstrip()
+
+    else:
+        yield what_to_unfurl
+
+
+def output_unfurled(unfurl_instance, output_type, detailed=False, output_filter=None):
+    if output_type == 'jsonl':
+        return unfurl_instance.generate_compact_json()
+    elif output_type == 'json':
+        return unfurl_instance.generate_full_json()
+    return unfurl_instance.generate_text_tree(detailed=detailed, output_filter=output_filter)
 
 
 def command_line_interface():
+    if sys.argv[1:2] == ['snapshot']:
+        snapshot_command(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
         description='unfurl takes a URL and expands ("unfurls") it into a directed graph, extracting every '
                     'bit of information from the URL and exposing the obscured.')
@@ -28,67 +92,267 @@ def command_line_interface():
         'what_to_unfurl',
         help='what to unfurl. typically this is a URL, but it also supports integers (timestamps), '
              'encoded protobufs, and more. if this is instead a file path, unfurl will open '
-             'that file and process each line in it as a URL.')
+             'that file and process each line in it as a URL. use - to read lines from stdin.')
     parser.add_argument(
         '-d', '--detailed', help='show more detailed explanations.', action='store_true')
     parser.add_argument(
         '-f', '--filter', help='only output lines that match this filter.')
     parser.add_argument(
         '-l', '--lookups', help='allow remote lookups to enhance results.', action='store_true')
+    parser.add_argument(
+        '--lookup-wait', type=float, default=lookups.DEFAULT_MAX_WAIT, metavar='SECONDS',
+        help='with -l, remote lookups run in the background while the rest is unfurled. once there is nothing else '
+             'to do, wait up to this long for the lookups that are still going, then give up on them. '
+             f'default: {lookups.DEFAULT_MAX_WAIT}')
+    parser.add_argument(
+        '--lookup-cache', nargs='?', const=lookup_cache.default_lookup_cache_path(), metavar='PATH',
+        help='with -l, save the results of remote lookups (like expanded shortlinks) to a cache file, and reuse '
+             'them (until they expire) rather than making the same lookup again. if PATH is omitted, the cache '
+             f'is saved to {lookup_cache.default_lookup_cache_path()}')
+    parser.add_argument(
+        '--offline', action='store_true',
+        help='use the results of remote lookups from the lookup cache, but do not make any new ones. implies -l '
+             'and --lookup-cache.')
+    parser.add_argument(
+        '--refresh-lookups', action='store_true',
+        help='make every remote lookup again, rather than using results from the lookup cache, and save the new '
+             'results to it. implies -l and --lookup-cache.')
+    parser.add_argument(
+        '--batch-hash-lookups', action='store_true',
+        help='find the hashes in the input and look them up together (many at once, within the quotas in '
+             'unfurl.ini) before unfurling, rather than one at a time as each line is unfurled. hashes only '
+             'found through other remote lookups are not looked up. implies -l and --lookup-cache.')
+    parser.add_argument(
+        '--node-limit', type=int, default=500,
+        help='the most nodes to make for each URL. if there is more to parse than this, the most useful '
+             'nodes (like timestamps and domains) are made first. default: 500')
+    parser.add_argument(
+        '--max-children', type=int,
+        help='the most child nodes to make from any one node (like the items in a long JSON list). '
+             'default: no limit')
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=1,
+        help='number of processes to unfurl with, when unfurling many lines from a file or stdin. default: 1')
+    parser.add_argument(
+        '--unordered', action='store_true',
+        help='with --jobs, output results as soon as they are done, rather than in the same order as the input.')
+    parser.add_argument(
+        '--dedupe-cache-size', type=int, default=batch.DEFAULT_DEDUPE_CACHE_SIZE,
+        help='when unfurling many lines, a line that is the same as one of the last this many distinct lines is '
+             'only unfurled once; its result is output again for the duplicate. 0 unfurls every line. '
+             f'default: {batch.DEFAULT_DEDUPE_CACHE_SIZE}')
+    parser.add_argument(
+        '--subtree-cache-size', type=int, default=0,
+        help='when unfurling many lines, remember what was found for this many distinct parts of them (like the '
+             'same query parameter or encoded value), and reuse it when the same part is found again in a later '
+             'line. this is faster when lines have a lot in common. default: 0 (off)')
+    parser.add_argument(
+        '--result-cache', nargs='?', const=result_cache.default_result_cache_path(), metavar='PATH',
+        help='save results to a cache file, and reuse them when the same thing is unfurled again (with the same '
+             'options and version of unfurl). results with remote lookups are kept only as long as the lookups '
+             'are, and not at all if one failed. if PATH is omitted, the cache is saved to '
+             f'{result_cache.default_result_cache_path()}')
     parser.add_argument(
         '-o', '--output',
         help='file to save output (as CSV) to. if omitted, output is sent to '
              'stdout (typically this means displayed in the console).')
+    parser.add_argument(
+        '--column',
+        help='unfurl the values in this column of a CSV file (or stdin), instead of each whole line. the output is '
+             'the same CSV, with the values found (see --fields) added in new columns; the other columns are '
+             'passed through as they are.')
+    parser.add_argument(
+        '--delimiter', default=',',
+        help=r'with --column, the character between columns in the CSV (use \t for tab-separated). default: ,')
+    parser.add_argument(
+        '--fields', nargs='+', choices=csv_columns.FIELDS, default=list(csv_columns.DEFAULT_FIELDS),
+        help='with --column, the values to add in new columns. '
+             f'default: {" ".join(csv_columns.DEFAULT_FIELDS)}')
+    parser.add_argument(
+        '--resume', action='store_true',
+        help='continue an earlier run that was stopped part way through. when unfurling the lines of a file to an '
+             'output file (-o), progress is saved to a checkpoint file next to the output (OUTPUT.checkpoint); '
+             'with --resume, unfurl continues from the last checkpoint, and each line is in the output once. '
+             'the other options must be the same as in the earlier run.')
     parser.add_argument(
         '-t', '--type', help='Type of output to produce', choices=['tree', 'json'], default='tree'
     )
     parser.add_argument(
-        '-v', '-V', '--version', action='version', version=f'unfurl v{core.unfurl.__version__}')
+        '--format', choices=['text', 'jsonl'], default='text',
+        help='text: output the type chosen with -t (as CSV if saving to a file with -o). jsonl: output JSON Lines, '
+             'one compact JSON object (with the input and its unfurled nodes) per input line; -t is ignored. '
+             'default: text')
+    parser.add_argument(
+        '-v', '-V', '--version', action='version', version=f'unfurl v{unfurl.__version__}')
     args = parser.parse_args()
 
-    items_to_unfurl = []
+    if args.offline and args.refresh_lookups:
+        parser.error('--offline and --refresh-lookups can not be used together')
+    cached_lookups = None
+    if args.lookup_cache or args.offline or args.refresh_lookups or args.batch_hash_lookups:
+        args.lookups = True
+        cached_lookups = lookup_cache.LookupCache(
+            args.lookup_cache, offline=args.offline, refresh=args.refresh_lookups)
 
-    if os.path.isfile(args.what_to_unfurl):
-        with open(args.what_to_unfurl, errors='ignore') as f:
-            for input_url in f:
-                items_to_unfurl.append(input_url.rstrip())
+    if args.column:
+        if args.what_to_unfurl != '-' and not os.path.isfile(args.what_to_unfurl):
+            parser.error('--column needs a CSV file to unfurl (or - to read it from stdin)')
+        if args.unordered or args.resume or args.format == 'jsonl':
+            parser.error('--column can not be used with --unordered, --resume or --format jsonl')
+        args.delimiter = '\t' if args.delimiter in ('\\t', 'tab') else args.delimiter
+        if len(args.delimiter) != 1:
+            parser.error('--delimiter must be one character')
 
+    # Save progress when unfurling a file to a file (in order), so the run can be resumed if it's stopped
+    checkpoint = None
+    if args.output and not args.column and not args.unordered and args.what_to_unfurl != '-' and \
+            os.path.isfile(args.what_to_unfurl):
+        checkpoint = checkpoints.Checkpoint(args.output, args.what_to_unfurl, options={
+            'format': args.format, 'type': args.type, 'detailed': args.detailed, 'filter': args.filter,
+            'lookups': args.lookups, 'node_limit': args.node_limit, 'max_children': args.max_children})
+
+    if args.resume:
+        if args.unordered:
+            parser.error('--resume can not be used with --unordered')
+        if checkpoint is None:
+            parser.error('--resume needs a file to unfurl and an output file (-o)')
+        try:
+            checkpoint.load()
+        except checkpoints.CheckpointError as e:
+            parser.error(str(e))
+        # Drop anything written after the checkpoint was saved; it's unfurled again
+        os.truncate(args.output, checkpoint.output_offset)
+        print(f'Resuming after {checkpoint.items_done:,} lines', file=sys.stderr)
+
+    if args.column:
+        output = functools.partial(csv_columns.extract_fields, fields=tuple(args.fields))
     else:
-        items_to_unfurl.append(args.what_to_unfurl)
-
-    if args.output:
-        with open(args.output, 'w', newline='', encoding='utf-8') as csv_file:
-            csv_writer = csv.writer(csv_file, quoting=csv.QUOTE_ALL)
-            csv_writer.writerow(['url', 'unfurled'])
-
-            unfurl_instance = core.Unfurl(remote_lookups=args.lookups)
-            for item in items_to_unfurl:
-                unfurl_instance.add_to_queue(
-                    data_type='url', key=None,
-                    value=item)
-                unfurl_instance.parse_queue()
-                if args.type == 'json':
-                    csv_writer.writerow(
-                        [item, unfurl_instance.generate_full_json()])
-                else:
-                    csv_writer.writerow(
-                        [item, unfurl_instance.generate_text_tree(
-                            detailed=args.detailed,
-                            output_filter=args.filter)])
-                unfurl_instance.reset_graph_state()
+        output = functools.partial(
+            output_unfurled, output_type='jsonl' if args.format == 'jsonl' else args.type,
+            detailed=args.detailed, output_filter=args.filter)
+
+    cached_results = None
+    if args.result_cache:
+        cached_results = result_cache.get_result_cache(args.result_cache).for_options(
+            'url', output=output.keywords, remote_lookups=args.lookups, node_limit=args.node_limit,
+            max_children_per_node=args.max_children, offline=args.offline)
+        # Along with each result, how long it can be saved for (if at all); see batch.with_result_ttl()
+        output = functools.partial(batch.with_result_ttl, output=output)
 
+    unfurl_options = {
+        'remote_lookups': args.lookups, 'node_limit': args.node_limit, 'max_children_per_node': args.max_children,
+        'subtree_cache_size': args.subtree_cache_size, 'lookup_wait': args.lookup_wait, 'lookup_cache': cached_lookups}
+
+    # The items are unfurled with the batcher's options, where the hash lookups are marked as done beforehand
+    hash_batcher = None
+    if args.batch_hash_lookups:
+        hash_batcher = hash_lookups.HashLookupBatcher(unfurl_options)
+        unfurl_options = hash_batcher.unfurl_options
+
+    if args.jobs > 1:
+        unfurl_items = functools.partial(
+            batch.unfurl_in_parallel, output=output, jobs=args.jobs, unfurl_options=unfurl_options,
+            ordered=not args.unordered)
     else:
-        unfurl_instance = core.Unfurl(remote_lookups=args.lookups)
-        for item in items_to_unfurl:
-            unfurl_instance.add_to_queue(
-                data_type='url', key=None,
-                value=item)
-            unfurl_instance.parse_queue()
-
-            if args.type == 'json':
-                print(unfurl_instance.generate_full_json())
-            else:
-                print(unfurl_instance.generate_text_tree(
-                    detailed=args.detailed, output_filter=args.filter))
-            print()
-            unfurl_instance.reset_graph_state()
+        unfurl_items = functools.partial(
+            batch.unfurl_serially, core.Unfurl(**unfurl_options), data_type='url', output=output)
+
+    if hash_batcher is not None:
+        unfurl_items = functools.partial(
+            hash_lookups.prefetch_hash_lookups, unfurl_items=unfurl_items, batcher=hash_batcher)
+
+    counts = collections.Counter()
+    if args.dedupe_cache_size > 0 or cached_results is not None:
+        unfurl_items = functools.partial(
+            batch.deduplicate, unfurl_items=unfurl_items, cache_size=args.dedupe_cache_size,
+            ordered=not args.unordered, counts=counts, result_cache=cached_results)
+
+    if not args.column:
+        if checkpoint is not None:
+            items_to_unfurl = checkpoint.read_lines()
+        else:
+            items_to_unfurl = iter_items_to_unfurl(args.what_to_unfurl)
+        results = unfurl_items(items_to_unfurl)
+
+    try:
+        if args.column:
+            input_file = open(args.what_to_unfurl, newline='', encoding='utf-8', errors='ignore') \
+                if args.what_to_unfurl != '-' else contextlib.nullcontext(sys.stdin)
+            if args.what_to_unfurl == '-':
+                sys.stdin.reconfigure(errors='ignore', newline='')
+            with input_file as f:
+                unfurled_rows = csv_columns.unfurl_column(
+                    csv.reader(f, delimiter=args.delimiter), args.column, unfurl_items, fields=args.fields)
+                try:
+                    header = next(unfurled_rows, None)
+                except ValueError as e:
+                    parser.error(str(e))
+
+                with open(args.output, 'w', newline='', encoding='utf-8') if args.output else \
+                        contextlib.nullcontext(sys.stdout) as output_file:
+                    csv_writer = csv.writer(output_file, delimiter=args.delimiter)
+                    if header:
+                        csv_writer.writerow(header)
+                    for row in unfurled_rows:
+                        csv_writer.writerow(row)
+
+        elif args.format == 'jsonl':
+            output_file = open(args.output, 'ab' if args.resume else 'wb') if args.output else \
+                contextlib.nullcontext(sys.stdout.buffer)
+            with output_file as f, jsonl.JsonLinesWriter(f) as jsonl_writer:
+                if checkpoint is not None and not args.resume:
+                    checkpoint.save(f)
+                for item, unfurled in results:
+                    jsonl_writer.write({'input': item, **unfurled})
+                    if checkpoint is not None and checkpoint.item_written():
+                        jsonl_writer.flush()
+                        checkpoint.save(f)
+
+        elif args.output:
+            with open(args.output, 'a' if args.resume else 'w', newline='', encoding='utf-8') as csv_file:
+                csv_writer = csv.writer(csv_file, quoting=csv.QUOTE_ALL)
+                if not args.resume:
+                    csv_writer.writerow(['url', 'unfurled'])
+                    if checkpoint is not None:
+                        checkpoint.save(csv_file)
+                for item, unfurled in results:
+                    csv_writer.writerow([item, unfurled])
+                    if checkpoint is not None and checkpoint.item_written():
+                        checkpoint.save(csv_file)
+
+        else:
+            for item, unfurled in results:
+                print(unfurled)
+                # Flush after each item, so results show up as they're done when output is piped to another program
+                print(flush=True)
+
+    except BrokenPipeError:
+        # Whatever was reading the output (like `head`) has exited, so stop. Point stdout at devnull so
+        # Python doesn't complain about the broken pipe again when it flushes stdout on exit.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+
+    # Finished, so there's nothing to resume
+    if checkpoint is not None:
+        checkpoint.remove()
+
+    if counts['duplicates'] or counts['cached']:
+        print(f'Unfurled {counts["unfurled"]:,} distinct lines; reused results for {counts["duplicates"]:,} '
+              f'duplicate lines and {counts["cached"]:,} lines in the result cache', file=sys.stderr)
+
+    if hash_batcher is not None and hash_batcher.counts['hashes']:
+        hash_counts = hash_batcher.counts
+        print(f'Needed {hash_counts["hashes"]:,} hash lookups: {hash_counts["cached"]:,} were in the lookup cache, '
+              f'{hash_counts["looked_up"]:,} were made in bulk, {hash_counts["failed"]:,} failed and '
+              f'{hash_counts["over_quota"]:,} were over quota', file=sys.stderr)
+
+    # Hosts that timed out or couldn't be reached during remote lookups. Only this process's are known; with
+    # -j/--jobs, the lookups made while unfurling are in the workers, which each keep their own.
+    if args.lookups:
+        for host, host_stats in http_client.get_http_client().host_limits.stats().items():
+            print(f'Remote lookups to {host}: {host_stats.get("failures", 0):,} failed, '
+                  f'{host_stats.get("short_circuited", 0):,} skipped after it failed repeatedly; '
+                  f'circuit breaker opened {host_stats.get("opened", 0):,} times, now {host_stats["state"]}',
+                  file=sys.stderr)
+        if args.jobs > 1:
+            print('Failed remote lookups are not counted for the worker processes (with -j/--jobs)', file=sys.stderr)
@@ -14,34 +14,66 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
 import configparser
+import functools
 import logging
-import importlib
 import networkx
-import queue
 import re
-import unfurl.parsers
-
-from pymispwarninglists import WarningLists
+import time
+
+from unfurl import batch
+from unfurl import dispatch
+from unfurl import graph
+from unfurl import hash_lookups
+from unfurl import http_client
+from unfurl import known_domains
+from unfurl import lookup_cache
+from unfurl import lookups
+from unfurl import scheduler
 from unfurl import utils
 
 log = logging.getLogger(__name__)
 
 
 class Unfurl:
-    def __init__(self, remote_lookups=None):
-        self.graph = networkx.DiGraph()
+    # Stash entries keyed by node id that also apply to that node's descendants (parse_protobuf looks up the
+    # proto_context of the nearest ancestor that has one)
+    node_scoped_stash = ('proto_context',)
+
+    # What parsers can change about the node they're run on; changes to these are stored in the subtree cache
+    memoized_node_attributes = (
+        'data_type', 'key', 'value', '_label', '_hover', '_wrap_hover', 'incoming_edge_config', 'extra_options')
+
+    def __init__(self, remote_lookups=None, node_limit=500, max_children_per_node=None, priorities=None,
+                 subtree_cache_size=0, lookup_wait=lookups.DEFAULT_MAX_WAIT, http=None, lookup_cache=None):
+        self.node_graph = graph.NodeGraph()
         self.nodes = {}
         self.edges = []
         self.total_nodes = 0
         self.next_id = 1
-        self.queue = queue.Queue()
+        self._graph_view = None
+        self.queue = scheduler.WorkScheduler(priorities=priorities, max_children_per_node=max_children_per_node)
         self.api_keys = {}
         self.remote_lookups = remote_lookups
-        self.known_domain_lists = None
-        self.node_limit = 500
+        self.node_limit = node_limit
         self.stash = {}
 
+        # Remote lookups run in the background while the rest of the graph is parsed (see submit_lookup())
+        self.lookups = lookups.LookupScheduler(max_wait=lookup_wait)
+        # If set (to a lookup_cache.LookupCache), remote lookups are saved there and reused
+        self.lookup_cache = lookup_cache
+        # The providers (the first part of submit_lookup()'s cache_as, or None) of the lookups in this graph
+        self.lookup_providers = set()
+
+        # If subtree_cache_size is set, what the parsers did for each of the last subtree_cache_size distinct nodes
+        # (by data_type, key, value and context) is kept and reused for the same node in later graphs. See
+        # run_plugins_memoized().
+        self.subtree_cache_size = subtree_cache_size
+        self.subtree_cache = collections.OrderedDict()
+        self.subtree_cache_counts = collections.Counter()
+        self._recording = None
+
         config = configparser.ConfigParser()
         config.read('unfurl.ini')
         if config.has_section('API_KEYS'):
@@ -50,92 +82,148 @@ class Unfurl:
         if not self.remote_lookups and config.has_section('UNFURL_APP'):
             self.remote_lookups = config['UNFURL_APP'].getboolean('remote_lookups')
 
-        if not self.known_domain_lists:
-            self.build_known_domain_lists()
+        # What parsers make remote lookups with; shared by every instance, so connections are reused
+        self.http = http if http is not None else http_client.get_http_client(config)
 
     class Node:
+        # Unfurl can make a lot of nodes; __slots__ keeps each one small.
+        __slots__ = (
+            'node_id', 'data_type', 'key', 'value', '_label', '_hover', '_wrap_hover', 'parent_id',
+            'incoming_edge_config', 'extra_options', '_shape', '_domain_source', '_url_source',
+            '_url_hostname', '_url_path')
+
         def __init__(self, node_id, data_type, key, value, label=None, hover=None,
-                     parent_id=None, incoming_edge_config=None, extra_options=None):
+                     parent_id=None, incoming_edge_config=None, extra_options=None, wrap_hover=False):
             self.node_id = node_id
-            self.data_type = data_type
-            self.key = key
+            self.data_type = utils.intern_if_str(data_type)
+            self.key = utils.intern_if_str(key)
             self.value = value
-            self.label = label
-            self.hover = hover
+            self._label = label
+            self._hover = utils.intern_if_str(hover)
+            # If set, the hover text is wrapped (see utils.wrap_hover_text) when it's output
+            self._wrap_hover = wrap_hover
             self.parent_id = parent_id
             self.incoming_edge_config = incoming_edge_config
             self.extra_options = extra_options
-
-            if self.label is None:
-                if self.key and self.value:
-                    self.label = f'{self.key}: {self.value}'
-                elif self.value:
-                    self.label = self.value
-                elif self.key:
-                    self.label = f'{self.key}:'
+            self._shape = None
+
+            # Where this node's preceding domain and path come from; set by Unfurl.create_node from the parent.
+            # _domain_source is the nearest ancestor that's a 'url' or 'url.hostname' node, and _url_source is the
+            # nearest 'url' ancestor. If this node is (or becomes) a 'url', _url_hostname and _url_path are
+            # filled in as its hostname and path nodes are created.
+            self._domain_source = None
+            self._url_source = None
+            self._url_hostname = ''
+            self._url_path = ''
+
+        @property
+        def label(self):
+            # If no label was given, it's made from the key and value when it's needed
+            if self._label is not None:
+                return self._label
+            if self.key and self.value:
+                return f'{self.key}: {self.value}'
+            elif self.value:
+                return self.value
+            elif self.key:
+                return f'{self.key}:'
+            return None
+
+        @label.setter
+        def label(self, label):
+            self._label = label
+
+        @property
+        def hover(self):
+            if self._wrap_hover:
+                return utils.wrap_hover_text(self._hover)
+            return self._hover
+
+        @hover.setter
+        def hover(self, hover):
+            self._hover = utils.intern_if_str(hover)
+            self._wrap_hover = False
 
         def __repr__(self):
-            return str(self.__dict__)
+            return str(self.to_dict())
 
         def to_dict(self):
-            return self.__dict__
+            return {
+                'node_id': self.node_id,
+                'data_type': self.data_type,
+                'key': self.key,
+                'value': self.value,
+                'label': self.label,
+                'hover': self.hover,
+                'parent_id': self.parent_id,
+                'incoming_edge_config': self.incoming_edge_config,
+                'extra_options': self.extra_options,
+            }
+
+        @property
+        def preceding_domain(self) -> str:
+            """The hostname of the URL this node came from, or '' if there isn't one."""
+            source = self._domain_source
+            if source is None:
+                return ''
+            if source.data_type == 'url.hostname':
+                return source.value if isinstance(source.value, str) else ''
+            return source._url_hostname
+
+        @property
+        def preceding_path(self) -> str:
+            """The path of the URL this node came from, or '' if there isn't one."""
+            if self._url_source is None:
+                return ''
+            return self._url_source._url_path
+
+        @property
+        def shape(self) -> utils.ValueShape:
+            """The shape of this node's value, worked out once and shared by all the parsers that sniff values."""
+            if self._shape is None or self._shape.value is not self.value:
+                self._shape = utils.ValueShape(self.value)
+            return self._shape
 
     def add_to_stash(self, key: str, value: dict) -> None:
+        if self._recording is not None:
+            if key in self.node_scoped_stash and list(value.keys()) == [self._recording['node_id']]:
+                self._recording['stash'].append((key, value[self._recording['node_id']]))
+            else:
+                self._recording['cacheable'] = False
+
         if not self.stash.get(key):
             self.stash[key] = value
         else:
             self.stash[key] = self.stash[key] | value
 
-    def build_known_domain_lists(self):
-        warning_lists = WarningLists()
-        warning_lists_dict = warning_lists.warninglists
-
-        # This list has some values I think may confuse users (t.co, drive.google.com, etc), as most things on
-        # those domains are not security blog-related, so I'm removing it.
-        warning_lists_dict.pop('List of known security providers/vendors blog domain', 1)
-        warning_lists_dict.pop('OSINT.DigitalSide.IT Warning List', 1)
-
-        # And the capitalization was bothering me, so fixing it here.
-        warning_lists_dict['List of known google domains'].name = 'List of known Google domains'
-        warning_lists_dict['List of known microsoft domains'].name = 'List of known Microsoft domains'
+    @property
+    def known_domain_lists(self):
+        # The lists are loaded once per process (on first use) and shared by all Unfurl instances.
+        return known_domains.get_known_domains().warning_lists
 
-        self.known_domain_lists = warning_lists_dict
+    @staticmethod
+    def build_known_domain_lists():
+        """Reload the known domain lists from disk, for every Unfurl instance in this process."""
+        known_domains.refresh_known_domains()
 
     def search_known_domain_lists(self, domain):
-        lists_found_in = []
-        for known_list in self.known_domain_lists.values():
-            if domain in known_list.list:
-                lists_found_in.append({'name': known_list.name, 'description': known_list.description})
-
-        return_list = []
-        for found in lists_found_in:
-            if not found['name'].startswith(('Top', 'google-chrome-crux-1million')):
-                return_list.append(found)
+        return known_domains.get_known_domains().search(domain)
 
-        top_found = [x['name'] for x in lists_found_in if str(x['name']).startswith('Top')]
-        top_1k = [x for x in top_found if x.startswith(('Top 1000', 'Top 500 '))]
-        top_10k = [x for x in top_found if x.startswith(('Top 10 000', 'Top 10K'))]
-        top_1m = [x for x in top_found if x.startswith(('Top 1,000,000', 'Top 20 000', 'google-chrome-crux-1million'))]
+    @property
+    def graph(self) -> networkx.DiGraph:
+        """A networkx.DiGraph of the nodes and edges, built from node_graph when it's first asked for.
 
-        if top_1k:
-            return_list.append({'name': 'Domain is extremely popular (found in "Top 1000" lists)',
-                                'description': f'Domain is found in {len(top_1k)} lists: {", ".join(top_1k)}'})
-
-        elif top_10k:
-            return_list.append({'name': 'Domain is very popular (found in "Top 10K" lists)',
-                                'description': f'Domain is found in {len(top_10k)} lists: {", ".join(top_10k)}'})
-
-        elif top_1m:
-            return_list.append({'name': 'Domain is popular (found in "Top 1M" lists)',
-                                'description': f'Domain is found in {len(top_1m)} lists: {", ".join(top_1m)}'})
-
-        return return_list
+        Unfurl itself uses node_graph while parsing; this is for code that wants to use networkx.
+        """
+        if self._graph_view is None or self._graph_view[0] != (len(self.node_graph), self.node_graph.edge_count):
+            self._graph_view = ((len(self.node_graph), self.node_graph.edge_count), self.node_graph.to_networkx())
+        return self._graph_view[1]
 
     def get_predecessor_node(self, node):
+        self.context_read()
         if not node.parent_id:
             return False
-        predecessor = list(self.graph.predecessors(node))
-        return predecessor
+        return self.node_graph.get_parents(node.node_id)
 
     def get_predecessor_chain(self, node, chain: list = None) -> list:
         if not chain:
@@ -166,8 +254,8 @@ class Unfurl:
         return False
 
     def get_successor_nodes(self, node):
-        successors = list(self.graph.successors(node))
-        return successors
+        self.context_read()
+        return self.node_graph.get_children(node.node_id)
 
     def check_sibling_nodes(self, node, data_type=None, key=None, value=None, return_node=False):
         parent_nodes = self.get_predecessor_node(node)
@@ -175,104 +263,98 @@ class Unfurl:
         if not parent_nodes:
             return False
 
-        sibling_nodes = []
-
         for parent_node in parent_nodes:
-            sibling_nodes.extend(self.get_successor_nodes(parent_node))
+            # Narrow down the siblings to check using node_graph's child indexes, then check the rest of
+            # the criteria. As before, criteria that aren't set (or are falsy) aren't checked.
+            sibling_nodes = self.node_graph.find_children(
+                parent_node.node_id, data_type=data_type or None, key=key or None)
 
-        for sibling_node in sibling_nodes:
+            for sibling_node in sibling_nodes:
 
-            # Skip the "sibling" if it's actually the source node
-            if node.node_id == sibling_node.node_id:
-                continue
-
-            # For each attribute, check if it is set. If it is, and it
-            # doesn't match, stop checking this node and go to the next
-            if data_type:
-                if data_type != sibling_node.data_type:
-                    continue
-            if key:
-                if key != sibling_node.key:
-                    continue
-            if value:
-                if value != sibling_node.value:
+                # Skip the "sibling" if it's actually the source node
+                if node.node_id == sibling_node.node_id:
                     continue
 
-            # This node matched all the given criteria;
-            if return_node:
-                return sibling_node
-            return True
+                # For each attribute, check if it is set. If it is, and it
+                # doesn't match, stop checking this node and go to the next
+                if data_type:
+                    if data_type != sibling_node.data_type:
+                        continue
+                if key:
+                    if key != sibling_node.key:
+                        continue
+                if value:
+                    if value != sibling_node.value:
+                        continue
+
+                # This node matched all the given criteria;
+                if return_node:
+                    return sibling_node
+                return True
 
         # If we got here, no nodes matched all criteria.
         return False
 
     def find_preceding_domain(self, node):
-        parent_nodes = self.get_predecessor_node(node)
-
-        preceding_domain = ''
-
-        if not parent_nodes:
-            return preceding_domain
-
-        assert isinstance(parent_nodes, list)
-
-        for parent_node in parent_nodes:
-            if parent_node.data_type == 'url.hostname':
-                assert isinstance(parent_node.value, str)
-                preceding_domain = parent_node.value
-                break
-            elif parent_node.data_type == 'url':
-                for child_node in self.get_successor_nodes(parent_node):
-                    if child_node.data_type == 'url.hostname':
-                        assert isinstance(child_node.value, str)
-                        preceding_domain = child_node.value
-                        break
-                    elif child_node.data_type == 'url.authority':
-                        for subcomponent in self.get_successor_nodes(child_node):
-                            if subcomponent.data_type == 'url.hostname':
-                                assert isinstance(subcomponent.value, str)
-                                preceding_domain = subcomponent.value
-                                break
-            else:
-                preceding_domain = self.find_preceding_domain(parent_node)
-
-        return preceding_domain
+        return node.preceding_domain
 
     def preceding_domain_matches(self, node, domain):
         """Check if the preceding domain matches the given domain exactly.
         Handles subdomains: preceding_domain_matches(node, 'yahoo.com')
         matches 'yahoo.com' and 'www.yahoo.com' but not 'notyahoo.com'."""
-        preceding = self.find_preceding_domain(node)
+        preceding = node.preceding_domain
         return preceding == domain or preceding.endswith(f'.{domain}')
 
+    def preceding_domain_matches_any(self, node, domains):
+        """Check if the preceding domain matches any of the given domains (as in preceding_domain_matches).
+        Rather than checking each of domains, this looks up each parent domain of the preceding domain
+        ('www.yahoo.com', 'yahoo.com', 'com') in domains, so pass a set when there are many domains."""
+        labels = node.preceding_domain.split('.')
+        return any('.'.join(labels[i:]) in domains for i in range(len(labels)))
+
     def preceding_domain_contains(self, node, label):
         """Check if the preceding domain contains the given label as a domain segment.
         preceding_domain_contains(node, 'google') matches 'google.com',
         'www.google.co.uk', but not 'notgoogle.com'."""
-        preceding = self.find_preceding_domain(node)
-        labels = preceding.split('.')
+        labels = node.preceding_domain.split('.')
         return label in labels
 
     def find_preceding_path(self, node):
-        """Find the URL path associated with a node by traversing up to the URL
-        ancestor and looking for a url.path sibling."""
-        parent_nodes = self.get_predecessor_node(node)
+        """Find the URL path associated with a node (the url.path child of the closest URL ancestor)."""
+        self.context_read()
+        return node.preceding_path
 
-        if not parent_nodes:
-            return ''
-
-        for parent_node in parent_nodes:
-            if parent_node.data_type == 'url':
-                for child_node in self.get_successor_nodes(parent_node):
-                    if child_node.data_type == 'url.path':
-                        return child_node.value
-                return ''
-            else:
-                result = self.find_preceding_path(parent_node)
-                if result:
-                    return result
+    @staticmethod
+    def inherit_url_context(node, parent) -> None:
+        """Set where node's preceding domain and path come from, based on its parent.
+
+        Doing this as each node is created (rather than walking up the graph each time a parser asks)
+        makes looking up a node's preceding domain or path a constant-time operation.
+        """
+        if parent.data_type in ('url', 'url.hostname'):
+            node._domain_source = parent
+        else:
+            node._domain_source = parent._domain_source
 
-        return ''
+        if parent.data_type == 'url':
+            node._url_source = parent
+        else:
+            node._url_source = parent._url_source
+
+        # Record the hostname and path on the URL they belong to. The hostname can be the URL's child,
+        # or a child of the URL's authority (if the authority has more than just the hostname in it).
+        if node.data_type == 'url.hostname' and isinstance(node.value, str):
+            owner = None
+            if parent.data_type == 'url':
+                owner = parent
+            elif parent.data_type == 'url.authority' and parent._url_source is not None \
+                    and parent._url_source.node_id == parent.parent_id:
+                owner = parent._url_source
+            if owner is not None and not owner._url_hostname:
+                owner._url_hostname = node.value
+
+        elif node.data_type == 'url.path' and parent.data_type == 'url' and not parent._url_path:
+            parent._url_path = node.value
 
     def get_id(self):
         new_id = self.next_id
@@ -281,38 +363,25 @@ class Unfurl:
 
     def create_node(
             self, data_type, key, value, label, hover, parent_id=None,
-            incoming_edge_config=None, extra_options=None):
+            incoming_edge_config=None, extra_options=None, wrap_hover=False):
         new_node = self.Node(
             self.get_id(), data_type=data_type, key=key, value=value,
             label=label, hover=hover, parent_id=parent_id,
             incoming_edge_config=incoming_edge_config,
-            extra_options=extra_options)
+            extra_options=extra_options, wrap_hover=wrap_hover)
         assert new_node.node_id not in self.nodes.keys()
         self.nodes[new_node.node_id] = new_node
-        self.graph.add_node(new_node)
+        self.node_graph.add_node(new_node)
         self.total_nodes += 1
 
         if parent_id:
-            if isinstance(parent_id, list):
-                for parent in parent_id:
-                    self.graph.add_edge(self.nodes[parent], new_node)
-            else:
-                self.graph.add_edge(self.nodes[parent_id], new_node)
+            self.inherit_url_context(new_node, self.nodes[parent_id[0] if isinstance(parent_id, list) else parent_id])
 
         return new_node.node_id
 
     @staticmethod
     def add_b64_padding(encoded_string):
-        encoded_string = encoded_string.rstrip('=')
-        remainder = len(encoded_string) % 4
-        if remainder == 1:
-            return False
-        elif remainder == 2:
-            return f'{encoded_string}=='
-        elif remainder == 3:
-            return f'{encoded_string}='
-        else:
-            return encoded_string
+        return utils.add_b64_padding(encoded_string)
 
     @staticmethod
     def check_if_int_between(value, low, high):
@@ -339,52 +408,225 @@ class Unfurl:
             'extra_options': extra_options
         }
 
+        depth = 0
         if parent_id:
             new_item['parent_id'] = parent_id
+            depth = self.node_graph.child_depth(parent_id[0] if isinstance(parent_id, list) else parent_id)
 
         if not extra_options:
             max_row_length = len(str(value)) * 2.2
             new_item['extra_options'] = \
                 {'widthConstraint': {'maximum': max(max_row_length, 200)}}
 
+        if self._recording is not None:
+            if parent_id == self._recording['node_id']:
+                self._recording['queued'].append({k: v for k, v in new_item.items() if k != 'parent_id'})
+            else:
+                self._recording['cacheable'] = False
+
         log.info(f'Added to queue: {new_item}')
-        self.queue.put(new_item)
+        self.queue.put(new_item, depth=depth)
+
+    def submit_lookup(self, function, *args, callback, cache_as=None) -> None:
+        """Start a remote lookup, function(*args), without waiting for it; when it's done, callback(its result)
+        is run (in this thread) and can add to the queue. Parsing carries on in the meantime.
+
+        cache_as is a (provider, key) tuple that identifies the lookup (like ('virustotal', the hash)); if it's
+        given and this instance has a lookup_cache, a saved result is used instead of making the lookup again.
+        """
+        # The lookup's result comes too late to be part of what's recorded for the subtree cache
+        self.context_read()
+        self.lookup_providers.add(cache_as[0] if cache_as is not None else None)
+        if cache_as is not None and self.lookup_cache is not None:
+            self.lookups.submit(self.lookup_cache.lookup, *cache_as, function, *args, callback=callback)
+        else:
+            self.lookups.submit(function, *args, callback=callback)
+
+    def context_read(self) -> None:
+        """Note that a parser looked at more of the graph than the node it was run on and its preceding domain
+        (like its siblings), so what it did can't be reused for the same node in another graph."""
+        if self._recording is not None:
+            self._recording['cacheable'] = False
+
+    def subtree_cache_key(self, node):
+        """The key for node in the subtree cache, or None if what the parsers do for it can't be reused."""
+        if isinstance(node.parent_id, list) or (self.stash.keys() - set(self.node_scoped_stash)):
+            return None
+
+        inherited_stash = []
+        for stash_key in self.node_scoped_stash:
+            entries = self.stash.get(stash_key)
+            ancestor_id = self.node_graph.parent_ids[node.node_id]
+            while entries and ancestor_id:
+                if ancestor_id in entries:
+                    entry = entries[ancestor_id]
+                    inherited_stash.append((stash_key, tuple(entry.items()) if isinstance(entry, dict) else entry))
+                    break
+                ancestor_id = self.node_graph.parent_ids[ancestor_id]
+
+        key = (node.data_type, node.key, node.value, node.node_id == 1, node.preceding_domain, tuple(inherited_stash))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def run_plugins_memoized(self, node):
+        """Run the parsers on node, or if they've already been run on the same node, do what they did then.
+
+        Parsers only change the node they're run on, queue child nodes, and add to the stash. So when they're
+        run on a node, that's recorded (unless a parser looked at other parts of the graph; see context_read()).
+        For a later node with the same data_type, key, value and context, the node is changed and the children
+        queued in the same way, without running the parsers. Its children are then parsed as usual (and may be
+        in the subtree cache themselves), so expensive decoding (like protobufs) is done once per distinct value.
+        """
+        key = self.subtree_cache_key(node)
+        if key is None:
+            self.subtree_cache_counts['uncacheable'] += 1
+            self.run_parsers(node)
+            return
+
+        entry = self.subtree_cache.get(key)
+        if entry is not None:
+            self.subtree_cache.move_to_end(key)
+            self.subtree_cache_counts['hits'] += 1
+
+            original_data_type = node.data_type
+            for attribute, value in entry['changes']:
+                setattr(node, attribute, value)
+            if node.data_type != original_data_type:
+                self.node_graph.update_data_type(node, original_data_type)
+
+            for stash_key, stash_entry in entry['stash']:
+                self.add_to_stash(stash_key, {node.node_id: stash_entry})
+            depth = self.node_graph.child_depth(node.node_id)
+            for queued_item in entry['queued']:
+                self.queue.put(dict(queued_item, parent_id=node.node_id), depth=depth)
+            return
+
+        original_state = [getattr(node, attribute) for attribute in self.memoized_node_attributes]
+        self._recording = {'node_id': node.node_id, 'queued': [], 'stash': [], 'cacheable': True}
+        try:
+            self.run_parsers(node)
+            recording = self._recording
+        finally:
+            self._recording = None
+
+        if not recording['cacheable']:
+            self.subtree_cache_counts['uncacheable'] += 1
+            return
+
+        self.subtree_cache_counts['misses'] += 1
+        self.subtree_cache[key] = {
+            'changes': [
+                (attribute, getattr(node, attribute))
+                for attribute, original_value in zip(self.memoized_node_attributes, original_state)
+                if getattr(node, attribute) is not original_value],
+            'queued': recording['queued'],
+            'stash': recording['stash']
+        }
+        if len(self.subtree_cache) > self.subtree_cache_size:
+            self.subtree_cache.popitem(last=False)
 
     def run_plugins(self, node):
+        if self.subtree_cache_size:
+            self.run_plugins_memoized(node)
+        else:
+            self.run_parsers(node)
 
-        for unfurl_parser in unfurl.parsers.__all__:
-            try:
-                parser = importlib.import_module(f'unfurl.parsers.{unfurl_parser}')
-            except ImportError as e:
-                log.exception(f'Failed to import {unfurl_parser}: {e}')
-                continue
+    def run_parsers(self, node):
+        parser_dispatch = dispatch.get_parser_dispatch()
+        parsers_to_run = parser_dispatch.parsers_for(node)
+
+        i = 0
+        while i < len(parsers_to_run):
+            position, unfurl_parser, parser = parsers_to_run[i]
+            i += 1
+            data_type = node.data_type
 
             try:
                 parser.run(self, node)
             except Exception as e:
                 log.exception(f'Exception in {unfurl_parser}: {e}')
 
+            # A parser can change a node's data_type (parse_url turns a 'string' that's really a URL into a 'url').
+            # If it does, switch to the parsers for the new data_type, carrying on after the one that just ran.
+            if node.data_type != data_type:
+                self.node_graph.update_data_type(node, data_type)
+                parsers_to_run = [p for p in parser_dispatch.parsers_for(node) if p[0] > position]
+                i = 0
+
     def parse(self, queued_item):
         item = queued_item
         node_id = self.create_node(
             data_type=item['data_type'], key=item['key'], value=item['value'],
-            label=item['label'], hover=utils.wrap_hover_text(item['hover']),
+            label=item['label'], hover=item['hover'],
             parent_id=item.get('parent_id', None),
             incoming_edge_config=item.get('incoming_edge_config', None),
-            extra_options=item.get('extra_options', None))
+            extra_options=item.get('extra_options', None), wrap_hover=True)
 
         self.run_plugins(self.nodes[node_id])
 
     def parse_queue(self):
-        while not self.queue.empty() and self.total_nodes < self.node_limit:
-            self.parse(self.queue.get())
+        lookup_deadline = None
+        while True:
+            while not self.queue.empty() and self.total_nodes < self.node_limit:
+                self.parse(self.queue.get(budget_left=self.node_limit - self.total_nodes))
+                if self.lookups.pending:
+                    self.lookups.run_completed()
+
+            if not self.lookups.pending or self.total_nodes >= self.node_limit:
+                break
+
+            # Nothing left to parse until a remote lookup finishes; wait for them, up to lookup_wait in all
+            if lookup_deadline is None:
+                lookup_deadline = time.monotonic() + self.lookups.max_wait
+            wait_left = lookup_deadline - time.monotonic()
+            if wait_left <= 0:
+                break
+            self.lookups.run_completed(timeout=wait_left)
+
+        self.lookups.abandon()
+
+    def run_many(self, items, data_type='url', return_type='json'):
+        """Unfurl each of items with this instance, yielding (item, result) as each is done.
+
+        See run_batch() for what items and results can be. The graph is reset after each item.
+        """
+        output = functools.partial(Unfurl.generate_output, return_type=return_type)
+        yield from batch.unfurl_serially(self, items, data_type, output)
+
+    def result_ttl(self):
+        """How long (in seconds) the result of what was just unfurled can be saved and reused (like in a
+        result_cache.ResultCache): None if it made no remote lookups (so it only changes with the parsers), or no
+        longer than the shortest TTL of the lookups it made (see lookup_cache.DEFAULT_TTLS). It's 0 (don't save
+        it) if any of them failed, were skipped or were abandoned, as the result is missing what they'd find.
+        """
+        if self.lookups.incomplete:
+            return 0
+        if not self.lookup_providers:
+            return None
+        ttls = self.lookup_cache.ttls if self.lookup_cache is not None else lookup_cache.DEFAULT_TTLS
+        return min(ttls.get(provider, lookup_cache.DEFAULT_TTL) for provider in self.lookup_providers)
 
     def reset_graph_state(self):
-        self.graph = networkx.DiGraph()
+        """Forget everything from the last thing unfurled, so this instance can be reused to unfurl something else.
+
+        This clears the graph, anything left in the queue (if parsing stopped at node_limit), the stash
+        (which parsers use to pass things between nodes, like proto_context, keyed by node id), and any remote
+        lookups still going. Settings like api_keys, remote_lookups and node_limit are kept.
+        """
+        self.node_graph = graph.NodeGraph()
         self.nodes = {}
         self.edges = []
         self.total_nodes = 0
         self.next_id = 1
+        self._graph_view = None
+        self.queue.clear()
+        self.stash = {}
+        self.lookups.abandon()
+        self.lookups.incomplete = 0
+        self.lookup_providers = set()
 
     @staticmethod
     def transform_node(node):
@@ -409,11 +651,42 @@ class Unfurl:
             transformed.update(edge[1].incoming_edge_config)
         return transformed
 
+    def generate_output(self, return_type='json'):
+        """The unfurled graph as text ('text'), or as from generate_full_json() ('full_json'),
+        generate_compact_json() ('compact_json') or generate_json()."""
+        if return_type == 'text':
+            return self.generate_text_tree()
+        elif return_type == 'full_json':
+            return self.generate_full_json()
+        elif return_type == 'compact_json':
+            return self.generate_compact_json()
+        return self.generate_json()
+
+    def generate_compact_json(self):
+        """The unfurled nodes, as plain data that can be serialized to JSON (unlike generate_full_json()), without
+        the display options in generate_json(). Edges are given by each node's parent_id."""
+        nodes = []
+        for node in self.node_graph.iter_nodes():
+            compact_node = {
+                'id': node.node_id,
+                'data_type': node.data_type,
+                'key': node.key,
+                'value': node.value,
+                'label': node.label
+            }
+            # The hover text as it was given, without the line breaks added for display
+            if node._hover:
+                compact_node['hover'] = node._hover
+            if node.parent_id:
+                compact_node['parent_id'] = node.parent_id
+            nodes.append(compact_node)
+        return {'nodes': nodes}
+
     def generate_json(self):
         data_json = {'nodes': [], 'edges': []}
-        for orig_node in self.graph.nodes():
+        for orig_node in self.node_graph.iter_nodes():
             data_json['nodes'].append(self.transform_node(orig_node))
-        for orig_edge in self.graph.edges():
+        for orig_edge in self.node_graph.iter_edges():
             data_json['edges'].append(self.transform_edge(orig_edge))
 
         edge_summary = {}
@@ -427,9 +700,9 @@ class Unfurl:
 
     def generate_full_json(self):
         data_json = {'nodes': [], 'edges': []}
-        for orig_node in self.graph.nodes():
+        for orig_node in self.node_graph.iter_nodes():
             data_json['nodes'].append(orig_node.to_dict())
-        for orig_edge in self.graph.edges():
+        for orig_edge in self.node_graph.iter_edges():
             data_json['edges'].append(orig_edge)
 
         return data_json
@@ -486,22 +759,26 @@ class Unfurl:
 
     def generate_3d_json(self):
         data_json = {'nodes': [], 'links': []}
-        for orig_node in self.graph.nodes():
+        for orig_node in self.node_graph.iter_nodes():
             data_json['nodes'].append(self.transform_3d_node(orig_node))
-        for orig_edge in self.graph.edges():
+        for orig_edge in self.node_graph.iter_edges():
             data_json['links'].append(self.transform_3d_edge(orig_edge))
         return data_json
 
     def generate_text_tree(self, detailed=False, output_filter=None):
-        tree_root = None
-        for node_contents in self.graph.nodes(data=True):
-            # Get the root node; id is 1. Needed for networkx tree_data().
-            if node_contents[0].__dict__.get('node_id') == 1:
-                tree_root = node_contents[0]
-                break
-
-        tree_data = networkx.readwrite.json_graph.tree_data(
-            self.graph, root=tree_root)
+        if self.node_graph.is_tree(root_id=1):
+            tree_data = self.node_graph.tree_data(root_id=1)
+        else:
+            # Let networkx deal with (and raise errors about) anything that isn't a simple tree
+            tree_root = None
+            for node_contents in self.graph.nodes(data=True):
+                # Get the root node; id is 1. Needed for networkx tree_data().
+                if node_contents[0].node_id == 1:
+                    tree_root = node_contents[0]
+                    break
+
+            tree_data = networkx.readwrite.json_graph.tree_data(
+                self.graph, root=tree_root)
         output_tree = Unfurl.text_tree(tree_data, detailed=detailed)
 
         if output_filter:
@@ -562,8 +839,26 @@ class Unfurl:
         return text_output
 
 
-def run(url, data_type='url', return_type='json', remote_lookups=False, extra_options=None):
-    u = Unfurl(remote_lookups=remote_lookups)
+def run(url, data_type='url', return_type='json', remote_lookups=False, extra_options=None,
+        node_limit=500, max_children_per_node=None, result_cache=None, lookup_cache=None):
+    """Unfurl url, returning the result as return_type (see Unfurl.generate_output()).
+
+    If result_cache (a result_cache.ResultCache) is given, a saved result for the same url and options is
+    returned from it if there is one; otherwise the new result is saved to it, for as long as
+    Unfurl.result_ttl() allows (not at all if a remote lookup failed). If lookup_cache (a
+    lookup_cache.LookupCache) is given, remote lookups are saved to it and reused.
+    """
+    cache_options = {
+        'return_type': return_type, 'remote_lookups': remote_lookups, 'extra_options': extra_options,
+        'node_limit': node_limit, 'max_children_per_node': max_children_per_node}
+    if result_cache is not None:
+        cached_result = result_cache.get(url, data_type, **cache_options)
+        if cached_result is not None:
+            return cached_result
+
+    u = Unfurl(
+        remote_lookups=remote_lookups, node_limit=node_limit, max_children_per_node=max_children_per_node,
+        lookup_cache=lookup_cache)
     u.add_to_queue(
         data_type=data_type,
         key=None,
@@ -572,12 +867,69 @@ def run(url, data_type='url', return_type='json', remote_lookups=False, extra_op
     )
     u.parse_queue()
 
-    if return_type == 'text':
-        return_object = u.generate_text_tree()
-    elif return_type == 'full_json':
-        return_object = u.generate_full_json()
-    else:
-        return_object = u.generate_json()
+    return_object = u.generate_output(return_type)
+    result_ttl = u.result_ttl()
 
     u.reset_graph_state()
-    return return_object
\ No newline at end of file
+
+    if result_cache is not None and result_ttl != 0:
+        result_cache.put(url, return_object, data_type, ttl=result_ttl, **cache_options)
+    return return_object
+
+
+def run_batch(items, data_type='url', return_type='json', remote_lookups=False, jobs=1, ordered=True,
+              node_limit=500, max_children_per_node=None, dedupe_cache_size=0, subtree_cache_size=0,
+              result_cache=None, lookup_cache=None, batch_hash_lookups=False):
+    """Unfurl each of items, yielding (item, result) as each is done. Results are as from run().
+
+    items can be any iterable (including a generator); they are read as they're needed. Each item is the value to
+    unfurl, or a (value, data_type) tuple to unfurl that item as something other than data_type.
+
+    With jobs > 1, items are unfurled in that many worker processes (see batch.unfurl_in_parallel()); results
+    are still yielded in the same order as items, unless ordered is False.
+
+    If dedupe_cache_size is more than 0, an item that's the same as one of the last dedupe_cache_size distinct
+    items isn't unfurled again; the earlier result is yielded for it (see batch.deduplicate()). subtree_cache_size
+    does the same for the nodes within them (see Unfurl.run_plugins_memoized()). If result_cache (a
+    result_cache.ResultCache) is given, saved results are used from it, and new ones saved to it, as in run().
+    lookup_cache is also as in run().
+
+    If batch_hash_lookups is True, the hashes in items are looked up together, a window of items at a time,
+    before they're unfurled (see hash_lookups.HashLookupBatcher); this implies remote_lookups, and needs a
+    lookup_cache to keep the results in.
+    """
+    remote_lookups = remote_lookups or batch_hash_lookups
+    unfurl_options = {
+        'remote_lookups': remote_lookups, 'node_limit': node_limit, 'max_children_per_node': max_children_per_node,
+        'subtree_cache_size': subtree_cache_size, 'lookup_cache': lookup_cache}
+    output = functools.partial(Unfurl.generate_output, return_type=return_type)
+    if result_cache is not None:
+        # Along with each result, how long it can be saved for (if at all), as in run()
+        output = functools.partial(batch.with_result_ttl, output=output)
+    hash_batcher = None
+    if batch_hash_lookups:
+        hash_batcher = hash_lookups.HashLookupBatcher(unfurl_options, data_type)
+        unfurl_options = hash_batcher.unfurl_options
+
+    if jobs > 1:
+        unfurl_items = functools.partial(
+            batch.unfurl_in_parallel, output=output, jobs=jobs, data_type=data_type, unfurl_options=unfurl_options,
+            ordered=ordered)
+    else:
+        unfurl_items = functools.partial(
+            batch.unfurl_serially, Unfurl(**unfurl_options), data_type=data_type, output=output)
+
+    if hash_batcher is not None:
+        unfurl_items = functools.partial(
+            hash_lookups.prefetch_hash_lookups, unfurl_items=unfurl_items, batcher=hash_batcher)
+
+    if result_cache is not None:
+        result_cache = result_cache.for_options(
+            data_type, return_type=return_type, remote_lookups=remote_lookups, extra_options=None,
+            node_limit=node_limit, max_children_per_node=max_children_per_node)
+
+    if dedupe_cache_size > 0 or result_cache is not None:
+        yield from batch.deduplicate(
+            items, unfurl_items, cache_size=dedupe_cache_size, ordered=ordered, result_cache=result_cache)
+    else:
+        yield from unfurl_items(items)
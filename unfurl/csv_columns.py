@@ -0,0 +1,100 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+
+SEARCH_QUERY_PREFIX = 'Search Query: '
+
+
+def _timestamps(node):
+    if isinstance(node.data_type, str) and node.data_type.startswith('timestamp.'):
+        return node.value
+
+
+def _domains(node):
+    if node.data_type == 'url.domain':
+        return node.value
+
+
+def _hostnames(node):
+    if node.data_type == 'url.hostname':
+        return node.value
+
+
+def _search_terms(node):
+    # Search engine parsers label the search terms the same way, though the data_type varies
+    if isinstance(node.value, str) and node.value.startswith(SEARCH_QUERY_PREFIX):
+        return node.value[len(SEARCH_QUERY_PREFIX):]
+
+
+# The fields that can be extracted into new columns; each function returns the value of a node for that field
+# (or None if the node isn't one)
+FIELDS = {
+    'timestamps': _timestamps,
+    'domains': _domains,
+    'hostnames': _hostnames,
+    'search_terms': _search_terms,
+}
+
+DEFAULT_FIELDS = ('timestamps', 'domains', 'search_terms')
+
+# Between the values in a column, when more than one is found (like a URL with a redirect to another domain)
+VALUE_SEPARATOR = ' | '
+
+
+def extract_fields(unfurl_instance, fields=DEFAULT_FIELDS) -> list:
+    """An output function (for batch.unfurl_one()) that returns the values of fields found in the graph.
+
+    Returns one str for each field: every distinct value found for it, in node order, joined by VALUE_SEPARATOR.
+    This only looks at the nodes, so it's much quicker than making the text tree or JSON.
+    """
+    values = {field: {} for field in fields}
+    for node in unfurl_instance.nodes.values():
+        for field in fields:
+            value = FIELDS[field](node)
+            if value is not None:
+                values[field][str(value)] = None
+    return [VALUE_SEPARATOR.join(values[field]) for field in fields]
+
+
+def unfurl_column(rows, column, unfurl_items, fields=DEFAULT_FIELDS):
+    """Unfurl one column of CSV rows, yielding each row with the extracted fields appended as new columns.
+
+    rows is an iterable of lists (like a csv.reader), starting with the header row; column is the name of the
+    column to unfurl. unfurl_items takes an iterable of values and yields (value, extract_fields() result) for
+    each, in order, like batch.unfurl_serially() or batch.unfurl_in_parallel(). Rows are streamed through it,
+    so a file of any size can be unfurled.
+
+    The header is yielded first, with a column named 'unfurl_<field>' for each field. Raises ValueError if
+    there is no column with that name.
+    """
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return
+    if column not in header:
+        raise ValueError(f'no column named {column!r} (the columns are {", ".join(header)})')
+    column_index = header.index(column)
+    yield header + [f'unfurl_{field}' for field in fields]
+
+    # The rows waiting on their results
+    waiting = collections.deque()
+
+    def column_values():
+        for row in rows:
+            waiting.append(row)
+            yield row[column_index] if column_index < len(row) else ''
+
+    for _, extracted in unfurl_items(column_values()):
+        yield waiting.popleft() + list(extracted)
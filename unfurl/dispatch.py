@@ -0,0 +1,113 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib
+import logging
+import threading
+
+import unfurl.parsers
+
+log = logging.getLogger(__name__)
+
+_parser_dispatch = None
+_parser_dispatch_lock = threading.Lock()
+
+
+class ParserDispatch:
+    """Works out which parsers need to run on a node, so Unfurl doesn't call every parser for every node.
+
+    A parser declares the nodes it handles with a module-level `accepts` dict:
+      - 'data_types': data types it handles. A trailing '*' matches by prefix (ex: 'google.*').
+      - 'keys': node keys it handles, whatever the node's data type (ex: 'fbclid').
+      - 'root': True if it also handles the root node (what the user entered), whatever its data type.
+    The parser is run on a node if any of those match. Parsers without `accepts` are generic "sniffers"
+    that look at the value of every node (for timestamps, base64, hashes, etc.), so they run on every node.
+
+    Parsers always run in the order they are listed in unfurl.parsers.__all__.
+    """
+
+    def __init__(self, parser_names):
+        # Each parser is a tuple of (position in parser_names, name, module)
+        self.parsers = []
+        for position, parser_name in enumerate(parser_names):
+            try:
+                parser = importlib.import_module(f'unfurl.parsers.{parser_name}')
+            except ImportError as e:
+                log.exception(f'Failed to import {parser_name}: {e}')
+                continue
+            self.parsers.append((position, parser_name, parser))
+
+        self.by_data_type = {}
+        self.by_data_type_prefix = []
+        self.by_key = {}
+        self.for_root = set()
+        self.for_all = set()
+
+        for parser_entry in self.parsers:
+            accepts = getattr(parser_entry[2], 'accepts', None)
+            if accepts is None:
+                self.for_all.add(parser_entry)
+                continue
+
+            for data_type in accepts.get('data_types', []):
+                if data_type.endswith('*'):
+                    self.by_data_type_prefix.append((data_type[:-1], parser_entry))
+                else:
+                    self.by_data_type.setdefault(data_type, set()).add(parser_entry)
+            for key in accepts.get('keys', []):
+                self.by_key.setdefault(key, set()).add(parser_entry)
+            if accepts.get('root'):
+                self.for_root.add(parser_entry)
+
+        # The parsers for each (data_type, key, is root) combination seen, worked out the first time it's seen.
+        self._plans = {}
+
+    def parsers_for(self, node) -> tuple:
+        """Return the parsers to run on node, in order."""
+        key = node.key
+        try:
+            if key not in self.by_key:
+                key = None
+        except TypeError:
+            # Unhashable key (like a list); it can't be one that a parser declared
+            key = None
+
+        plan_key = (node.data_type, key, node.node_id == 1)
+        plan = self._plans.get(plan_key)
+        if plan is None:
+            plan = self._plans[plan_key] = self._build_plan(*plan_key)
+        return plan
+
+    def _build_plan(self, data_type, key, is_root) -> tuple:
+        selected = set(self.for_all)
+        selected.update(self.by_data_type.get(data_type, ()))
+        if isinstance(data_type, str):
+            for prefix, parser_entry in self.by_data_type_prefix:
+                if data_type.startswith(prefix):
+                    selected.add(parser_entry)
+        if key is not None:
+            selected.update(self.by_key[key])
+        if is_root:
+            selected.update(self.for_root)
+        return tuple(sorted(selected, key=lambda parser_entry: parser_entry[0]))
+
+
+def get_parser_dispatch() -> ParserDispatch:
+    """Return the process-wide ParserDispatch for unfurl.parsers.__all__, building it on first use."""
+    global _parser_dispatch
+    if _parser_dispatch is None:
+        with _parser_dispatch_lock:
+            if _parser_dispatch is None:
+                _parser_dispatch = ParserDispatch(unfurl.parsers.__all__)
+    return _parser_dispatch
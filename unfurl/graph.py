@@ -0,0 +1,162 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from array import array
+
+import networkx
+
+
+class NodeGraph:
+    """The nodes of an Unfurl graph and the edges between them, stored compactly by integer node id.
+
+    Unfurl only ever adds nodes (each with its parent(s)), then asks for a node's parents, children, or
+    children of a given data_type and key; a networkx.DiGraph (a dict of dicts per node, keyed by Node
+    objects) is a lot of overhead for that. Here, each node's parent id is kept in an array indexed by
+    node id, and each parent's children as an array of child ids, in the order they were added.
+
+    Use to_networkx() for a networkx.DiGraph of the same graph, when one is needed.
+    """
+
+    def __init__(self):
+        # Node ids start at 1; index 0 is unused
+        self.nodes = [None]
+        # The parent id of each node (0 if it has none). A few nodes have more than one parent; the rest of
+        # their parent ids are in extra_parent_ids.
+        self.parent_ids = array('L', [0])
+        self.extra_parent_ids = {}
+        # How far each node is below the root (through its first parent)
+        self.depths = array('L', [0])
+        self.edge_count = 0
+
+        # Parent id -> array of child ids; the same, split by (parent id, data_type), and by
+        # (parent id, data_type, key). Children with an unhashable key aren't in child_ids_by_type_and_key.
+        self.child_ids = {}
+        self.child_ids_by_type = {}
+        self.child_ids_by_type_and_key = {}
+
+    def __len__(self):
+        return len(self.nodes) - 1
+
+    def add_node(self, node) -> None:
+        node_id = node.node_id
+        while len(self.nodes) <= node_id:
+            self.nodes.append(None)
+            self.parent_ids.append(0)
+            self.depths.append(0)
+        self.nodes[node_id] = node
+
+        if not node.parent_id:
+            return
+
+        parent_ids = node.parent_id if isinstance(node.parent_id, list) else [node.parent_id]
+        self.parent_ids[node_id] = parent_ids[0]
+        self.depths[node_id] = self.child_depth(parent_ids[0])
+        if len(parent_ids) > 1:
+            self.extra_parent_ids[node_id] = parent_ids[1:]
+
+        for parent_id in parent_ids:
+            self.edge_count += 1
+            for index, index_key in self._child_index_keys(parent_id, node.data_type, node.key):
+                index.setdefault(index_key, array('L')).append(node_id)
+
+    def _child_index_keys(self, parent_id, data_type, key) -> list:
+        index_keys = [(self.child_ids, parent_id), (self.child_ids_by_type, (parent_id, data_type))]
+        try:
+            hash(key)
+            index_keys.append((self.child_ids_by_type_and_key, (parent_id, data_type, key)))
+        except TypeError:
+            pass
+        return index_keys
+
+    def update_data_type(self, node, old_data_type) -> None:
+        """Move node to the right place in the child indexes after its data_type changed."""
+        for parent_id in self.get_parent_ids(node.node_id):
+            old_keys = self._child_index_keys(parent_id, old_data_type, node.key)[1:]
+            new_keys = self._child_index_keys(parent_id, node.data_type, node.key)[1:]
+            for (index, old_key), (_, new_key) in zip(old_keys, new_keys):
+                index[old_key].remove(node.node_id)
+                # Keep siblings in the order they were added
+                index[new_key] = array('L', sorted(index.get(new_key, array('L')) + array('L', [node.node_id])))
+
+    def child_depth(self, parent_id) -> int:
+        """The depth of a new child of parent_id."""
+        return self.depths[parent_id] + 1 if parent_id < len(self.depths) else 1
+
+    def get_parent_ids(self, node_id) -> list:
+        parent_id = self.parent_ids[node_id]
+        if not parent_id:
+            return []
+        return [parent_id] + self.extra_parent_ids.get(node_id, [])
+
+    def get_parents(self, node_id) -> list:
+        return [self.nodes[parent_id] for parent_id in self.get_parent_ids(node_id)]
+
+    def get_children(self, node_id) -> list:
+        return [self.nodes[child_id] for child_id in self.child_ids.get(node_id, ())]
+
+    def find_children(self, parent_id, data_type=None, key=None) -> list:
+        """Return the children of parent_id, narrowed down by data_type and key (if they are not None)."""
+        if data_type is None:
+            child_ids = self.child_ids.get(parent_id, ())
+            if key is not None:
+                return [self.nodes[child_id] for child_id in child_ids if self.nodes[child_id].key == key]
+        elif key is None:
+            child_ids = self.child_ids_by_type.get((parent_id, data_type), ())
+        else:
+            try:
+                child_ids = self.child_ids_by_type_and_key.get((parent_id, data_type, key), ())
+            except TypeError:
+                return [child for child in self.find_children(parent_id, data_type) if child.key == key]
+        return [self.nodes[child_id] for child_id in child_ids]
+
+    def iter_nodes(self):
+        """Yield the nodes, in the order they were added."""
+        for node in self.nodes:
+            if node is not None:
+                yield node
+
+    def iter_edges(self):
+        """Yield (parent, child) node pairs, in the same order networkx would."""
+        for node in self.iter_nodes():
+            for child_id in self.child_ids.get(node.node_id, ()):
+                yield node, self.nodes[child_id]
+
+    def is_tree(self, root_id=1) -> bool:
+        """Check if the graph is a tree rooted at root_id, with every other node having exactly one parent."""
+        if len(self) != self.edge_count + 1 or self.extra_parent_ids:
+            return False
+        if root_id >= len(self.nodes) or self.nodes[root_id] is None or self.parent_ids[root_id]:
+            return False
+        return all(self.parent_ids[node.node_id] for node in self.iter_nodes() if node.node_id != root_id)
+
+    def tree_data(self, root_id=1) -> dict:
+        """The same output as networkx.readwrite.json_graph.tree_data(), for a graph that is_tree()."""
+
+        def add_children(node_id):
+            children = []
+            for child_id in self.child_ids.get(node_id, ()):
+                child = {'id': self.nodes[child_id]}
+                grandchildren = add_children(child_id)
+                if grandchildren:
+                    child['children'] = grandchildren
+                children.append(child)
+            return children
+
+        return {'id': self.nodes[root_id], 'children': add_children(root_id)}
+
+    def to_networkx(self) -> networkx.DiGraph:
+        graph = networkx.DiGraph()
+        graph.add_nodes_from(self.iter_nodes())
+        graph.add_edges_from(self.iter_edges())
+        return graph
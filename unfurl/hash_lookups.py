@@ -0,0 +1,194 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import concurrent.futures
+import configparser
+import itertools
+import logging
+
+from unfurl import batch
+from unfurl import core
+from unfurl import host_limits
+from unfurl import lookups
+from unfurl.parsers import parse_hash
+
+log = logging.getLogger(__name__)
+
+_NOT_FOUND = object()
+
+# The remote lookups parse_hash makes for hash nodes, by provider (as in LookupCache): the lookup function,
+# the data_types of the nodes it's made for, and the API key it needs (if any)
+PROVIDERS = {
+    'nitrxgen': (parse_hash.nitrxgen_md5_lookup, ('hash.md5',), None),
+    'virustotal': (parse_hash.virustotal_lookup, ('hash.md5', 'hash.sha-1', 'hash.sha-256'), 'virustotal'),
+}
+
+# How many items to read ahead and find the hashes in, before looking them up together
+DEFAULT_WINDOW = 1000
+
+# How many lookups each provider allows per minute and per day, unless set in the [HASH_LOOKUPS] section of
+# unfurl.ini. These are VirusTotal's limits for a free API key.
+DEFAULT_QUOTAS = {
+    'virustotal': {'per_minute': 4, 'per_day': 500},
+}
+
+
+class Quota:
+    """How many lookups a provider allows: per_minute are spread out (waiting as needed), and after per_day,
+    no more are made. Either can be None, for no limit.
+
+    The lookups made each day (in UTC) are counted in the lookup cache's database, so per_day holds across
+    runs that use the same cache; per_minute is only kept to within this process."""
+
+    def __init__(self, per_minute=None, per_day=None):
+        self.bucket = host_limits.TokenBucket(rate=per_minute / 60, burst=per_minute) if per_minute else None
+        self.per_day = per_day
+
+    def take(self, provider, lookup_cache) -> bool:
+        """Use up one of provider's lookups, waiting until it's allowed. Returns False if there are none left
+        today."""
+        if self.per_day is not None and not lookup_cache.use_daily_quota(provider, self.per_day):
+            return False
+        if self.bucket is not None:
+            self.bucket.acquire()
+        return True
+
+    def give_back(self, provider, lookup_cache) -> None:
+        """Return a lookup taken with take() that failed (like being rate limited), so it doesn't count today."""
+        if self.per_day is not None:
+            lookup_cache.return_daily_quota(provider)
+
+
+def read_quotas(config_path='unfurl.ini') -> dict:
+    """The Quota for each provider, from DEFAULT_QUOTAS and the [HASH_LOOKUPS] section of unfurl.ini."""
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    section = config['HASH_LOOKUPS'] if config.has_section('HASH_LOOKUPS') else {}
+    quotas = {}
+    for provider in PROVIDERS:
+        limits = dict(DEFAULT_QUOTAS.get(provider, {}))
+        for period in ('per_minute', 'per_day'):
+            if section.get(f'{provider}_{period}'):
+                limits[period] = int(section.get(f'{provider}_{period}'))
+        if limits:
+            quotas[provider] = Quota(**limits)
+    return quotas
+
+
+class HashLookupBatcher:
+    """Looks up the hashes in a batch of items together, rather than one at a time as each item is unfurled.
+
+    prefetch() reads items a window at a time and unfurls them (without remote lookups) to find their hash
+    nodes. The distinct hashes that aren't in the lookup cache already are then looked up, many at once and
+    within each provider's quota, and saved to it; then the items are passed on. When they're unfurled for
+    real, parse_hash's lookups for those providers only read from the cache (see LookupCache.prefetched), so
+    their result nodes are filled in without waiting on the network, and without any lookups past the quota.
+
+    Hashes that are only found thanks to another remote lookup (like in the URL a shortlink expands to) aren't
+    seen beforehand, so they aren't looked up.
+
+    unfurl_options are the options to unfurl the items with (as for Unfurl()), and must include a lookup_cache.
+    The items must be unfurled with the batcher's unfurl_options instead, which have a copy of that lookup_cache
+    with the hash lookups marked as prefetched (the one passed in is left as it is, to use for other lookups
+    later). quotas is the Quota for each provider (by default, from read_quotas()). API keys are read
+    from unfurl.ini, into scanner.api_keys, like for any Unfurl instance.
+    """
+
+    def __init__(self, unfurl_options, data_type='url', window=DEFAULT_WINDOW, quotas=None):
+        if unfurl_options.get('lookup_cache') is None:
+            raise ValueError('looking up hashes in bulk needs a lookup_cache to save the results to')
+        self.lookup_cache = unfurl_options['lookup_cache'].with_prefetched(PROVIDERS)
+        self.unfurl_options = dict(unfurl_options, lookup_cache=self.lookup_cache)
+        self.data_type = data_type
+        self.window = window
+        self.quotas = read_quotas() if quotas is None else quotas
+        self.counts = collections.Counter()
+
+        self.scanner = core.Unfurl(**dict(unfurl_options, remote_lookups=False, lookup_cache=None))
+        # unfurl.ini can turn remote lookups on for every instance
+        self.scanner.remote_lookups = False
+
+        # The hashes already looked up (or found in the cache) in this batch, by provider
+        self._resolved = collections.defaultdict(set)
+        self._over_quota = set()
+
+    @property
+    def providers(self) -> dict:
+        """The lookup function and data_types of each provider that can be used (that has its API key, if any)."""
+        return {
+            provider: (function, data_types) for provider, (function, data_types, api_key) in PROVIDERS.items()
+            if api_key is None or self.scanner.api_keys.get(api_key)}
+
+    def _find_hashes(self, unfurl_instance):
+        return [(node.data_type, node.value) for node in unfurl_instance.nodes.values()
+                if isinstance(node.data_type, str) and node.data_type.startswith('hash.')]
+
+    def find_hashes(self, items) -> dict:
+        """Unfurl items (without remote lookups), returning the set of distinct hashes to look up by provider."""
+        hashes = collections.defaultdict(set)
+        providers = self.providers
+        for item in dict.fromkeys(items):
+            for data_type, value in batch.unfurl_one(self.scanner, item, self.data_type, self._find_hashes):
+                for provider, (_, data_types) in providers.items():
+                    if data_type in data_types and value not in self._resolved[provider]:
+                        hashes[provider].add(value)
+        return hashes
+
+    def resolve(self, provider, hashes) -> None:
+        """Look up hashes with provider, as many at once as the lookup thread pool allows, saving the results."""
+        function, _ = self.providers[provider]
+        quota = self.quotas.get(provider)
+        futures = {}
+        for hash_value in sorted(hashes):
+            self._resolved[provider].add(hash_value)
+            if not self.lookup_cache.refresh and \
+                    self.lookup_cache.get(provider, hash_value, default=_NOT_FOUND) is not _NOT_FOUND:
+                self.counts['cached'] += 1
+                continue
+            if quota is not None and not quota.take(provider, self.lookup_cache):
+                self.counts['over_quota'] += 1
+                if provider not in self._over_quota:
+                    self._over_quota.add(provider)
+                    log.warning(f'Not looking up any more hashes with {provider} today; its quota is used up')
+                continue
+            futures[lookups.get_lookup_executor().submit(function, self.scanner, hash_value)] = hash_value
+
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # Not saved, so the hash is looked up again when it's unfurled (or in a later batch)
+                self.counts['failed'] += 1
+                if quota is not None:
+                    quota.give_back(provider, self.lookup_cache)
+                log.warning(f'{provider} lookup for {futures[future]} failed: {e}')
+                continue
+            self.counts['looked_up'] += 1
+            self.lookup_cache.put(provider, futures[future], result)
+
+    def prefetch(self, items):
+        """Yield items unchanged, after looking up the hashes in each window of them."""
+        items = iter(items)
+        while window := list(itertools.islice(items, self.window)):
+            if not self.lookup_cache.offline:
+                for provider, hashes in self.find_hashes(window).items():
+                    self.counts['hashes'] += len(hashes)
+                    self.resolve(provider, hashes)
+            yield from window
+
+
+def prefetch_hash_lookups(items, unfurl_items, batcher):
+    """Unfurl items with unfurl_items (like batch.unfurl_serially()), looking up their hashes with batcher first."""
+    return unfurl_items(batcher.prefetch(items))
@@ -0,0 +1,181 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import logging
+import threading
+import time
+import urllib.parse
+
+import requests
+
+log = logging.getLogger(__name__)
+
+# How many requests can be made to one host per second (on average), and how many can be made at once
+# before that limit kicks in
+DEFAULT_REQUESTS_PER_SECOND = 5
+DEFAULT_BURST = 10
+
+# How many requests to a host in a row can time out or fail to connect before requests to it are stopped,
+# and for how long (in seconds) they are stopped
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_COOLDOWN = 300
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+# The errors that mean a host is down or unreachable (rather than that it answered with an error)
+HOST_FAILURES = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+
+class HostUnavailableError(requests.exceptions.ConnectionError):
+    """A request wasn't made, since the host has failed too many times recently (its circuit breaker is open)."""
+
+
+class TokenBucket:
+    """Limits how often something can be done: up to burst times at once, then rate times per second."""
+
+    def __init__(self, rate=DEFAULT_REQUESTS_PER_SECOND, burst=DEFAULT_BURST, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = burst
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token, returning how many seconds to wait before using it (0 if one is free now)."""
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Tokens can go negative; each caller waits its turn for the ones taken before it to refill
+            self.tokens -= 1
+            return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self) -> float:
+        """Take a token, sleeping until it can be used. Returns how long that was."""
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    """Stops requests to a host that keeps timing out or refusing connections.
+
+    After failure_threshold failures in a row the breaker opens, and requests aren't made for cooldown
+    seconds. Then one trial request is let through (the breaker is half-open); if it works, the breaker
+    closes and requests carry on as normal, and if not it opens again for another cooldown.
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, cooldown=DEFAULT_COOLDOWN,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.counts = collections.Counter()
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a request can be made now. If it can, record_success() or record_failure() must follow."""
+        with self._lock:
+            if self.state == OPEN and self.clock() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+            if self.state == CLOSED or (self.state == HALF_OPEN and not self._trial_running):
+                self._trial_running = self.state == HALF_OPEN
+                return True
+            self.counts['short_circuited'] += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._trial_running = False
+            self.state = CLOSED
+
+    def record_failure(self) -> bool:
+        """Count a failed request; returns True if that opened the breaker."""
+        with self._lock:
+            self.failures += 1
+            self.counts['failures'] += 1
+            self._trial_running = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                opened = self.state != OPEN
+                self.state = OPEN
+                self.opened_at = self.clock()
+                if opened:
+                    self.counts['opened'] += 1
+                return opened
+            return False
+
+
+class HostLimits:
+    """A TokenBucket and a CircuitBreaker for each host that requests are made to (see HttpClient.request())."""
+
+    def __init__(self, requests_per_second=DEFAULT_REQUESTS_PER_SECOND, burst=DEFAULT_BURST,
+                 failure_threshold=DEFAULT_FAILURE_THRESHOLD, cooldown=DEFAULT_COOLDOWN):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.buckets = {}
+        self.breakers = {}
+        self._lock = threading.Lock()
+
+    def _get(self, host):
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            with self._lock:
+                if host not in self.breakers:
+                    self.buckets[host] = TokenBucket(self.requests_per_second, self.burst)
+                    self.breakers[host] = CircuitBreaker(self.failure_threshold, self.cooldown)
+                breaker = self.breakers[host]
+        return self.buckets[host], breaker
+
+    def call(self, url, function, *args, **kwargs):
+        """Return function(*args, **kwargs), a request to url, once the host's rate limit allows it.
+
+        Raises HostUnavailableError (without calling function) if the host's circuit breaker is open.
+        """
+        host = (urllib.parse.urlsplit(url).hostname or '').lower()
+        bucket, breaker = self._get(host)
+        if not breaker.allow():
+            raise HostUnavailableError(f'Not requesting {url}; {host} has failed too often recently')
+        if self.requests_per_second:
+            bucket.acquire()
+        try:
+            result = function(*args, **kwargs)
+        except HOST_FAILURES:
+            if breaker.record_failure():
+                log.warning(f'Stopped requests to {host} for {breaker.cooldown}s, after it failed '
+                            f'{breaker.failures} times in a row')
+            raise
+        except Exception:
+            # Anything else (like a malformed response) still means the host is up
+            breaker.record_success()
+            raise
+        breaker.record_success()
+        return result
+
+    def stats(self) -> dict:
+        """The state of each host's circuit breaker that has failed at least once, by host."""
+        return {
+            host: {'state': breaker.state, **breaker.counts}
+            for host, breaker in sorted(self.breakers.items()) if breaker.counts['failures']}
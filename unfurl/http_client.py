@@ -0,0 +1,158 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from unfurl import host_limits
+from unfurl import lookups
+
+log = logging.getLogger(__name__)
+
+# Seconds to wait to connect to a server, and then for it to respond
+DEFAULT_TIMEOUT = 3
+
+# How many more times to try a request that got one of RETRY_STATUSES back, and one that couldn't connect.
+# Connecting is only tried once by default, so a host that's down only costs one timeout.
+DEFAULT_RETRIES = 2
+DEFAULT_CONNECT_RETRIES = 0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Only requests that are safe to send twice are retried
+RETRY_METHODS = Retry.DEFAULT_ALLOWED_METHODS
+
+# How many connections to keep open to each host; as many as there can be remote lookups at once
+DEFAULT_POOL_SIZE = lookups.DEFAULT_MAX_WORKERS
+
+_http_client = None
+_http_client_settings = None
+_http_client_lock = threading.Lock()
+
+
+class HttpClient:
+    """The HTTP client the parsers use for remote lookups (as unfurl.http).
+
+    It wraps one requests.Session, so connections to each host are pooled and kept alive between lookups,
+    rather than a new connection (and TLS handshake) being made for every one. Requests that get a server
+    error or 429 back (and, if connect_retries is set, ones that can't connect) are retried with a short
+    backoff, if they're idempotent (like GETs, but not POSTs). Every request has a timeout unless the parser
+    gives its own.
+
+    Requests to each host are rate limited, and a host that keeps timing out or refusing connections is left
+    alone for a while (see host_limits.HostLimits); requests to it raise HostUnavailableError meanwhile,
+    rather than each waiting out the timeout again. Its host_limits.stats() show how each host has fared.
+
+    It's safe to share between threads (remote lookups run in a thread pool). For tests, anything with the
+    same get() and post() methods (like a Mock) can be used instead; see Unfurl(http=...).
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, pool_size=DEFAULT_POOL_SIZE,
+                 proxies=None, limits=None, connect_retries=DEFAULT_CONNECT_RETRIES):
+        self.timeout = timeout
+        self.host_limits = limits if limits is not None else host_limits.HostLimits()
+        self.session = self._make_session(pool_size, proxies, Retry(
+            total=None, connect=connect_retries, read=0, redirect=0, other=0, status=retries,
+            status_forcelist=RETRY_STATUSES, allowed_methods=RETRY_METHODS, backoff_factor=0.3,
+            raise_on_status=False, raise_on_redirect=False))
+        # urllib3 retries connection errors whatever the method, so other requests use a session that never retries
+        self.single_try_session = self._make_session(pool_size, proxies, 0)
+
+    @staticmethod
+    def _make_session(pool_size, proxies, retries):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if proxies:
+            session.proxies.update(proxies)
+        return session
+
+    @classmethod
+    def from_config(cls, config):
+        """Make an HttpClient with the settings in the [HTTP] section of unfurl.ini (a ConfigParser), if any."""
+        if not config.has_section('HTTP'):
+            return cls()
+        section = config['HTTP']
+        proxies = {
+            scheme: section.get(f'{scheme}_proxy') for scheme in ('http', 'https') if section.get(f'{scheme}_proxy')}
+        limits = host_limits.HostLimits(
+            requests_per_second=section.getfloat('requests_per_second', host_limits.DEFAULT_REQUESTS_PER_SECOND),
+            burst=section.getint('burst', host_limits.DEFAULT_BURST),
+            failure_threshold=section.getint('failure_threshold', host_limits.DEFAULT_FAILURE_THRESHOLD),
+            cooldown=section.getfloat('cooldown', host_limits.DEFAULT_COOLDOWN))
+        return cls(
+            timeout=section.getfloat('timeout', DEFAULT_TIMEOUT), retries=section.getint('retries', DEFAULT_RETRIES),
+            connect_retries=section.getint('connect_retries', DEFAULT_CONNECT_RETRIES), proxies=proxies,
+            limits=limits)
+
+    def request(self, method, url, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        session = self.session if method.upper() in RETRY_METHODS else self.single_try_session
+        return self.host_limits.call(url, session.request, method, url, **kwargs)
+
+    def get(self, url, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+        self.single_try_session.close()
+
+
+def raise_for_failure(response) -> None:
+    """Raise requests.HTTPError if response means the lookup failed this time (it was rate limited, or the
+    server had an error), rather than that there's nothing to find; a lookup that raises isn't cached."""
+    if response.status_code == 429 or response.status_code >= 500:
+        response.raise_for_status()
+
+
+def _settings(config):
+    return tuple(sorted(config['HTTP'].items())) if config is not None and config.has_section('HTTP') else ()
+
+
+def get_http_client(config=None) -> HttpClient:
+    """Return the process-wide HttpClient, making it on first use with the settings from config, if given.
+
+    If config's [HTTP] settings are different from the ones the client was made with, a new client is made
+    with them (and returned from then on); the old one keeps working for whatever is still using it. With no
+    config, the current client is returned, whatever its settings.
+    """
+    global _http_client, _http_client_settings
+    settings = _settings(config) if config is not None else _http_client_settings
+    if _http_client is None or settings != _http_client_settings:
+        with _http_client_lock:
+            # Another thread may have made it while we waited on the lock
+            if _http_client is None or settings != _http_client_settings:
+                _http_client = HttpClient.from_config(config) if config is not None else HttpClient()
+                _http_client_settings = _settings(config)
+    return _http_client
+
+
+def _forget_http_client():
+    # A forked worker process (see batch.unfurl_in_parallel()) mustn't share the parent's open connections
+    global _http_client, _http_client_settings, _http_client_lock
+    _http_client = None
+    _http_client_settings = None
+    _http_client_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_http_client)
@@ -0,0 +1,72 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+
+log = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    log.info('orjson not installed; using the (slower) json module for JSON Lines output.')
+
+# How much output to collect before writing it out
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+
+def dumps(record) -> bytes:
+    """Serialize record as one line of compact JSON (with a trailing newline).
+
+    Anything JSON can't represent (like bytes) is written as its str().
+    """
+    if orjson:
+        try:
+            return orjson.dumps(record, default=str, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            # Like integers too big for 64 bits, which the json module can handle
+            pass
+    return json.dumps(record, default=str, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+class JsonLinesWriter:
+    """Writes records to a binary file (or stdout's buffer) as JSON Lines, one compact JSON object per line.
+
+    Lines are collected in a buffer and written in large chunks, so writing doesn't slow down big batches.
+    """
+
+    def __init__(self, binary_file, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.output = binary_file
+        self.buffer = bytearray()
+        self.buffer_size = buffer_size
+        self.records_written = 0
+
+    def write(self, record) -> None:
+        self.buffer += dumps(record)
+        self.records_written += 1
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.buffer:
+            self.output.write(self.buffer)
+            self.buffer.clear()
+        self.output.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
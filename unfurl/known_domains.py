@@ -0,0 +1,389 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import array
+import importlib.metadata
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import types
+
+import unfurl
+from pymispwarninglists import WarningLists
+
+log = logging.getLogger(__name__)
+
+# The known domain lists are expensive to load (every MISP warning list is parsed from disk), but they never
+# change during a run. Load them once per process, on first use, and share them between all Unfurl instances.
+_known_domains = None
+_known_domains_lock = threading.Lock()
+
+# The lists can instead be compiled ahead of time (with "unfurl snapshot") into a snapshot file that is
+# memory-mapped at runtime. These describe that file's layout; see compile_snapshot() for details.
+SNAPSHOT_MAGIC = b'UNFURLDS'
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_HEADER = '<8sII'
+
+
+def summarize_hits(lists_found_in: list) -> list:
+    """Turn the lists a domain was found in into the hits Unfurl displays.
+
+    The many "Top N sites" lists are collapsed into a single popularity hit (using the most popular tier
+    the domain appears in); all other lists are returned as-is.
+    """
+    return_list = []
+    for found in lists_found_in:
+        if not found['name'].startswith(('Top', 'google-chrome-crux-1million')):
+            return_list.append(found)
+
+    top_found = [x['name'] for x in lists_found_in if str(x['name']).startswith('Top')]
+    top_1k = [x for x in top_found if x.startswith(('Top 1000', 'Top 500 '))]
+    top_10k = [x for x in top_found if x.startswith(('Top 10 000', 'Top 10K'))]
+    top_1m = [x for x in top_found if x.startswith(('Top 1,000,000', 'Top 20 000', 'google-chrome-crux-1million'))]
+
+    if top_1k:
+        return_list.append({'name': 'Domain is extremely popular (found in "Top 1000" lists)',
+                            'description': f'Domain is found in {len(top_1k)} lists: {", ".join(top_1k)}'})
+
+    elif top_10k:
+        return_list.append({'name': 'Domain is very popular (found in "Top 10K" lists)',
+                            'description': f'Domain is found in {len(top_10k)} lists: {", ".join(top_10k)}'})
+
+    elif top_1m:
+        return_list.append({'name': 'Domain is popular (found in "Top 1M" lists)',
+                            'description': f'Domain is found in {len(top_1m)} lists: {", ".join(top_1m)}'})
+
+    return return_list
+
+
+class KnownDomains:
+    """Read-only collection of the "known domain" lists (MISP warning lists) Unfurl checks domains against.
+
+    Instances are shared across Unfurl instances and threads, so nothing here should be modified after
+    construction. Use refresh_known_domains() to swap in a freshly-loaded copy instead.
+
+    Lookups go through an inverted index (domain -> the set of lists it is on), built on the first search.
+    Each distinct set of lists is stored as a bitmask, and the hits for every bitmask (with the popularity
+    tier already worked out) are computed up front, so a search is a dict lookup regardless of how many
+    lists there are.
+    """
+
+    def __init__(self, warning_lists: dict):
+        self.warning_lists = types.MappingProxyType(warning_lists)
+        self._domain_index = None
+        self._memberships = None
+        self._index_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.warning_lists)
+
+    def build_domain_index(self) -> tuple[dict, dict]:
+        """Build the inverted index over all the lists.
+
+        Returns a dict of domain -> membership bitmask, and a dict of bitmask -> (list keys, hits).
+        """
+        # Give the biggest lists the lowest bits. Most domains are only on the big "Top N" lists, so their
+        # bitmasks stay small enough to be Python's cached small ints (rather than millions of new objects).
+        by_size = sorted(self.warning_lists, key=lambda list_key: len(self.warning_lists[list_key].list),
+                         reverse=True)
+        list_bits = {list_key: 1 << bit for bit, list_key in enumerate(by_size)}
+
+        domain_index = {}
+        for list_key in by_size:
+            bit = list_bits[list_key]
+            get_membership = domain_index.get
+            for domain in self.warning_lists[list_key].list:
+                domain_index[domain] = get_membership(domain, 0) | bit
+
+        # Resolve each distinct membership to its lists and hits, keeping the lists in their original order
+        memberships = {}
+        for membership in set(domain_index.values()):
+            list_keys = tuple(list_key for list_key in self.warning_lists if membership & list_bits[list_key])
+            lists_found_in = [
+                {'name': self.warning_lists[list_key].name, 'description': self.warning_lists[list_key].description}
+                for list_key in list_keys]
+            memberships[membership] = (list_keys, tuple(summarize_hits(lists_found_in)))
+
+        log.info(f'Indexed {len(domain_index)} known domains ({len(memberships)} distinct list memberships)')
+        return domain_index, memberships
+
+    def _lookup(self, domain: str) -> tuple | None:
+        if self._domain_index is None:
+            with self._index_lock:
+                if self._domain_index is None:
+                    self._domain_index, self._memberships = self.build_domain_index()
+
+        return self._memberships.get(self._domain_index.get(domain))
+
+    def search(self, domain: str) -> list:
+        """Return the known domain list hits for a domain (an empty list if it isn't on any)."""
+        membership = self._lookup(domain)
+        if not membership:
+            return []
+        # Copy the hits so callers can't change the shared index
+        return [dict(hit) for hit in membership[1]]
+
+    def lists_containing(self, domain: str) -> tuple:
+        """Return the keys of every list the domain is on (without collapsing the "Top N" lists)."""
+        membership = self._lookup(domain)
+        if not membership:
+            return ()
+        return membership[0]
+
+
+class SnapshotKnownDomains(KnownDomains):
+    """KnownDomains backed by a compiled snapshot file (see compile_snapshot), instead of the MISP lists.
+
+    The snapshot is memory-mapped rather than read in, so opening it is nearly free, and processes that
+    open the same file (like forked workers) share one copy of it in memory. Domains are found with a
+    binary search over the snapshot's sorted domain table.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, format_version, meta_length = struct.unpack_from(SNAPSHOT_HEADER, self._mmap)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f'{path} is not an Unfurl domain snapshot')
+        if format_version != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f'{path} is snapshot format v{format_version}; expected v{SNAPSHOT_FORMAT_VERSION}')
+
+        header_size = struct.calcsize(SNAPSHOT_HEADER)
+        self.meta = json.loads(self._mmap[header_size:header_size + meta_length])
+        if self.meta.get('versions') != snapshot_versions():
+            raise ValueError(f'{path} was built with different versions of Unfurl or its domain lists '
+                             f'({self.meta.get("versions")}); rebuild it with "unfurl snapshot"')
+
+        self._memberships = [(tuple(m['lists']), tuple(m['hits'])) for m in self.meta['memberships']]
+        self._domain_count = self.meta['domain_count']
+        self._strings_offset = self._section_bounds('domain_strings')[0]
+        self._string_offsets = self._section_view('domain_offsets', 'I')
+        self._membership_ids = self._section_view('domain_memberships', self.meta['membership_typecode'])
+        self._warning_lists = None
+        self._index_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.meta['lists'])
+
+    @property
+    def warning_lists(self):
+        # Lookups don't need the original lists, so only load them (slowly) if something asks for them
+        if self._warning_lists is None:
+            with self._index_lock:
+                if self._warning_lists is None:
+                    self._warning_lists = build_known_domains().warning_lists
+        return self._warning_lists
+
+    def _section_bounds(self, name: str) -> tuple[int, int]:
+        offset, length = self.meta['sections'][name]
+        return offset, offset + length
+
+    def _section_view(self, name: str, typecode: str) -> memoryview:
+        start, end = self._section_bounds(name)
+        return memoryview(self._mmap)[start:end].cast(typecode)
+
+    def _lookup(self, domain: str) -> tuple | None:
+        try:
+            key = domain.encode('utf-8')
+        except (AttributeError, UnicodeEncodeError):
+            return None
+
+        strings, base, offsets = self._mmap, self._strings_offset, self._string_offsets
+        low, high = 0, self._domain_count
+        while low < high:
+            middle = (low + high) // 2
+            candidate = strings[base + offsets[middle]:base + offsets[middle + 1]]
+            if candidate < key:
+                low = middle + 1
+            elif candidate > key:
+                high = middle
+            else:
+                return self._memberships[self._membership_ids[middle]]
+        return None
+
+    def psl_lines(self) -> list:
+        """The Public Suffix List rules compiled into the snapshot."""
+        start, end = self._section_bounds('psl')
+        return self._mmap[start:end].decode('utf-8').splitlines()
+
+
+def build_known_domains() -> KnownDomains:
+    """Load the MISP warning lists from disk and apply Unfurl's adjustments to them."""
+    warning_lists_dict = WarningLists().warninglists
+
+    # This list has some values I think may confuse users (t.co, drive.google.com, etc), as most things on
+    # those domains are not security blog-related, so I'm removing it.
+    warning_lists_dict.pop('List of known security providers/vendors blog domain', 1)
+    warning_lists_dict.pop('OSINT.DigitalSide.IT Warning List', 1)
+
+    # And the capitalization was bothering me, so fixing it here.
+    warning_lists_dict['List of known google domains'].name = 'List of known Google domains'
+    warning_lists_dict['List of known microsoft domains'].name = 'List of known Microsoft domains'
+
+    log.info(f'Loaded {len(warning_lists_dict)} known domain lists')
+    return KnownDomains(warning_lists_dict)
+
+
+def snapshot_versions() -> dict:
+    """Versions a snapshot was built from; a snapshot is only used if these match what is installed."""
+    versions = {'unfurl': unfurl.__version__}
+    for package in ('pymispwarninglists', 'publicsuffix2'):
+        try:
+            versions[package] = importlib.metadata.version(package)
+        except importlib.metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def default_snapshot_path() -> str:
+    """Where "unfurl snapshot" writes the snapshot, and where Unfurl looks for it.
+
+    Can be overridden with the UNFURL_DOMAIN_SNAPSHOT environment variable.
+    """
+    if os.environ.get('UNFURL_DOMAIN_SNAPSHOT'):
+        return os.environ['UNFURL_DOMAIN_SNAPSHOT']
+    cache_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_dir, 'unfurl', 'domains.snapshot')
+
+
+def compile_snapshot(path: str | None = None) -> str:
+    """Compile the known domain lists and the Public Suffix List into a snapshot file at path.
+
+    Layout: a fixed header, a JSON metadata block (versions, list names, each distinct list membership
+    with its pre-computed hits, and where each section starts), then 8-byte-aligned sections:
+      - domain_strings: every known domain (UTF-8), sorted and concatenated
+      - domain_offsets: uint32 offsets into domain_strings (one per domain, plus the end)
+      - domain_memberships: the membership id of each domain
+      - psl: the Public Suffix List rules, as text
+    """
+    path = path or default_snapshot_path()
+    known = build_known_domains()
+    domain_index, memberships = known.build_domain_index()
+
+    membership_ids = {membership: membership_id for membership_id, membership in enumerate(memberships)}
+    membership_typecode = 'H' if len(membership_ids) <= 0xFFFF else 'I'
+
+    encoded_domains = sorted((domain.encode('utf-8', errors='surrogatepass'), membership)
+                             for domain, membership in domain_index.items())
+
+    domain_strings = bytearray()
+    domain_offsets = array.array('I', [0])
+    domain_memberships = array.array(membership_typecode)
+    for encoded_domain, membership in encoded_domains:
+        domain_strings += encoded_domain
+        domain_offsets.append(len(domain_strings))
+        domain_memberships.append(membership_ids[membership])
+
+    try:
+        import publicsuffix2
+        with open(publicsuffix2.PSL_FILE, 'rb') as f:
+            psl = f.read()
+    except ImportError:
+        log.warning('Unable to import publicsuffix2; the snapshot will not include the Public Suffix List.')
+        psl = b''
+
+    sections = {
+        'domain_strings': bytes(domain_strings),
+        'domain_offsets': domain_offsets.tobytes(),
+        'domain_memberships': domain_memberships.tobytes(),
+        'psl': psl,
+    }
+
+    meta = {
+        'versions': snapshot_versions(),
+        'domain_count': len(encoded_domains),
+        'membership_typecode': membership_typecode,
+        'lists': [{'key': list_key, 'name': known_list.name, 'description': known_list.description}
+                  for list_key, known_list in known.warning_lists.items()],
+        'memberships': [{'lists': list(list_keys), 'hits': list(hits)} for list_keys, hits in memberships.values()],
+        'sections': {},
+    }
+
+    # The section offsets are stored in the metadata, which comes before the sections, so its length
+    # depends on the offsets. Lay it out with a generous size estimate and pad the metadata to fit.
+    header_size = struct.calcsize(SNAPSHOT_HEADER)
+    meta_length = len(json.dumps(meta).encode('utf-8')) + 64 * len(sections) + 64
+    offset = _align(header_size + meta_length)
+    for name, data in sections.items():
+        meta['sections'][name] = [offset, len(data)]
+        offset = _align(offset + len(data))
+    encoded_meta = json.dumps(meta).encode('utf-8').ljust(meta_length)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(struct.pack(SNAPSHOT_HEADER, SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, meta_length))
+        f.write(encoded_meta)
+        for name, data in sections.items():
+            f.seek(meta['sections'][name][0])
+            f.write(data)
+        f.truncate(offset)
+    # Replace any existing snapshot in one step, so a running process never sees a half-written file
+    os.replace(temp_path, path)
+
+    log.info(f'Compiled domain snapshot ({len(encoded_domains)} domains) to {path}')
+    return path
+
+
+def _align(offset: int, alignment: int = 8) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def open_snapshot(path: str | None = None) -> SnapshotKnownDomains | None:
+    """Open the domain snapshot at path (or the default location), if there is a usable one."""
+    path = path or default_snapshot_path()
+    if not os.path.isfile(path):
+        return None
+    try:
+        return SnapshotKnownDomains(path)
+    except (OSError, ValueError, KeyError, struct.error) as e:
+        log.warning(f'Not using domain snapshot: {e}')
+        return None
+
+
+def load_known_domains() -> KnownDomains:
+    """Load the known domains from the compiled snapshot if there is a usable one, or from the MISP lists."""
+    snapshot = open_snapshot()
+    if snapshot:
+        log.info(f'Using domain snapshot {snapshot.path}')
+        return snapshot
+    return build_known_domains()
+
+
+def get_known_domains() -> KnownDomains:
+    """Return the process-wide KnownDomains, loading it on first use."""
+    global _known_domains
+    if _known_domains is None:
+        with _known_domains_lock:
+            # Another thread may have finished loading while we waited on the lock
+            if _known_domains is None:
+                _known_domains = load_known_domains()
+    return _known_domains
+
+
+def refresh_known_domains() -> KnownDomains:
+    """Reload the known domains (from the snapshot or the MISP lists) and make them the process-wide copy.
+
+    Lookups already in progress keep using the copy they started with; new lookups see the new one.
+    """
+    global _known_domains
+    new_known_domains = load_known_domains()
+    with _known_domains_lock:
+        _known_domains = new_known_domains
+    return new_known_domains
@@ -0,0 +1,231 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+DAY = 24 * 60 * 60
+
+# How long (in seconds) a remote lookup's result is reused, by provider (the first part of submit_lookup()'s
+# cache_as). Providers not listed use DEFAULT_TTL.
+DEFAULT_TTLS = {
+    'shortlink': 30 * DAY,
+    'nitrxgen': 30 * DAY,
+    'virustotal': DAY,
+    'bluesky.handle': DAY,
+    'bluesky.plc_created': 30 * DAY,
+    'google_kg': 30 * DAY,
+    # Seed and peer counts change all the time
+    'magnet.trackers': 60 * 60,
+}
+DEFAULT_TTL = DAY
+
+# How long to reuse a lookup that found nothing (like a 404, or a shortlink that didn't redirect), if that's
+# less than the provider's TTL
+DEFAULT_NEGATIVE_TTL = DAY
+
+_NOT_FOUND = object()
+_lookup_caches = {}
+_lookup_caches_lock = threading.Lock()
+
+
+def default_lookup_cache_path() -> str:
+    """Where the lookup cache is kept, unless another path is given.
+
+    Can be overridden with the UNFURL_LOOKUP_CACHE environment variable.
+    """
+    if os.environ.get('UNFURL_LOOKUP_CACHE'):
+        return os.environ['UNFURL_LOOKUP_CACHE']
+    cache_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_dir, 'unfurl', 'lookups.sqlite')
+
+
+class LookupCache:
+    """The results of remote lookups (like expanding a shortlink, or looking up a hash on VirusTotal), saved in
+    a SQLite database so the same lookup isn't made again, in this run or a later one, until it expires.
+
+    Results are stored by the provider (like 'shortlink' or 'virustotal') and a key for the request (like the
+    shortlink or the hash), and kept for that provider's TTL (see DEFAULT_TTLS). A lookup that found nothing
+    is kept too, for DEFAULT_NEGATIVE_TTL at most. Lookups that fail (raise an exception) aren't kept.
+
+    If offline is True, only saved results are used; lookups that aren't in the cache aren't made (and find
+    nothing). If refresh is True, saved results are ignored; every lookup is made again, and its result saved.
+    Providers in prefetched are treated as offline either way, as their lookups have already been made in bulk
+    (see hash_lookups.HashLookupBatcher).
+
+    One LookupCache can be used from many threads (remote lookups are run in a thread pool), and in worker
+    processes (the database is opened again in each).
+    """
+
+    def __init__(self, path: str | None = None, ttls=None, negative_ttl=DEFAULT_NEGATIVE_TTL, offline=False,
+                 refresh=False, prefetched=()):
+        self.path = path or default_lookup_cache_path()
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.negative_ttl = negative_ttl
+        self.offline = offline
+        self.refresh = refresh
+        self.prefetched = frozenset(prefetched)
+        self.counts = collections.Counter()
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+
+    def __getstate__(self):
+        # The connection and lock can't be sent to another process; they're made again there on first use
+        state = dict(self.__dict__, _connection=None, _connection_pid=None)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # Called with the lock held. A forked process mustn't use its parent's connection.
+        if self._connection is None or self._connection_pid != os.getpid():
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._connection_pid = os.getpid()
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS lookups (provider TEXT NOT NULL, key TEXT NOT NULL, '
+                'result TEXT NOT NULL, expires REAL NOT NULL, PRIMARY KEY (provider, key))')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS daily_usage (provider TEXT NOT NULL, day TEXT NOT NULL, '
+                'used INTEGER NOT NULL, PRIMARY KEY (provider, day))')
+        return self._connection
+
+    def get(self, provider, key, default=None):
+        """The saved (and unexpired) result of the lookup, or default if there isn't one."""
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT result FROM lookups WHERE provider = ? AND key = ? AND expires > ?',
+                (provider, str(key), time.time())).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def put(self, provider, key, result) -> bool:
+        """Save the result of the lookup. Returns False if it can't be saved (in JSON)."""
+        try:
+            serialized_result = json.dumps(result)
+        except (TypeError, ValueError):
+            log.debug(f'Not caching {provider} lookup for {key}; the result can not be saved as JSON')
+            return False
+        ttl = self.ttls.get(provider, DEFAULT_TTL)
+        if not result:
+            ttl = min(ttl, self.negative_ttl)
+        with self._lock:
+            self._connect().execute(
+                'INSERT OR REPLACE INTO lookups (provider, key, result, expires) VALUES (?, ?, ?, ?)',
+                (provider, str(key), serialized_result, time.time() + ttl))
+        return True
+
+    def lookup(self, provider, key, function, *args):
+        """Return the saved result of the lookup if there is one; otherwise, return function(*args) and save it."""
+        if not self.refresh or provider in self.prefetched:
+            result = self.get(provider, key, default=_NOT_FOUND)
+            if result is not _NOT_FOUND:
+                self.counts['hits'] += 1
+                return result
+
+        if provider in self.prefetched:
+            self.counts['not_prefetched'] += 1
+            log.debug(f'Skipped {provider} lookup for {key}; it was not looked up beforehand')
+            return None
+
+        if self.offline:
+            self.counts['offline'] += 1
+            log.debug(f'Skipped {provider} lookup for {key}; it is not in the lookup cache and unfurl is offline')
+            return None
+
+        result = function(*args)
+        self.counts['misses'] += 1
+        self.put(provider, key, result)
+        return result
+
+    def use_daily_quota(self, provider, per_day) -> bool:
+        """Count one more lookup with provider today (the UTC date), unless per_day have been made already.
+        Returns whether it was counted. The count is kept in the database, so it carries over between runs (and
+        processes) using the same cache."""
+        if per_day <= 0:
+            return False
+        today = datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+        with self._lock:
+            return self._connect().execute(
+                'INSERT INTO daily_usage (provider, day, used) VALUES (?, ?, 1) '
+                'ON CONFLICT (provider, day) DO UPDATE SET used = used + 1 WHERE used < ?',
+                (provider, today, per_day)).rowcount == 1
+
+    def return_daily_quota(self, provider) -> None:
+        """Uncount one of today's lookups with provider (counted with use_daily_quota()), as it failed."""
+        today = datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+        with self._lock:
+            self._connect().execute(
+                'UPDATE daily_usage SET used = used - 1 WHERE provider = ? AND day = ? AND used > 0',
+                (provider, today))
+
+    def daily_usage(self, provider) -> int:
+        """How many lookups have been counted with use_daily_quota() for provider today (the UTC date)."""
+        today = datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT used FROM daily_usage WHERE provider = ? AND day = ?', (provider, today)).fetchone()
+        return row[0] if row else 0
+
+    def with_prefetched(self, providers):
+        """A copy of this cache (using the same database and counts) that also treats providers as prefetched, for
+        the Unfurl instances in one batch; this one is left as it is."""
+        copy = LookupCache(self.path, ttls=self.ttls, negative_ttl=self.negative_ttl, offline=self.offline,
+                           refresh=self.refresh, prefetched=self.prefetched | set(providers))
+        copy.counts = self.counts
+        return copy
+
+    def remove_expired(self) -> int:
+        """Delete the results that have expired. Returns how many there were."""
+        today = datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+        with self._lock:
+            self._connect().execute('DELETE FROM daily_usage WHERE day < ?', (today,))
+            return self._connect().execute('DELETE FROM lookups WHERE expires <= ?', (time.time(),)).rowcount
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute('SELECT COUNT(*) FROM lookups').fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def get_lookup_cache(path: str | None = None) -> LookupCache:
+    """Return the process-wide LookupCache for path (or the default path), opening it on first use."""
+    path = path or default_lookup_cache_path()
+    lookup_cache = _lookup_caches.get(path)
+    if lookup_cache is None:
+        with _lookup_caches_lock:
+            # Another thread may have opened it while we waited on the lock
+            lookup_cache = _lookup_caches.get(path)
+            if lookup_cache is None:
+                lookup_cache = _lookup_caches[path] = LookupCache(path)
+    return lookup_cache
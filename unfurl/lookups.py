@@ -0,0 +1,117 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import concurrent.futures
+import logging
+import os
+import threading
+
+from unfurl import host_limits
+
+log = logging.getLogger(__name__)
+
+# How many remote lookups can be in progress at once (across all Unfurl instances in the process)
+DEFAULT_MAX_WORKERS = 8
+
+# Once there is nothing left to parse, how long (in seconds) to wait for the remote lookups that are still going
+DEFAULT_MAX_WAIT = 10
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_lookup_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """Return the process-wide thread pool that remote lookups are run in, starting it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            # Another thread may have started it while we waited on the lock
+            if _executor is None:
+                _executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=DEFAULT_MAX_WORKERS, thread_name_prefix='unfurl-lookup')
+    return _executor
+
+
+def _forget_executor():
+    # A forked worker process (see batch.unfurl_in_parallel()) doesn't get the parent's threads
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_executor)
+
+
+class LookupScheduler:
+    """The remote lookups (like expanding a shortlink) started while unfurling one graph.
+
+    Parsers submit() a lookup function and a callback, and carry on. The lookup is run in a thread pool, so
+    Unfurl keeps parsing the rest of the graph while it waits on the network. The callback is run with the
+    lookup's result in Unfurl's own thread (by run_completed(), between nodes), so callbacks can add to the
+    queue like a parser would.
+
+    Once nothing else is left to parse, Unfurl waits for the remaining lookups, for up to max_wait seconds in
+    all; any still going after that are abandoned (see Unfurl.parse_queue()).
+    """
+
+    def __init__(self, max_wait=DEFAULT_MAX_WAIT):
+        self.max_wait = max_wait
+        self.pending = {}
+        self.counts = collections.Counter()
+        # How many lookups failed, were skipped or were abandoned, since this was last set back to 0 (by
+        # Unfurl.reset_graph_state()); a graph with any is missing their results
+        self.incomplete = 0
+
+    def submit(self, function, *args, callback) -> concurrent.futures.Future:
+        """Run function(*args) in the thread pool; when it's done, callback(its result) is run by run_completed()."""
+        future = get_lookup_executor().submit(function, *args)
+        self.pending[future] = callback
+        self.counts['submitted'] += 1
+        return future
+
+    def run_completed(self, timeout=0) -> int:
+        """Run the callbacks of the lookups that are done, waiting up to timeout seconds for at least one.
+
+        Returns how many callbacks were run. A lookup or callback that raises an exception is logged and skipped;
+        so is a lookup that wasn't made since its host is failing (see host_limits), but just in the debug log.
+        """
+        if not self.pending:
+            return 0
+        done, _ = concurrent.futures.wait(
+            self.pending, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            callback = self.pending.pop(future)
+            try:
+                callback(future.result())
+                self.counts['completed'] += 1
+            except host_limits.HostUnavailableError as e:
+                self.counts['skipped'] += 1
+                self.incomplete += 1
+                log.debug(f'Skipped remote lookup {callback}: {e}')
+            except Exception as e:
+                self.counts['failed'] += 1
+                self.incomplete += 1
+                log.exception(f'Exception in remote lookup {callback}: {e}')
+        return len(done)
+
+    def abandon(self) -> None:
+        """Forget the lookups that are still going; their results (if they ever come) are ignored."""
+        for future in self.pending:
+            future.cancel()
+            self.counts['abandoned'] += 1
+            self.incomplete += 1
+            log.warning(f'Gave up waiting on remote lookup {self.pending[future]}')
+        self.pending.clear()
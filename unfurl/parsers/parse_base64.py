@@ -12,9 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import base64
-from unfurl import utils
-
 b64_edge = {
     'color': {
         'color': '#2C63FF'
@@ -26,35 +23,23 @@ b64_edge = {
 
 def run(unfurl, node):
 
-    if not isinstance(node.value, str):
+    shape = node.shape
+    if not shape.is_str:
         return False
 
-    if len(node.value) % 4 == 1:
+    if shape.length_mod_4 == 1:
         # A valid b64 string will not be this length
         return False
 
     if node.data_type == 'url.query.pair' and node.key == 'dns':
         return False
 
-    urlsafe_b64_m = utils.urlsafe_b64_re.fullmatch(node.value)
-    standard_b64_m = utils.standard_b64_re.fullmatch(node.value)
-    long_int_m = utils.long_int_re.fullmatch(node.value)
-    all_letters_m = utils.letters_re.fullmatch(node.value)
-
     # Long integers and normal words pass the b64 regex, but we don't want those here.
     # It's technically valid base64, but to reduce false positives we're filtering them out.
-    if long_int_m or all_letters_m:
-        return
-
-    decoded = None
-    padded_value = unfurl.add_b64_padding(node.value)
-    if not padded_value:
+    if shape.is_long_int or shape.is_letters:
         return
 
-    if urlsafe_b64_m:
-        decoded = base64.urlsafe_b64decode(padded_value)
-    elif standard_b64_m:
-        decoded = base64.b64decode(padded_value)
+    decoded = shape.b64_decoded
 
     if decoded == node.value or not decoded:
         return
@@ -21,6 +21,9 @@ bing_edge = {
 }
 
 
+accepts = {'data_types': ['url.query.pair']}
+
+
 def run(unfurl, node):
     if node.data_type == 'url.query.pair':
         if 'bing' in unfurl.find_preceding_domain(node):
@@ -13,11 +13,12 @@
 # limitations under the License.
 
 import base64
+import functools
 from typing import Union
 import re
-import requests
 
 import unfurl
+from unfurl import http_client
 import logging
 log = logging.getLogger(__name__)
 
@@ -68,7 +69,8 @@ def parse_bluesky_tid(unfurl: unfurl.core.Unfurl, node: unfurl.core.Unfurl.Node)
 def resolve_bsky_handle_to_did(unfurl: unfurl.core.Unfurl, handle: str) -> str | None:
     if not unfurl.remote_lookups:
         return None
-    r = requests.get(f'https://bsky.social/xrpc/com.atproto.identity.resolveHandle?handle={handle}', timeout=3)
+    r = unfurl.http.get(f'https://bsky.social/xrpc/com.atproto.identity.resolveHandle?handle={handle}')
+    http_client.raise_for_failure(r)
     if r.status_code == 200 and r.content and r.json().get('did'):
         return r.json()['did']
     else:
@@ -85,10 +87,24 @@ def add_resolved_did_node(unfurl: unfurl.core.Unfurl, node: unfurl.core.Unfurl.N
         parent_id=node.node_id, incoming_edge_config=bluesky_edge)
 
 
+def add_created_node(unfurl: unfurl.core.Unfurl, node: unfurl.core.Unfurl.Node, created) -> None:
+    if created and isinstance(created, str):
+        unfurl.add_to_queue(
+            data_type='timestamp.iso8601', key='createdAt', value=created, label=f'Created at {created}',
+            hover='The audit log for DIDs on plc.directory contains "createdAt" timestamps.',
+            parent_id=node.node_id, incoming_edge_config=bluesky_edge)
+
+
+def add_resolved_did_node_if_found(unfurl: unfurl.core.Unfurl, node: unfurl.core.Unfurl.Node, did) -> None:
+    if did and isinstance(did, str):
+        add_resolved_did_node(unfurl, node, did)
+
+
 def get_did_plc_audit_log_values(unfurl: unfurl.core.Unfurl, did: str, record_index: int = None, field: str = None) -> Union[str, dict, False]:
     if not unfurl.remote_lookups:
         return False
-    r = requests.get(f'https://plc.directory/{did}/log/audit', timeout=3)
+    r = unfurl.http.get(f'https://plc.directory/{did}/log/audit')
+    http_client.raise_for_failure(r)
     if r.status_code == 200:
         if record_index is not None and field:
             return r.json()[record_index][field]
@@ -108,12 +124,11 @@ def run(unfurl: unfurl.core.Unfurl, node: unfurl.core.Unfurl.Node) -> None:
         did_plc_value = node.value
         if node.data_type == 'did.plc':
             did_plc_value = f'did:plc:{node.value}'
-        created = get_did_plc_audit_log_values(unfurl, did_plc_value, record_index=0, field='createdAt')
-        if created and isinstance(created, str):
-            unfurl.add_to_queue(
-                data_type='timestamp.iso8601', key='createdAt', value=created, label=f'Created at {created}',
-                hover='The audit log for DIDs on plc.directory contains "createdAt" timestamps.',
-                parent_id=node.node_id, incoming_edge_config=bluesky_edge)
+        if unfurl.remote_lookups:
+            unfurl.submit_lookup(
+                get_did_plc_audit_log_values, unfurl, did_plc_value, 0, 'createdAt',
+                callback=functools.partial(add_created_node, unfurl, node),
+                cache_as=('bluesky.plc_created', did_plc_value))
 
     # On bsky.app, handles have a predictable location in URLs. If a URL starts with https://bsky.app/profile,
     # the next URL path segment should be a Bluesky "handle" (or DID). We can resolve this handle to the backing
@@ -124,16 +139,19 @@ def run(unfurl: unfurl.core.Unfurl, node: unfurl.core.Unfurl.Node) -> None:
             if re.fullmatch(tid_re, node.value):
                 parse_bluesky_tid(unfurl, node)
             elif node.key == 2 and unfurl.check_sibling_nodes(node, data_type='url.path.segment', key=1, value='profile'):
-                did = resolve_bsky_handle_to_did(unfurl, node.value)
-                if did and isinstance(did, str):
-                    add_resolved_did_node(unfurl, node, did)
+                if unfurl.remote_lookups:
+                    unfurl.submit_lookup(
+                        resolve_bsky_handle_to_did, unfurl, node.value,
+                        callback=functools.partial(add_resolved_did_node_if_found, unfurl, node),
+                        cache_as=('bluesky.handle', node.value))
 
     # If it's the "root" node and in a format we recognize related to Bluesky, parse it.
     # This case covers someone parsing just an ID or handle, not a full URL.
     elif node.node_id == 1:
         if re.fullmatch(tid_re, node.value):
             parse_bluesky_tid(unfurl, node)
-        elif node.value.endswith('.bsky.social'):
-            did = resolve_bsky_handle_to_did(unfurl, node.value)
-            if did and isinstance(did, str):
-                add_resolved_did_node(unfurl, node, did)
+        elif node.value.endswith('.bsky.social') and unfurl.remote_lookups:
+            unfurl.submit_lookup(
+                resolve_bsky_handle_to_did, unfurl, node.value,
+                callback=functools.partial(add_resolved_did_node_if_found, unfurl, node),
+                cache_as=('bluesky.handle', node.value))
@@ -23,6 +23,9 @@ brave_edge = {
 }
 
 
+accepts = {'data_types': ['url.query.pair', 'url.path']}
+
+
 def run(unfurl, node):
     if unfurl.preceding_domain_matches(node, 'search.brave.com'):
         if node.data_type == 'url.query.pair':
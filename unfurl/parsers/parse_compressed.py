@@ -12,7 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import base64
 import re
 import zlib
 from unfurl import utils
@@ -56,27 +55,16 @@ def run(unfurl, node):
     # This checks for base64 encoding, which is often used before compression. Initially, the base64 decoding was
     # in parse_base64.py, but the intermediary node seemed like not useful clutter. I moved it here and combined
     # the parser into b64+zlib
-    if len(node.value) % 4 == 1:
+    shape = node.shape
+    if shape.length_mod_4 == 1:
         # A valid b64 string will not be this length
         return False
 
-    urlsafe_b64_m = utils.urlsafe_b64_re.fullmatch(node.value)
-    standard_b64_m = utils.standard_b64_re.fullmatch(node.value)
-    long_int_m = utils.long_int_re.fullmatch(node.value)
-
     # Long integers pass the b64 regex, but we don't want those here.
-    if long_int_m:
-        return
-
-    decoded = None
-    padded_value = unfurl.add_b64_padding(node.value)
-    if not padded_value:
+    if shape.is_long_int:
         return
 
-    if urlsafe_b64_m:
-        decoded = base64.urlsafe_b64decode(unfurl.add_b64_padding(node.value))
-    elif standard_b64_m:
-        decoded = base64.b64decode(unfurl.add_b64_padding(node.value))
+    decoded = shape.b64_decoded
 
     if decoded == node.value or not decoded:
         return
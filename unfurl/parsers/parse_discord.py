@@ -66,11 +66,14 @@ def parse_discord_snowflake(unfurl, node):
         parent_id=node.node_id, incoming_edge_config=discord_edge)
 
 
+accepts = {'data_types': ['url.path.segment']}
+
+
 def run(unfurl, node):
 
     # Known patterns from main Discord site
     discord_domains = ['discordapp.com', 'discordapp.net', 'discord.com']
-    if any(unfurl.preceding_domain_matches(node, d) for d in discord_domains):
+    if unfurl.preceding_domain_matches_any(node, discord_domains):
         if node.data_type == 'url.path.segment':
             # Viewing a channel on a server
             # Ex: https://discordapp.com/channels/427876741990711298/551531058039095296
@@ -46,6 +46,9 @@ DNS_MESSAGE_FIELDS = {
 }
 
 
+accepts = {'data_types': ['url.query.pair', 'dns.section']}
+
+
 def run(unfurl, node):
     if node.data_type == 'url.query.pair' and node.key == 'dns':
         try:
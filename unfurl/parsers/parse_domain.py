@@ -15,11 +15,15 @@
 import urllib.parse
 import warnings
 
+from unfurl import known_domains
 from unfurl import utils
 
 try:
     from publicsuffix2 import PublicSuffixList
-    psl = PublicSuffixList(idna=False)
+    # If there is a compiled domain snapshot, use the Public Suffix List rules from it, so they
+    # match the known domain lists it was compiled with.
+    domain_snapshot = known_domains.open_snapshot()
+    psl = PublicSuffixList(psl_file=domain_snapshot.psl_lines() if domain_snapshot else None, idna=False)
 except ImportError:
     warnings.warn("Unable to import the nodule 'publicsuffix2'. "
                   "Will be unable to parse domain names.")
@@ -35,6 +39,9 @@ urlparse_edge = {
 }
 
 
+accepts = {'data_types': ['url.domain', 'url.hostname']}
+
+
 def run(unfurl, node):
     if node.data_type == 'url.domain':
         hits_in_known_lists = unfurl.search_known_domain_lists(node.value)
@@ -22,6 +22,9 @@ dropbox_edge = {
 }
 
 
+accepts = {'data_types': ['url.path', 'url.query.pair']}
+
+
 def run(unfurl, node):
     # References: https://www.atropos4n6.com/cloud-forensics/artifacts-of-dropbox-usage-on-windows-10-part-2/
     if unfurl.preceding_domain_matches(node, 'dropbox.com'):
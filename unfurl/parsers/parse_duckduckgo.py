@@ -21,6 +21,9 @@ duckduckgo = {
 }
 
 
+accepts = {'data_types': ['url.query.pair']}
+
+
 def run(unfurl, node):
     # Some URL parameters are from https://duckduckgo.com/params
     if node.data_type == 'url.query.pair':
@@ -239,6 +239,9 @@ def parse_fbclid(unfurl, node):
             incoming_edge_config=facebook_edge)
 
 
+accepts = {'data_types': ['url.query.pair']}
+
+
 def run(unfurl, node):
     if node.data_type == 'url.query.pair' and node.key == 'fbclid':
         parse_fbclid(unfurl, node)
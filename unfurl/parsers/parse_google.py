@@ -205,6 +205,10 @@ def parse_rlz(rlz_string):
 
     return rlz
 
+
+accepts = {'data_types': ['url.query.pair', 'google.*']}
+
+
 def run(unfurl, node):
     if node.data_type == 'url.query.pair' and unfurl.preceding_domain_contains(node, 'google'):
 
@@ -12,7 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import requests
+import functools
+from unfurl import http_client
 from unfurl import utils
 
 hash_edge = {
@@ -31,20 +32,30 @@ hash_lookup_edge = {
     'label': '#'
 }
 
+NITRXGEN_URL = 'https://www.nitrxgen.net/md5db/'
+VIRUSTOTAL_URL = 'https://www.virustotal.com/api/v3/files/'
 
-def nitrxgen_md5_lookup(value):
-    response = requests.get(f'https://www.nitrxgen.net/md5db/{value}', verify=False, timeout=3).text
 
-    if response:
-        return response
+def nitrxgen_md5_lookup(unfurl, value):
+    response = unfurl.http.get(f'{NITRXGEN_URL}{value}', verify=False)
+    # An error page from being rate limited or a server error isn't the plaintext (and mustn't be cached as it)
+    http_client.raise_for_failure(response)
+
+    if response.text:
+        return response.text
     else:
         return False
 
 
 def virustotal_lookup(unfurl, hash_value):
 
-    response = requests.get(f'https://www.virustotal.com/api/v3/files/{hash_value}',
-                            headers={'x-apikey': unfurl.api_keys.get('virustotal')}, timeout=3)
+    response = unfurl.http.get(f'{VIRUSTOTAL_URL}{hash_value}',
+                               headers={'x-apikey': unfurl.api_keys.get('virustotal')})
+
+    # Not found is an answer (and can be cached), but anything else (like being over quota) is a failure
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
 
     if response.status_code == 200:
         try:
@@ -54,6 +65,34 @@ def virustotal_lookup(unfurl, hash_value):
             return False
 
 
+def add_plaintext_node(unfurl, node, hash_plaintext):
+    if hash_plaintext:
+        unfurl.add_to_queue(
+            data_type=f'text', key='Plaintext',
+            value=hash_plaintext,
+            hover='Queried Nitrxgen database of MD5 hashes and found a matching plaintext value',
+            parent_id=node.node_id, incoming_edge_config=hash_lookup_edge)
+
+
+def add_virustotal_node(unfurl, node, vt_results):
+    if vt_results:
+        label_text = 'Hash found on VirusTotal'
+        if vt_results.get("type_description"):
+            label_text += f'\nFile Type: {vt_results.get("type_description")};'
+
+        if vt_results.get("meaningful_name"):
+            label_text += f'\nName: {vt_results.get("meaningful_name")};'
+
+        if vt_results.get("reputation"):
+            label_text += f'\nReputation: {vt_results.get("reputation")};'
+
+        unfurl.add_to_queue(
+            data_type=f'text', key='Hash found on VirusTotal',
+            value=None, label=label_text,
+            hover='Queried VirusTotal with the hash value and found a match.',
+            parent_id=node.node_id, incoming_edge_config=hash_lookup_edge)
+
+
 def decode_cisco_type_7(encoded_text):
     cisco_constant = b"dsfd;kfoA,.iyewrkldJKDHSUBsgvca69834ncxv9873254k;fg87"
     try:
@@ -90,42 +129,25 @@ def run(unfurl, node):
 
     if node.data_type.startswith('hash'):
         if node.data_type == 'hash.md5' and unfurl.remote_lookups:
-            hash_plaintext = nitrxgen_md5_lookup(node.value)
-
-            if hash_plaintext:
-                unfurl.add_to_queue(
-                    data_type=f'text', key='Plaintext',
-                    value=hash_plaintext,
-                    hover='Queried Nitrxgen database of MD5 hashes and found a matching plaintext value',
-                    parent_id=node.node_id, incoming_edge_config=hash_lookup_edge)
-
-        if node.data_type in ('hash.md5', 'hash.sha-1', 'hash.sha-256') and unfurl.remote_lookups:
-            vt_results = virustotal_lookup(unfurl, node.value)
-            if vt_results:
-                label_text = 'Hash found on VirusTotal'
-                if vt_results.get("type_description"):
-                    label_text += f'\nFile Type: {vt_results.get("type_description")};'
+            unfurl.submit_lookup(
+                nitrxgen_md5_lookup, unfurl, node.value, callback=functools.partial(add_plaintext_node, unfurl, node),
+                cache_as=('nitrxgen', node.value))
 
-                if vt_results.get("meaningful_name"):
-                    label_text += f'\nName: {vt_results.get("meaningful_name")};'
-
-                if vt_results.get("reputation"):
-                    label_text += f'\nReputation: {vt_results.get("reputation")};'
-
-                unfurl.add_to_queue(
-                    data_type=f'text', key='Hash found on VirusTotal',
-                    value=None, label=label_text,
-                    hover='Queried VirusTotal with the hash value and found a match.',
-                    parent_id=node.node_id, incoming_edge_config=hash_lookup_edge)
+        # VirusTotal needs an API key; without one, the lookup would only fail (and that failure be cached)
+        if node.data_type in ('hash.md5', 'hash.sha-1', 'hash.sha-256') and unfurl.remote_lookups and \
+                unfurl.api_keys.get('virustotal'):
+            unfurl.submit_lookup(
+                virustotal_lookup, unfurl, node.value, callback=functools.partial(add_virustotal_node, unfurl, node),
+                cache_as=('virustotal', node.value))
 
     else:
-        if not isinstance(node.value, str):
+        shape = node.shape
+        if not shape.is_str:
             return
 
         # Filter for values that are only hex chars (A-F,0-9) and contains both a letter and number.
         # This could conceivably filter out valid hashes, but will filter out many more invalid values.
-        if not (utils.hex_re.fullmatch(node.value) and
-                utils.digits_re.search(node.value) and utils.letters_re.search(node.value)):
+        if not (shape.is_hex and shape.has_digits and shape.has_letters):
             return
 
         # Cisco "Type 7" password encoding is very flexible, so detecting it is very false positive prone
@@ -23,6 +23,9 @@ b64_edge = {
 }
 
 
+accepts = {'root': True}
+
+
 def run(unfurl, node):
 
     if node.node_id != 1 or not isinstance(node.value, str):
@@ -82,6 +82,9 @@ def parse_instagram_id(unfurl, node, media_id):
         parent_id=node.node_id, incoming_edge_config=instagram_edge)
 
 
+accepts = {'data_types': ['instagram.shortcode', 'instagram.story_id']}
+
+
 def run(unfurl, node):
     if node.data_type == 'instagram.shortcode':
         media_id = shortcode_to_media_id(str(node.value))
@@ -26,6 +26,9 @@ urlparse_edge = {
 }
 
 
+accepts = {'data_types': ['url.hostname']}
+
+
 def run(unfurl, node):
 
     if node.data_type == 'url.hostname':
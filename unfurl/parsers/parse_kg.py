@@ -12,10 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
 import logging
 import os
-
 import requests
+from unfurl import http_client
 
 log = logging.getLogger(__name__)
 
@@ -28,26 +29,21 @@ kg_edge = {
 }
 
 
-def run(unfurl, node):
-    if not unfurl.remote_lookups or not isinstance(node.value, str):
-        return
-
-    if not node.value.startswith(('/m/', '/g/')):
-        return
-
-    api_key = unfurl.api_keys.get('google_kg', os.environ.get('google_kg'))
-    if not api_key:
-        log.warning('No API key for Google Knowledge Graph; skipping lookup.')
-        return
-
+def knowledge_graph_lookup(unfurl, ids, api_key):
+    # Network errors are raised (so the lookup isn't cached), as are being rate limited and server errors
+    response = unfurl.http.get(
+        'https://kgsearch.googleapis.com/v1/entities:search', params={'ids': ids, 'limit': 10, 'key': api_key})
     try:
-        response = requests.get(
-            'https://kgsearch.googleapis.com/v1/entities:search',
-            params={'ids': node.value, 'limit': 10, 'key': api_key}, timeout=3)
         response.raise_for_status()
-        response = response.json()
-    except Exception as e:
+    except requests.exceptions.HTTPError as e:
+        http_client.raise_for_failure(response)
         log.warning(f'Google Knowledge Graph lookup failed: {e}')
+        return {}
+    return response.json()
+
+
+def add_knowledge_graph_nodes(unfurl, node, response):
+    if not response:
         return
 
     for element in response.get('itemListElement', []):
@@ -60,3 +56,20 @@ def run(unfurl, node):
                 data_type='google.knowledge_graph', key='Name', value=value_text,
                 hover='Value was retrieved from the Google Knowledge Graph', parent_id=node.node_id,
                 incoming_edge_config=kg_edge)
+
+
+def run(unfurl, node):
+    if not unfurl.remote_lookups or not isinstance(node.value, str):
+        return
+
+    if not node.value.startswith(('/m/', '/g/')):
+        return
+
+    api_key = unfurl.api_keys.get('google_kg', os.environ.get('google_kg'))
+    if not api_key:
+        log.warning('No API key for Google Knowledge Graph; skipping lookup.')
+        return
+
+    unfurl.submit_lookup(
+        knowledge_graph_lookup, unfurl, node.value, api_key,
+        callback=functools.partial(add_knowledge_graph_nodes, unfurl, node), cache_as=('google_kg', node.value))
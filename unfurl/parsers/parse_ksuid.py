@@ -57,10 +57,10 @@ def run(unfurl, node):
             parent_id=node.node_id, incoming_edge_config=ksuid_edge)
 
     else:
-        m = re.match(r'([a-zA-Z0-9]{27})', str(node.value))
+        m = re.match(r'([a-zA-Z0-9]{27})', node.shape.text)
         if m and len(node.value) == 27:
             # If timestamp component between 2014 and 2027
-            if '090000l1tmebfs0000000000000' < str(node.value) < '3WgEPTl1tmebfsQzFP4bxwgy80V':
+            if '090000l1tmebfs0000000000000' < node.shape.text < '3WgEPTl1tmebfsQzFP4bxwgy80V':
                 unfurl.add_to_queue(
                     data_type='ksuid', key=None, value=node.value, label=f'KSUID: {node.value}',
                     hover='KSUID are identifiers that are comprised of a timestamp and a random number. '
@@ -82,6 +82,9 @@ def parse_linkedin_message_id_v2(unfurl, node):
             parent_id=node.node_id, incoming_edge_config=linkedin_edge)
 
 
+accepts = {'data_types': ['url.path.segment', 'url.query.pair'], 'root': True}
+
+
 def run(unfurl, node):
     if unfurl.preceding_domain_matches(node, 'linkedin.com'):
         # Parsing LinkedIn Profile ID from the default Profile Page URL
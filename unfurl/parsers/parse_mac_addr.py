@@ -50,8 +50,8 @@ def run(unfurl, node):
                 parent_id=node.node_id, incoming_edge_config=uuid_edge)
 
     else:
-        long_int = utils.long_int_re.fullmatch(str(node.value))
-        m = utils.mac_addr_re.fullmatch(str(node.value))
+        long_int = node.shape.is_long_int
+        m = utils.mac_addr_re.fullmatch(node.shape.text)
         if m and not long_int:
             u = m.group('mac_addr')
 
@@ -12,9 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
 import json
-import requests
 import torf
+from unfurl import http_client
 
 magnet_edge = {
     'color': {
@@ -60,12 +61,11 @@ xt_hash_types = {
            '<br>Supported by G2 (Gnutella2), such hashes are vulnerable to hash collision attacks.',
 }
 
-def check_tracker_statuses(magnet_url):
-    try:
-        r = requests.get('https://checker.openwebtorrent.com/check', params={'magnet': magnet_url},
-                         allow_redirects=False, timeout=3)
-    except requests.exceptions.RequestException:
-        return {}
+def check_tracker_statuses(unfurl, magnet_url):
+    # Network errors, being rate limited and server errors are raised, so they aren't cached as "no statuses"
+    r = unfurl.http.get('https://checker.openwebtorrent.com/check', params={'magnet': magnet_url},
+                        allow_redirects=False)
+    http_client.raise_for_failure(r)
 
     if r.status_code == 200:
         statuses = {}
@@ -79,6 +79,33 @@ def check_tracker_statuses(magnet_url):
     else:
         return {}
 
+def add_tracker_status_node(unfurl, node, status):
+    status_string = ''
+    if status.get('error'):
+        status_string = f'\n⚠️ Error - {status["error"]}'
+    if 'seeds' in status:
+        status_string += f'\n🔺Seeds: {status["seeds"]} '
+    if 'peers' in status:
+        status_string += f'\n🔻Peers: {status["peers"]}'
+
+    unfurl.add_to_queue(
+        data_type='descriptor', key='Tracker Status', value=status_string,
+        parent_id=node.node_id, incoming_edge_config=magnet_edge)
+
+
+def add_tracker_statuses(unfurl, tracker_statuses):
+    if not tracker_statuses:
+        return
+
+    unfurl.add_to_stash('tracker_statuses', tracker_statuses)
+
+    # The statuses come back from the remote lookup while the graph is being parsed; trackers parsed after this
+    # get their status from the stash (in run()), but the ones already parsed need it added now.
+    for tracker_node in list(unfurl.nodes.values()):
+        if tracker_node.data_type == 'magnet.tr.tracker' and tracker_statuses.get(tracker_node.value):
+            add_tracker_status_node(unfurl, tracker_node, tracker_statuses[tracker_node.value])
+
+
 def run(unfurl, node):
     if node.data_type == 'magnet.tr.list':
         for node_item in node.value:
@@ -90,17 +117,7 @@ def run(unfurl, node):
         if unfurl.stash.get('tracker_statuses'):
             status = unfurl.stash['tracker_statuses'].get(node.value)
             if status:
-                status_string = ''
-                if status.get('error'):
-                    status_string = f'\n⚠️ Error - {status["error"]}'
-                if 'seeds' in status:
-                    status_string += f'\n🔺Seeds: {status["seeds"]} '
-                if 'peers' in status:
-                    status_string += f'\n🔻Peers: {status["peers"]}'
-
-                unfurl.add_to_queue(
-                    data_type='descriptor', key='Tracker Status', value=status_string,
-                    parent_id=node.node_id, incoming_edge_config=magnet_edge)
+                add_tracker_status_node(unfurl, node, status)
 
     elif node.data_type.startswith('magnet') and node.data_type.endswith('list'):
         for node_item in node.value:
@@ -166,5 +183,6 @@ def run(unfurl, node):
                         parent_id=node.node_id, incoming_edge_config=magnet_edge)
 
             if unfurl.remote_lookups:
-                tracker_statuses = check_tracker_statuses(node.value)
-                unfurl.add_to_stash('tracker_statuses', tracker_statuses)
+                unfurl.submit_lookup(
+                    check_tracker_statuses, unfurl, node.value,
+                    callback=functools.partial(add_tracker_statuses, unfurl), cache_as=('magnet.trackers', node.value))
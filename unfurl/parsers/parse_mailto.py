@@ -19,6 +19,9 @@ mailto_edge = {
 }
 
 
+accepts = {'data_types': ['url', 'mailto.email.multiple']}
+
+
 def run(unfurl, node):
     if node.data_type == 'url' and node.value.startswith('mailto:'):
 
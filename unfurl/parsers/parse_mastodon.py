@@ -21,7 +21,7 @@ mastodon_edge = {
 }
 # Mastodon by nature is federated and there are many, many domains hosting instances.
 # This list was built from instances.social & https://coxy.co/mastodon/.
-mastodon_domains = [
+mastodon_domains = frozenset([
     '101010.pl',
     'anticapitalist.party',
     'appdot.net',
@@ -257,7 +257,7 @@ mastodon_domains = [
     'wue.social',
     'xoxo.zone',
     'yesterweb.org'
-]
+])
 
 
 def parse_mastodon_snowflake(unfurl, node):
@@ -287,9 +287,12 @@ def parse_mastodon_snowflake(unfurl, node):
          parent_id=node.node_id, incoming_edge_config=mastodon_edge)
 
 
+accepts = {'data_types': ['url.path.segment']}
+
+
 def run(unfurl, node):
     # Check if node is a child of a known mastodon domain
-    if node.data_type == 'url.path.segment' and any(unfurl.preceding_domain_matches(node, d) for d in mastodon_domains):
+    if node.data_type == 'url.path.segment' and unfurl.preceding_domain_matches_any(node, mastodon_domains):
         # Check if the URL segment value is an integer & Mastodon timestamp would be between 2015-01 and 2030-01
         if unfurl.check_if_int_between(node.value, 93065733734400000, 124089536413761540):
             parse_mastodon_snowflake(unfurl, node)
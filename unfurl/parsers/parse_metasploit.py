@@ -110,6 +110,9 @@ platforms = {
 }
 
 
+accepts = {'data_types': ['url.path']}
+
+
 def run(unfurl, node):
     # Decoding a Metasploit Shellcode URL
     # Code is based off Didier's Stevens work:
@@ -30,7 +30,7 @@ def run(unfurl, node):
     if not node.data_type.startswith('mongo'):
         # MongoDB ObjectIDs are exactly 24 hex characters (12 bytes).
         # Leading '/' is optional to handle URL path segments.
-        m = re.fullmatch(r'/?([0-9A-F]{24})', str(node.value), re.IGNORECASE)
+        m = re.fullmatch(r'/?([0-9A-F]{24})', node.shape.text, re.IGNORECASE)
         if m:
             oid = m.group(1).lower()
             # First 4 bytes are a Unix timestamp; filter to MongoDB's lifespan (2009 onward)
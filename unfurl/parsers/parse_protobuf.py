@@ -12,14 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import base64
 import json
 import logging
 import os
 
 import blackboxprotobuf
 from google.protobuf import json_format
-from unfurl import utils
 from unfurl.parsers.proto import proto_registry, enum_registry
 
 log = logging.getLogger(__name__)
@@ -256,22 +254,20 @@ def run(unfurl, node):
     if skip:
         return
 
-    if len(node.value) % 4 == 1:
+    shape = node.shape
+    if shape.length_mod_4 == 1:
         # A valid b64 string will not be this length
         return False
 
     if node.data_type.startswith(('uuid', 'hash')):
         return False
 
-    urlsafe_b64_m = utils.urlsafe_b64_re.fullmatch(node.value)
-    standard_b64_m = utils.standard_b64_re.fullmatch(node.value)
-    hex_m = utils.hex_re.fullmatch(node.value)
     # Updating to all letters/digits and forward slashes, to catch URL paths that may,
     # by some chance, validly decode as protobuf, but really aren't.
-    all_digits_m = utils.digits_and_slash_re.fullmatch(node.value)
-    all_letters_m = utils.letters_and_slash_re.fullmatch(node.value)
+    if shape.is_digits_and_slash or shape.is_letters_and_slash:
+        return
 
-    if hex_m and not (all_digits_m or all_letters_m):
+    if shape.is_hex:
         decoded = bytes.fromhex(node.value)
         if context and decode_with_compiled_proto(unfurl, node, decoded, context, hex_proto_edge):
             return
@@ -284,10 +280,9 @@ def run(unfurl, node):
         except Exception:
             return
 
-    elif urlsafe_b64_m and not (all_digits_m or all_letters_m):
-        try:
-            decoded = base64.urlsafe_b64decode(unfurl.add_b64_padding(node.value))
-        except Exception:
+    elif shape.is_urlsafe_b64 or shape.is_standard_b64:
+        decoded = shape.b64_decoded
+        if not decoded:
             return
         if context and decode_with_compiled_proto(unfurl, node, decoded, context, b64_proto_edge):
             return
@@ -300,18 +295,3 @@ def run(unfurl, node):
         except Exception:
             return
 
-    elif standard_b64_m and not (all_digits_m or all_letters_m):
-        try:
-            decoded = base64.b64decode(unfurl.add_b64_padding(node.value))
-        except Exception:
-            return
-        if context and decode_with_compiled_proto(unfurl, node, decoded, context, b64_proto_edge):
-            return
-        try:
-            protobuf_values, protobuf_values_types = blackboxprotobuf.decode_message(decoded)
-            parse_protobuf_into_nodes(protobuf_values, protobuf_values_types, b64_proto_edge, context)
-            return
-
-        # This will often fail for a wide array of reasons when it tries to parse a non-pb as a pb
-        except Exception:
-            return
@@ -12,11 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import requests
+import functools
 import json
 import os
 
 from bs4 import BeautifulSoup
+from unfurl import http_client
+from unfurl import known_domains
 
 
 shortlink_edge = {
@@ -28,21 +30,23 @@ shortlink_edge = {
 }
   
 
-def expand_bitly_url(bitlink_id, api_key):
+def expand_bitly_url(unfurl, bitlink_id, api_key):
     # Ref: https://dev.bitly.com/v4/
 
-    r = requests.post(
+    r = unfurl.http.post(
         'https://api-ssl.bitly.com/v4/expand',
         data=json.dumps({'bitlink_id': f'bit.ly/{bitlink_id.rstrip("/")}'}),
         headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {api_key}'})
+    http_client.raise_for_failure(r)
 
     if r.status_code == 200:
         return r.json()
     else:
         return {}
 
-def parse_linkedin_slink_url(shortcode):
-    r = requests.get(url=f'https://www.linkedin.com/slink?code={shortcode}', timeout=3)
+def parse_linkedin_slink_url(unfurl, shortcode):
+    r = unfurl.http.get(f'https://www.linkedin.com/slink?code={shortcode}')
+    http_client.raise_for_failure(r)
     soup = BeautifulSoup(r.content, 'html.parser')
     link = soup.select_one("main a.artdeco-button")
     if link.get('href'):
@@ -50,16 +54,19 @@ def parse_linkedin_slink_url(shortcode):
     return {}
 
 
-def expand_vdg_url(shortcode):
+def expand_vdg_url(unfurl, shortcode):
     # Ref: https://v.gd/apilookupreference.php
-    r = requests.get(url='https://v.gd/forward.php', params={'shorturl': shortcode, 'format': 'json'}, timeout=3)
+    r = unfurl.http.get('https://v.gd/forward.php', params={'shorturl': shortcode, 'format': 'json'})
+    http_client.raise_for_failure(r)
     if r.status_code == 200:
         return r.json().get('url')
     return {}
 
 
-def expand_url_via_redirect_header(base_url, shortcode):
-    r = requests.get(f'{base_url}{shortcode.rstrip("/")}', allow_redirects=False, timeout=3)
+def expand_url_via_redirect_header(unfurl, base_url, shortcode):
+    r = unfurl.http.get(f'{base_url}{shortcode.rstrip("/")}', allow_redirects=False)
+    # No redirect is an answer (and can be cached), but being rate limited or a server error isn't
+    http_client.raise_for_failure(r)
 
     if r.status_code in [301, 302, 303, 307, 308]:
         return r.headers['Location']
@@ -67,6 +74,47 @@ def expand_url_via_redirect_header(base_url, shortcode):
         return {}
 
 
+def add_expanded_url(unfurl, node, hover):
+    # A callback for submit_lookup() that adds the expanded URL (if the lookup found one) as a child of node
+    def add_expanded_url_node(expanded_url):
+        if expanded_url:
+            unfurl.add_to_queue(
+                data_type='url', key=None, value=expanded_url,
+                label=f'Expanded URL: {expanded_url}', hover=hover,
+                parent_id=node.node_id, incoming_edge_config=shortlink_edge)
+    return add_expanded_url_node
+
+
+def add_bitly_nodes(unfurl, node, expanded_info):
+    if not expanded_info:
+        return
+
+    node.hover = 'Bitly Short Links can be expanded via the Bitly API to show the ' \
+                 '"long" URL and the creation time of the short-link.' \
+                 '<a href="https://dev.bitly.com/v4/#operation/expandBitlink" ' \
+                 'target="_blank">[ref]</a>'
+
+    if expanded_info['created_at'].endswith('+0000'):
+        expanded_info['created_at'] = expanded_info['created_at'][:-5]
+
+    if expanded_info['created_at'][10] == 'T':
+        expanded_info['created_at'] = f'{expanded_info["created_at"][:10]} {expanded_info["created_at"][11:]}'
+
+    unfurl.add_to_queue(
+        data_type='description', key=None, value=expanded_info['created_at'],
+        label=f'Creation Time:\n{expanded_info["created_at"]}',
+        hover='Short-link creation time, retrieved from Bitly API',
+        parent_id=node.node_id, incoming_edge_config=shortlink_edge)
+
+    unfurl.add_to_queue(
+        data_type='url', key=None, value=expanded_info['long_url'],
+        label=f'Expanded URL: {expanded_info["long_url"]}', hover='Expanded URL, retrieved from Bitly API',
+        parent_id=node.node_id, incoming_edge_config=shortlink_edge)
+
+
+accepts = {'data_types': ['url.query.pair', 'url.path.segment', 'url.path']}
+
+
 def run(unfurl, node):
     if not unfurl.remote_lookups:
         return
@@ -78,78 +126,46 @@ def run(unfurl, node):
     # this works.
     if node.data_type == 'url.query.pair' and node.key == 'code':
         if unfurl.preceding_domain_matches(node, 'linkedin.com'):
-            expanded_url = parse_linkedin_slink_url(node.value)
-            if expanded_url:
-                unfurl.add_to_queue(
-                    data_type='url', key=None, value=expanded_url,
-                    label=f'Expanded URL: {expanded_url}',
-                    hover='Expanded URL, retrieved from linkedin.com via "Location" header',
-                    parent_id=node.node_id, incoming_edge_config=shortlink_edge)
+            unfurl.submit_lookup(
+                parse_linkedin_slink_url, unfurl, node.value, callback=add_expanded_url(
+                    unfurl, node, hover='Expanded URL, retrieved from linkedin.com via "Location" header'),
+                cache_as=('shortlink', f'https://www.linkedin.com/slink?code={node.value}'))
             return
 
     # Substack inserts a redirect
     if 'substack.com' == preceding_domain and node.key == 2 and \
             unfurl.check_sibling_nodes(node, data_type='url.path.segment', key=1, value='redirect'):
-        expanded_url = expand_url_via_redirect_header('https://substack.com/redirect/', node.value)
-
-        if expanded_url:
-            unfurl.add_to_queue(
-                data_type='url', key=None, value=expanded_url,
-                label=f'Expanded URL: {expanded_url}',
-                hover=f'Expanded URL, retrieved from {preceding_domain} via "Location" header',
-                parent_id=node.node_id, incoming_edge_config=shortlink_edge)
+        unfurl.submit_lookup(
+            expand_url_via_redirect_header, unfurl, 'https://substack.com/redirect/', node.value,
+            callback=add_expanded_url(
+                unfurl, node, hover=f'Expanded URL, retrieved from {preceding_domain} via "Location" header'),
+            cache_as=('shortlink', f'https://substack.com/redirect/{node.value}'))
 
     if node.data_type != 'url.path':
         return
 
     if 'lnkd.in' == preceding_domain:
-        expanded_url = parse_linkedin_slink_url(node.value[1:])
-        if expanded_url:
-            unfurl.add_to_queue(
-                data_type='url', key=None, value=expanded_url,
-                label=f'Expanded URL: {expanded_url}',
-                hover='Expanded URL, retrieved from linkedin.com via redirect page',
-                parent_id=node.node_id, incoming_edge_config=shortlink_edge)
+        unfurl.submit_lookup(
+            parse_linkedin_slink_url, unfurl, node.value[1:], callback=add_expanded_url(
+                unfurl, node, hover='Expanded URL, retrieved from linkedin.com via redirect page'),
+            cache_as=('shortlink', f'https://lnkd.in{node.value}'))
         return
 
     if 'v.gd' == preceding_domain:
-        expanded_url = expand_vdg_url(node.value[1:])
-        if expanded_url:
-            unfurl.add_to_queue(
-                data_type='url', key=None, value=expanded_url,
-                label=f'Expanded URL: {expanded_url}',
-                hover='Expanded URL, retrieved from v.gd via their API',
-                parent_id=node.node_id, incoming_edge_config=shortlink_edge)
+        unfurl.submit_lookup(
+            expand_vdg_url, unfurl, node.value[1:], callback=add_expanded_url(
+                unfurl, node, hover='Expanded URL, retrieved from v.gd via their API'),
+            cache_as=('shortlink', f'https://v.gd{node.value}'))
 
     bitly_domains = ['bit.ly', 'bitly.com', 'j.mp']
-    if any(unfurl.preceding_domain_matches(node, d) for d in bitly_domains):
-        expanded_info = expand_bitly_url(node.value[1:], unfurl.api_keys.get('bitly', os.environ.get('bitly')))
-
-        if not expanded_info:
-            return
-
-        node.hover = 'Bitly Short Links can be expanded via the Bitly API to show the ' \
-                     '"long" URL and the creation time of the short-link.' \
-                     '<a href="https://dev.bitly.com/v4/#operation/expandBitlink" ' \
-                     'target="_blank">[ref]</a>'
-
-        if expanded_info['created_at'].endswith('+0000'):
-            expanded_info['created_at'] = expanded_info['created_at'][:-5]
-
-        if expanded_info['created_at'][10] == 'T':
-            expanded_info['created_at'] = f'{expanded_info["created_at"][:10]} {expanded_info["created_at"][11:]}'
-
-        unfurl.add_to_queue(
-            data_type='description', key=None, value=expanded_info['created_at'],
-            label=f'Creation Time:\n{expanded_info["created_at"]}',
-            hover='Short-link creation time, retrieved from Bitly API',
-            parent_id=node.node_id, incoming_edge_config=shortlink_edge)
-
-        unfurl.add_to_queue(
-            data_type='url', key=None, value=expanded_info['long_url'],
-            label=f'Expanded URL: {expanded_info["long_url"]}', hover='Expanded URL, retrieved from Bitly API',
-            parent_id=node.node_id, incoming_edge_config=shortlink_edge)
-
+    if unfurl.preceding_domain_matches_any(node, bitly_domains):
+        api_key = unfurl.api_keys.get('bitly', os.environ.get('bitly'))
+        # The Bitly API needs a key; without one, the lookup would only fail (and that failure be cached)
+        if api_key:
+            unfurl.submit_lookup(
+                expand_bitly_url, unfurl, node.value[1:], api_key,
+                callback=functools.partial(add_bitly_nodes, unfurl, node),
+                cache_as=('shortlink', f'bit.ly/{node.value[1:].rstrip("/")}'))
         return
 
     redirect_expands = [
@@ -183,36 +199,30 @@ def run(unfurl, node):
 
     for redirect_expand in redirect_expands:
         if redirect_expand['domain'] == preceding_domain:
-            expanded_url = expand_url_via_redirect_header(redirect_expand['base_url'], node.value[1:])
-            if expanded_url:
-                unfurl.add_to_queue(
-                    data_type='url', key=None, value=expanded_url,
-                    label=f'Expanded URL: {expanded_url}',
-                    hover=f'Expanded URL, retrieved from {redirect_expand["domain"]} via "Location" header',
-                    parent_id=node.node_id, incoming_edge_config=shortlink_edge)
+            unfurl.submit_lookup(
+                expand_url_via_redirect_header, unfurl, redirect_expand['base_url'], node.value[1:],
+                callback=add_expanded_url(
+                    unfurl, node,
+                    hover=f'Expanded URL, retrieved from {redirect_expand["domain"]} via "Location" header'),
+                cache_as=('shortlink', f'{redirect_expand["base_url"]}{node.value[1:]}'))
             return
 
     # Guess that any domain + tld that is less than eight characters is a link shortener, and try to
     # expand it via a 301/302 Location header.
     if preceding_domain and len(preceding_domain) < 8:
-        expanded_url = expand_url_via_redirect_header(f'https://{preceding_domain}/', node.value[1:])
-        if expanded_url:
-            unfurl.add_to_queue(
-                data_type='url', key=None, value=expanded_url,
-                label=f'Expanded URL: {expanded_url}',
-                hover=f'Expanded URL, retrieved from {preceding_domain} via "Location" header',
-                parent_id=node.node_id, incoming_edge_config=shortlink_edge)
+        unfurl.submit_lookup(
+            expand_url_via_redirect_header, unfurl, f'https://{preceding_domain}/', node.value[1:],
+            callback=add_expanded_url(
+                unfurl, node, hover=f'Expanded URL, retrieved from {preceding_domain} via "Location" header'),
+            cache_as=('shortlink', f'https://{preceding_domain}/{node.value[1:]}'))
         return
 
     # Get the list of "known" URL shortener domains from MISP; many of these seem to be deprecated.
     # Try to expand the shortlink via a 301/302 Location header; if the site uses something like a meta refresh,
     # this won't work.
-    misp_shortener_domains = unfurl.known_domain_lists['List of known URL Shorteners domains'].list
-    if preceding_domain in misp_shortener_domains:
-        expanded_url = expand_url_via_redirect_header(f'https://{preceding_domain}/', node.value[1:])
-        if expanded_url:
-            unfurl.add_to_queue(
-                data_type='url', key=None, value=expanded_url,
-                label=f'Expanded URL: {expanded_url}',
-                hover=f'Expanded URL, retrieved from {preceding_domain} via "Location" header',
-                parent_id=node.node_id, incoming_edge_config=shortlink_edge)
+    if 'List of known URL Shorteners domains' in known_domains.get_known_domains().lists_containing(preceding_domain):
+        unfurl.submit_lookup(
+            expand_url_via_redirect_header, unfurl, f'https://{preceding_domain}/', node.value[1:],
+            callback=add_expanded_url(
+                unfurl, node, hover=f'Expanded URL, retrieved from {preceding_domain} via "Location" header'),
+            cache_as=('shortlink', f'https://{preceding_domain}/{node.value[1:]}'))
@@ -219,6 +219,9 @@ def _check_fragment_rule(unfurl, node, rule, site_def):
     return True
 
 
+accepts = {'data_types': ['url.path.segment', 'url.query.pair', 'url.fragment']}
+
+
 def run(unfurl, node):
     site_defs = _load_site_defs()
 
@@ -226,7 +229,7 @@ def run(unfurl, node):
         domains = site_def.get('domains', [])
 
         # Check if this node belongs to one of the site's domains
-        if not any(unfurl.preceding_domain_matches(node, d) for d in domains):
+        if not unfurl.preceding_domain_matches_any(node, domains):
             continue
 
         # Path segment rules
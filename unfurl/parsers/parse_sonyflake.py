@@ -65,9 +65,9 @@ def parse_sonyflake(unfurl, node):
 def run(unfurl, node):
     if not node.data_type.startswith(('sonyflake', 'hash')):
 
-        long_int = re.fullmatch(r'\d{15}', str(node.value))
+        long_int = re.fullmatch(r'\d{15}', node.shape.text)
         # Sonyflakes should be 15 hex digits long; limiting them to first digit 1-9 limits time frame from 2016 to 2026.
-        m = re.fullmatch(r'(?P<sonyflake>[1-9][A-F0-9]{14})', str(node.value).replace('-', '').upper())
+        m = re.fullmatch(r'(?P<sonyflake>[1-9][A-F0-9]{14})', node.shape.text.replace('-', '').upper())
         if m and not long_int:
             parse_sonyflake(unfurl, node)
 
@@ -15,7 +15,6 @@
 import datetime
 import re
 
-from unfurl import utils
 
 timestamp_edge = {
     'color': {
@@ -358,11 +357,9 @@ def run(unfurl, node):
 
     # Otherwise, examine the value of the node and see if we can detect a reasonable timestamp
     else:
-        matches_digits = utils.digits_re.fullmatch(str(node.value))
-        matches_float = utils.float_re.fullmatch(str(node.value))
-        matches_hex = utils.hex_re.fullmatch(str(node.value))
+        shape = node.shape
 
-        if matches_digits:
+        if shape.is_digits:
             timestamp = int(node.value)
 
             # Windows FileTime (18 digits)
@@ -401,7 +398,7 @@ def run(unfurl, node):
             elif 441763200 <= timestamp <= 915148800:  # 2015 <= ts <= 2030
                 new_timestamp = decode_mac_absolute_time(timestamp)
 
-        elif matches_float:
+        elif shape.is_float:
             timestamp = float(node.value)
 
             # Epoch seconds (10 digits)
@@ -412,7 +409,7 @@ def run(unfurl, node):
             elif 441763200.0 <= timestamp <= 915148800.0:  # 2015 <= ts <= 2030
                 new_timestamp = decode_mac_absolute_time(timestamp)
 
-        elif matches_hex:
+        elif shape.is_hex:
             timestamp = node.value.replace(':', '')
 
             # Epoch hex seconds (8 hex chars)
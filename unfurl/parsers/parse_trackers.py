@@ -21,6 +21,9 @@ utm_edge = {
 }
 
 
+accepts = {'data_types': ['url.query.pair']}
+
+
 def run(unfurl, node):
     # All analytics trackers in this parser are QSPs
     if node.data_type != 'url.query.pair':
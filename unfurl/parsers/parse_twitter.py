@@ -117,6 +117,10 @@ def create_twitter_id(timestamp=None, days_ahead=None, sequence=1, machine_id=1)
 
     return int(timestamp_bits + machine_id_bits + sequence_bits)
 
+
+accepts = {'data_types': ['url.path.segment', 'url.query.pair', 'file.name']}
+
+
 def run(unfurl, node):
     preceding_domain = unfurl.find_preceding_domain(node)
     if preceding_domain in ['twitter.com', 'mobile.twitter.com', 'x.com', 'mobile.x.com']:
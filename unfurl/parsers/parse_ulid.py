@@ -35,7 +35,7 @@ def run(unfurl, node):
         #   - 019AHCNC00SM9CSFQFXG3VC1FK <- 2015-01-01
         #   - 01JGFJJZ00TG242KAWHD959K7S <- 2025-01-01
 
-        m = re.match(r'(?P<ulid>01[90A-HJ][A-HJKMNP-Z0-9]{23})', str(node.value).replace('-', ''))
+        m = re.match(r'(?P<ulid>01[90A-HJ][A-HJKMNP-Z0-9]{23})', node.shape.text.replace('-', ''))
         if m:
             u = m.group('ulid')
             unfurl.add_to_queue(
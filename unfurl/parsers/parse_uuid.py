@@ -28,7 +28,7 @@ def run(unfurl, node):
     if not node.data_type.startswith(('uuid', 'hash')):
         # Leading '/' optional, 8-4-4-4-12 hex digits with '-' optional, 13th char limited to [1-6]
         m = re.fullmatch(r'/?([0-9A-F]{8}-?[0-9A-F]{4}-?[1-8][0-9A-F]{3}-?[0-9A-F]{4}-?[0-9A-F]{12})',
-                         str(node.value), re.IGNORECASE)
+                         node.shape.text, re.IGNORECASE)
         if m:
             u = m.group(1)
             u = u.replace('-', '')
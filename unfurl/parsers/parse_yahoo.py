@@ -21,6 +21,9 @@ yahoo = {
 }
 
 
+accepts = {'data_types': ['url.query.pair']}
+
+
 def run(unfurl, node):
     if node.data_type == 'url.query.pair':
         if unfurl.preceding_domain_matches(node, 'yahoo.com'):
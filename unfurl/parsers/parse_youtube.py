@@ -41,9 +41,12 @@ def format_seconds(seconds):
         return time.strftime('%H:%M:%S', time.gmtime(seconds)) + ' (hh:mm:ss)'
 
 
+accepts = {'data_types': ['url.path.segment', 'url.path'], 'keys': ['t', 'time_continue', 'start', 'v']}
+
+
 def run(unfurl, node):
     youtube_domains = ['youtube.com', 'youtu.be']
-    if any(unfurl.preceding_domain_matches(node, d) for d in youtube_domains):
+    if unfurl.preceding_domain_matches_any(node, youtube_domains):
         if node.key == 't' or node.key == 'time_continue' or node.key == 'start':
             time_formatted = format_seconds(node.value)
 
@@ -0,0 +1,175 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from unfurl import known_domains
+
+log = logging.getLogger(__name__)
+
+_parser_fingerprint = None
+_result_caches = {}
+_result_caches_lock = threading.Lock()
+
+
+def parser_fingerprint() -> str:
+    """A hash of everything that decides what unfurl finds: unfurl's own code, the parsers and their data files
+    (like the site definitions), and the versions of the known domain lists. It changes when any of them do."""
+    global _parser_fingerprint
+    if _parser_fingerprint is None:
+        package_dir = Path(__file__).parent
+        fingerprint = hashlib.sha256(json.dumps(known_domains.snapshot_versions(), sort_keys=True).encode())
+        source_files = list(package_dir.glob('*.py')) + list((package_dir / 'parsers').rglob('*'))
+        for source_file in sorted(source_files):
+            if source_file.is_file() and '__pycache__' not in source_file.parts:
+                fingerprint.update(source_file.relative_to(package_dir).as_posix().encode())
+                fingerprint.update(source_file.read_bytes())
+        _parser_fingerprint = fingerprint.hexdigest()
+    return _parser_fingerprint
+
+
+def default_result_cache_path() -> str:
+    """Where the result cache is kept, unless another path is given.
+
+    Can be overridden with the UNFURL_RESULT_CACHE environment variable.
+    """
+    if os.environ.get('UNFURL_RESULT_CACHE'):
+        return os.environ['UNFURL_RESULT_CACHE']
+    cache_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_dir, 'unfurl', 'results.sqlite')
+
+
+class ResultCache:
+    """Complete unfurl results, saved in a SQLite database so they can be reused by later runs.
+
+    A result is stored under a hash of the input (its value and data_type) and the options that change the
+    result (like remote_lookups and the type of output). Results from a different parser_fingerprint() are
+    never used, and are deleted when the cache is opened, so upgrading unfurl (or its parsers) starts afresh.
+    A result can also be saved with a ttl (like one with remote lookups, from Unfurl.result_ttl()), after
+    which it isn't used.
+
+    One ResultCache can be used from many threads (like in the web app).
+    """
+
+    def __init__(self, path: str | None = None, fingerprint: str | None = None):
+        self.path = path or default_result_cache_path()
+        self.fingerprint = fingerprint or parser_fingerprint()
+        self.lock = threading.Lock()
+
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        with self.lock:
+            # WAL with synchronous=NORMAL doesn't wait on the disk for every result saved; at worst, the last few
+            # results are lost in a power cut (and are unfurled again next time)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS results '
+                '(key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, result TEXT NOT NULL, created REAL NOT NULL, '
+                'expires REAL)')
+            # Caches made before results could expire don't have the column
+            columns = [row[1] for row in self.connection.execute('PRAGMA table_info(results)')]
+            if 'expires' not in columns:
+                self.connection.execute('ALTER TABLE results ADD COLUMN expires REAL')
+            stale = self.connection.execute(
+                'DELETE FROM results WHERE fingerprint != ? OR expires <= ?', (self.fingerprint, time.time()))
+            if stale.rowcount:
+                log.info(f'Removed {stale.rowcount} results from an older version of unfurl from {self.path}')
+
+    def key(self, value, data_type='url', **options) -> str:
+        """The hash of value, its data_type, and any options that change its result."""
+        key_material = json.dumps([value, data_type, options], sort_keys=True, default=str)
+        return hashlib.sha256(key_material.encode('utf-8')).hexdigest()
+
+    def get(self, value, data_type='url', **options):
+        """The saved result for value, or None if there isn't one."""
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT result FROM results WHERE key = ? AND fingerprint = ? AND (expires IS NULL OR expires > ?)',
+                (self.key(value, data_type, **options), self.fingerprint, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, value, result, data_type='url', ttl=None, **options) -> bool:
+        """Save result for value, for ttl seconds (or, if it's None, until the parsers change). Returns False if
+        result can't be saved as it is (in JSON)."""
+        try:
+            serialized_result = json.dumps(result)
+        except (TypeError, ValueError):
+            serialized_result = None
+        # Things like tuples and non-str dict keys serialize, but don't come back the same
+        if serialized_result is None or json.loads(serialized_result) != result:
+            log.debug(f'Not caching result for {value}; it can not be saved as JSON')
+            return False
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO results (key, fingerprint, result, created, expires) VALUES (?, ?, ?, ?, ?)',
+                (self.key(value, data_type, **options), self.fingerprint, serialized_result, time.time(),
+                 None if ttl is None else time.time() + ttl))
+        return True
+
+    def for_options(self, data_type='url', **options):
+        """This cache, with the default data_type and options filled in, for batch.deduplicate()."""
+        return BoundResultCache(self, data_type, options)
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+class BoundResultCache:
+    """A ResultCache with the default data_type and options for a batch filled in. Items are the value to
+    unfurl, or a (value, data_type) tuple, as in batch.unfurl_one()."""
+
+    def __init__(self, result_cache, data_type, options):
+        self.result_cache = result_cache
+        self.data_type = data_type
+        self.options = options
+
+    def _value_and_data_type(self, item):
+        if isinstance(item, tuple):
+            return item
+        return item, self.data_type
+
+    def get(self, item):
+        value, data_type = self._value_and_data_type(item)
+        return self.result_cache.get(value, data_type, **self.options)
+
+    def put(self, item, result, ttl=None) -> bool:
+        value, data_type = self._value_and_data_type(item)
+        return self.result_cache.put(value, result, data_type, ttl=ttl, **self.options)
+
+
+def get_result_cache(path: str | None = None) -> ResultCache:
+    """Return the process-wide ResultCache for path (or the default path), opening it on first use."""
+    path = path or default_result_cache_path()
+    result_cache = _result_caches.get(path)
+    if result_cache is None:
+        with _result_caches_lock:
+            # Another thread may have opened it while we waited on the lock
+            result_cache = _result_caches.get(path)
+            if result_cache is None:
+                result_cache = _result_caches[path] = ResultCache(path)
+    return result_cache
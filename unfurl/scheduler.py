@@ -0,0 +1,136 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import heapq
+import itertools
+import logging
+
+log = logging.getLogger(__name__)
+
+# When there's more queued than the node budget allows, queued items with these data types are parsed first
+# (higher first; anything not listed is 0). A trailing '*' matches by prefix.
+DEFAULT_PRIORITIES = {
+    'url': 3,
+    'url.authority': 3,
+    'url.hostname': 3,
+    'timestamp.*': 3,
+    'url.domain': 2,
+    'epoch-*': 2,
+    'url.path': 1,
+    'url.path.segment': 1,
+    'url.query': 1,
+    'url.query.pair': 1,
+    'url.fragment': 1,
+}
+
+# How much lower the priority of a queued item is for each level it is below the root node
+DEFAULT_DEPTH_PENALTY = 0.1
+
+
+class WorkScheduler:
+    """The queue of items waiting to be parsed into nodes.
+
+    Items are parsed in the order they were queued (first in, first out), as long as everything queued
+    can still be parsed within the node budget. Once more is queued than the remaining budget allows,
+    the rest are parsed in priority order instead, so valuable nodes (like timestamps and domains) aren't
+    lost just because they happened to be queued last. An item's priority comes from its data_type
+    (see DEFAULT_PRIORITIES), lowered by depth_penalty for each level it is below the root.
+
+    If max_children_per_node is set, items beyond that many queued for the same parent node are dropped,
+    so one huge node (a long JSON blob or a list of magnet links) can't use up the whole budget.
+
+    Unfurl is single-threaded, so unlike queue.Queue, this doesn't lock. It has the same put(), get(),
+    empty() and qsize() methods.
+    """
+
+    def __init__(self, priorities=None, depth_penalty=DEFAULT_DEPTH_PENALTY, max_children_per_node=None):
+        self.priorities = DEFAULT_PRIORITIES if priorities is None else priorities
+        self.depth_penalty = depth_penalty
+        self.max_children_per_node = max_children_per_node
+
+        self._fifo = collections.deque()
+        # Once there's more queued than the budget allows, items are moved here (ordered by priority)
+        self._heap = None
+        self._sequence = itertools.count()
+        self._priority_cache = {}
+        self._children_queued = collections.Counter()
+        self.dropped = collections.Counter()
+
+    def clear(self) -> None:
+        self._fifo.clear()
+        self._heap = None
+        self._children_queued.clear()
+        self.dropped.clear()
+
+    def priority_for(self, data_type) -> float:
+        priority = self._priority_cache.get(data_type)
+        if priority is None:
+            priority = self.priorities.get(data_type)
+            if priority is None:
+                priority = 0
+                if isinstance(data_type, str):
+                    for pattern, pattern_priority in self.priorities.items():
+                        if pattern.endswith('*') and data_type.startswith(pattern[:-1]):
+                            priority = pattern_priority
+                            break
+            self._priority_cache[data_type] = priority
+        return priority
+
+    def put(self, item, depth=0) -> bool:
+        """Queue item (at the given depth in the graph). Returns False if it was dropped instead."""
+        parent_id = item.get('parent_id')
+        if isinstance(parent_id, list):
+            parent_id = parent_id[0]
+
+        if parent_id and self.max_children_per_node is not None:
+            if self._children_queued[parent_id] >= self.max_children_per_node:
+                self.dropped['max_children_per_node'] += 1
+                log.debug(f'Dropped (over max_children_per_node for node {parent_id}): {item}')
+                return False
+            self._children_queued[parent_id] += 1
+
+        entry = (-(self.priority_for(item['data_type']) - depth * self.depth_penalty), next(self._sequence), item)
+        if self._heap is None:
+            self._fifo.append(entry)
+        else:
+            heapq.heappush(self._heap, entry)
+        return True
+
+    def get(self, budget_left=None):
+        """Remove and return the next item to parse.
+
+        If budget_left (the number of nodes that can still be made) is given and more than that are queued,
+        switch to taking items in priority order.
+        """
+        if self._heap is None:
+            if budget_left is None or len(self._fifo) <= budget_left:
+                return self._fifo.popleft()[2]
+            self._heap = list(self._fifo)
+            self._fifo.clear()
+            heapq.heapify(self._heap)
+
+        item = heapq.heappop(self._heap)[2]
+        if not self._heap:
+            self._heap = None
+        return item
+
+    def empty(self) -> bool:
+        return not self._fifo and not self._heap
+
+    def qsize(self) -> int:
+        return len(self._fifo) + len(self._heap or ())
+
+    def __len__(self):
+        return self.qsize()
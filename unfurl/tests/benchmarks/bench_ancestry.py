@@ -0,0 +1,135 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compare preceding domain/path lookups using inherited context against walking up the graph.
+
+The inputs are long redirect URLs, each nested inside the query string of the one before it.
+
+Run with: python -m unfurl.tests.benchmarks.bench_ancestry
+"""
+
+import time
+import urllib.parse
+
+from unfurl.core import Unfurl
+from unfurl.parsers.parse_mastodon import mastodon_domains
+
+
+def walk_preceding_domain(unfurl, node):
+    """The original lookup: recursively walk up the graph, then across to the URL's hostname."""
+    parent_nodes = unfurl.get_predecessor_node(node)
+    preceding_domain = ''
+    if not parent_nodes:
+        return preceding_domain
+
+    for parent_node in parent_nodes:
+        if parent_node.data_type == 'url.hostname':
+            preceding_domain = parent_node.value
+            break
+        elif parent_node.data_type == 'url':
+            for child_node in unfurl.get_successor_nodes(parent_node):
+                if child_node.data_type == 'url.hostname':
+                    preceding_domain = child_node.value
+                    break
+                elif child_node.data_type == 'url.authority':
+                    for subcomponent in unfurl.get_successor_nodes(child_node):
+                        if subcomponent.data_type == 'url.hostname':
+                            preceding_domain = subcomponent.value
+                            break
+        else:
+            preceding_domain = walk_preceding_domain(unfurl, parent_node)
+
+    return preceding_domain
+
+
+def walk_preceding_path(unfurl, node):
+    """The original lookup: recursively walk up the graph to the URL, then across to its path."""
+    parent_nodes = unfurl.get_predecessor_node(node)
+    if not parent_nodes:
+        return ''
+
+    for parent_node in parent_nodes:
+        if parent_node.data_type == 'url':
+            for child_node in unfurl.get_successor_nodes(parent_node):
+                if child_node.data_type == 'url.path':
+                    return child_node.value
+            return ''
+        else:
+            result = walk_preceding_path(unfurl, parent_node)
+            if result:
+                return result
+
+    return ''
+
+
+def nested_redirect_url(depth):
+    url = 'https://mastodon.social/@unfurl/109876543210987654?utm_source=bench'
+    for level in range(depth):
+        url = f'https://redirect{level}.example.com/out/{level}/go?ref=bench{level}&url={urllib.parse.quote(url)}'
+    return url
+
+
+def time_lookups(unfurl, nodes, lookup, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for node in nodes:
+            lookup(unfurl, node)
+    return (time.perf_counter() - start) / (rounds * len(nodes))
+
+
+def main():
+    # Warm up imports and known domain lists, so the first depth doesn't pay for them
+    warm_up = Unfurl()
+    warm_up.add_to_queue(data_type='url', key=None, value=nested_redirect_url(1))
+    warm_up.parse_queue()
+
+    for depth in (5, 20, 40):
+        unfurl = Unfurl()
+        unfurl.node_limit = 5000
+        unfurl.add_to_queue(data_type='url', key=None, value=nested_redirect_url(depth))
+        start = time.perf_counter()
+        unfurl.parse_queue()
+        parse_time = time.perf_counter() - start
+
+        nodes = list(unfurl.nodes.values())
+        for node in nodes:
+            assert walk_preceding_domain(unfurl, node) == node.preceding_domain
+            assert walk_preceding_path(unfurl, node) == node.preceding_path
+
+        def walk_mastodon_check(u, n):
+            # As parse_mastodon used to: walk for the preceding domain once per Mastodon domain
+            for d in mastodon_domains:
+                preceding = walk_preceding_domain(u, n)
+                if preceding == d or preceding.endswith(f'.{d}'):
+                    return True
+            return False
+
+        walk_time = time_lookups(unfurl, nodes, walk_preceding_domain, rounds=3)
+        walk_path_time = time_lookups(unfurl, nodes, walk_preceding_path, rounds=3)
+        walk_mastodon_time = time_lookups(unfurl, nodes[-20:], walk_mastodon_check, rounds=1)
+        inherited_time = time_lookups(unfurl, nodes, Unfurl.find_preceding_domain, rounds=100)
+        inherited_path_time = time_lookups(unfurl, nodes, Unfurl.find_preceding_path, rounds=100)
+        inherited_mastodon_time = time_lookups(
+            unfurl, nodes, lambda u, n: u.preceding_domain_matches_any(n, mastodon_domains), rounds=100)
+
+        print(f'Depth {depth}: {len(nodes)} nodes, parsed in {parse_time:.2f}s')
+        print(f'  {"":22}{"walk":>12}{"inherited":>12}')
+        print(f'  {"preceding domain":22}{walk_time * 1e6:>10.1f}µs{inherited_time * 1e6:>10.2f}µs')
+        print(f'  {"preceding path":22}{walk_path_time * 1e6:>10.1f}µs{inherited_path_time * 1e6:>10.2f}µs')
+        print(f'  {"mastodon domain check":22}{walk_mastodon_time * 1e6:>10.1f}µs'
+              f'{inherited_mastodon_time * 1e6:>10.2f}µs')
+
+
+if __name__ == '__main__':
+    main()
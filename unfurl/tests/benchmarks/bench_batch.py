@@ -0,0 +1,80 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compare the throughput of unfurling a large batch of URLs in one process and with --jobs worker processes.
+
+The synthetic corpus is the URLs from the unit tests, each repeated with a different query parameter added
+(so no two are the same), for 100,000 URLs by default.
+
+Run with: python -m unfurl.tests.benchmarks.bench_batch [--count 100000] [--jobs 2 4 8]
+"""
+
+import argparse
+import itertools
+import os
+import time
+
+from unfurl import batch
+from unfurl.core import Unfurl
+from unfurl.tests.benchmarks.bench_dispatch import load_corpus
+
+
+def output_json(unfurl_instance):
+    return unfurl_instance.generate_json()
+
+
+def synthetic_corpus(count):
+    urls = [item for item in load_corpus() if isinstance(item, str) and item.startswith('http')]
+    for number, url in zip(range(count), itertools.cycle(urls)):
+        yield f'{url}{"&" if "?" in url else "?"}bench={number}'
+
+
+def unfurl_serially(count):
+    unfurl_instance = Unfurl(remote_lookups=False)
+    for item in synthetic_corpus(count):
+        yield item, batch.unfurl_one(unfurl_instance, item, 'url', output_json)
+
+
+def measure(results):
+    start = time.perf_counter()
+    nodes = sum(len(result['nodes']) for _, result in results)
+    return time.perf_counter() - start, nodes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=100_000)
+    parser.add_argument('--jobs', type=int, nargs='+', default=sorted({2, 4, os.cpu_count() or 1} - {1}))
+    args = parser.parse_args()
+
+    # Load the known domains and parsers first, so that isn't counted against the single process
+    batch.unfurl_one(Unfurl(remote_lookups=False), 'https://www.example.com/', 'url', output_json)
+
+    print(f'Unfurling {args.count:,} URLs ({os.cpu_count()} CPUs)')
+    print(f'{"":22}{"time":>9}{"URLs/s":>10}{"nodes":>11}{"speedup":>9}')
+
+    serial_time, nodes = measure(unfurl_serially(args.count))
+    print(f'{"1 process":22}{serial_time:>8.1f}s{args.count / serial_time:>10,.0f}{nodes:>11,}{1:>8.1f}x')
+
+    for jobs, ordered in itertools.product(args.jobs, (True, False)):
+        results = batch.unfurl_in_parallel(
+            synthetic_corpus(args.count), output_json, jobs, unfurl_options={'remote_lookups': False},
+            ordered=ordered)
+        elapsed, nodes = measure(results)
+        name = f'--jobs {jobs}{"" if ordered else " --unordered"}'
+        print(f'{name:22}{elapsed:>8.1f}s{args.count / elapsed:>10,.0f}{nodes:>11,}{serial_time / elapsed:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compare parser invocations per node with the dispatch index against calling every parser on every node.
+
+Uses the inputs from the unit tests as the corpus, and checks both approaches build the same graphs.
+
+Run with: python -m unfurl.tests.benchmarks.bench_dispatch
+"""
+
+import ast
+import contextlib
+import glob
+import os
+import time
+
+import unfurl.parsers
+from unfurl import dispatch
+from unfurl.core import Unfurl
+
+unit_test_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'unit')
+
+
+class RunAllParsersUnfurl(Unfurl):
+    """Unfurl as it worked before the dispatch index: every parser is called for every node."""
+
+    def run_plugins(self, node):
+        for parser_entry in dispatch.get_parser_dispatch().parsers:
+            parser_entry[2].run(self, node)
+
+
+def load_corpus():
+    """Find the values the unit tests pass to add_to_queue(data_type='url', ...)."""
+    corpus = []
+    for test_file in sorted(glob.glob(os.path.join(unit_test_dir, 'test_*.py'))):
+        with open(test_file, encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        for call in ast.walk(tree):
+            if not (isinstance(call, ast.Call) and getattr(call.func, 'attr', None) == 'add_to_queue'):
+                continue
+            kwargs = {kw.arg: kw.value for kw in call.keywords}
+            if isinstance(kwargs.get('value'), ast.Constant) and \
+                    isinstance(kwargs.get('data_type'), ast.Constant) and kwargs['data_type'].value == 'url':
+                corpus.append(kwargs['value'].value)
+    return corpus
+
+
+@contextlib.contextmanager
+def count_invocations(counter):
+    parsers = dispatch.get_parser_dispatch().parsers
+    original_runs = {name: parser.run for _, name, parser in parsers}
+
+    def counted(run):
+        def wrapper(unfurl_instance, node):
+            counter['invocations'] += 1
+            return run(unfurl_instance, node)
+        return wrapper
+
+    for _, name, parser in parsers:
+        parser.run = counted(original_runs[name])
+    try:
+        yield
+    finally:
+        for _, name, parser in parsers:
+            parser.run = original_runs[name]
+
+
+def unfurl_corpus(unfurl_class, corpus):
+    counter = {'invocations': 0}
+    nodes = 0
+    results = []
+    start = time.perf_counter()
+    with count_invocations(counter):
+        for item in corpus:
+            instance = unfurl_class()
+            instance.add_to_queue(data_type='url', key=None, value=item)
+            instance.parse_queue()
+            nodes += len(instance.nodes)
+            results.append(instance.generate_json())
+    return results, nodes, counter['invocations'], time.perf_counter() - start
+
+
+def main():
+    corpus = load_corpus()
+    print(f'Corpus: {len(corpus)} inputs from the unit tests; {len(unfurl.parsers.__all__)} parsers')
+
+    # Warm up imports and known domain lists, so neither run pays for them
+    unfurl_corpus(Unfurl, corpus[:5])
+
+    all_results, all_nodes, all_invocations, all_time = unfurl_corpus(RunAllParsersUnfurl, corpus)
+    dispatch_results, dispatch_nodes, dispatch_invocations, dispatch_time = unfurl_corpus(Unfurl, corpus)
+    assert all_results == dispatch_results, 'dispatch index changed the unfurled graphs'
+
+    print(f'{"":16}{"nodes":>8}{"invocations":>14}{"per node":>10}{"time":>10}')
+    print(f'{"Every parser":16}{all_nodes:>8}{all_invocations:>14}'
+          f'{all_invocations / all_nodes:>10.1f}{all_time:>9.2f}s')
+    print(f'{"Dispatch index":16}{dispatch_nodes:>8}{dispatch_invocations:>14}'
+          f'{dispatch_invocations / dispatch_nodes:>10.1f}{dispatch_time:>9.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compare looking up hashes as each URL is unfurled with looking them up in bulk beforehand (HashLookupBatcher).
+
+The corpus is URLs with an MD5 or SHA-256 hash in the query string, drawn from a smaller set of distinct
+hashes (so the same hash turns up in many URLs). Lookups go to a local mock VirusTotal/Nitrxgen server that
+delays each response by --latency seconds, so no network or API key is needed. Each run starts with an empty
+lookup cache.
+
+Run with: python -m unfurl.tests.benchmarks.bench_hash_lookups [--count 2000] [--distinct 500] [--latency 0.05]
+"""
+
+import argparse
+import functools
+import hashlib
+import os
+import random
+import tempfile
+import time
+
+from unfurl import batch
+from unfurl import hash_lookups
+from unfurl import host_limits
+from unfurl import http_client
+from unfurl import lookup_cache
+from unfurl.core import Unfurl
+from unfurl.tests.benchmarks.mock_virustotal import MockVirusTotal
+
+API_KEYS = {'virustotal': 'benchmark'}
+
+
+def hash_corpus(count, distinct):
+    hashes = []
+    for number in range(distinct):
+        if number % 2:
+            hashes.append(hashlib.sha256(str(number).encode()).hexdigest())
+        else:
+            md5 = hashlib.md5(str(number).encode()).hexdigest()
+            # parse_hash passes over MD5s that look like UUIDv4s
+            hashes.append(md5 if md5[12] != '4' else hashlib.sha256(md5.encode()).hexdigest())
+    picker = random.Random(0)
+    return [f'https://files.example.com/download?sample={picker.choice(hashes)}&n={number}' for number in range(count)]
+
+
+def count_lookup_nodes(unfurl_instance):
+    return sum(1 for node in unfurl_instance.nodes.values() if node.key in ('Plaintext', 'Hash found on VirusTotal'))
+
+
+def run(corpus, http, cache_path, bulk):
+    unfurl_options = {
+        'remote_lookups': True, 'http': http, 'lookup_cache': lookup_cache.LookupCache(cache_path)}
+    batcher = None
+    if bulk:
+        batcher = hash_lookups.HashLookupBatcher(unfurl_options, quotas={})
+        batcher.scanner.api_keys = API_KEYS
+        unfurl_options = batcher.unfurl_options
+    unfurl_instance = Unfurl(**unfurl_options)
+    unfurl_instance.api_keys = API_KEYS
+    unfurl_items = functools.partial(
+        batch.unfurl_serially, unfurl_instance, data_type='url', output=count_lookup_nodes)
+    if batcher is not None:
+        unfurl_items = functools.partial(
+            hash_lookups.prefetch_hash_lookups, unfurl_items=unfurl_items, batcher=batcher)
+
+    start = time.perf_counter()
+    lookup_nodes = sum(result for _, result in unfurl_items(corpus))
+    return time.perf_counter() - start, lookup_nodes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=2000)
+    parser.add_argument('--distinct', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    corpus = hash_corpus(args.count, args.distinct)
+    # Don't let the per-host rate limit (meant for real services) hold up the local server
+    http = http_client.HttpClient(retries=0, limits=host_limits.HostLimits(requests_per_second=0))
+
+    print(f'{args.count:,} URLs, {args.distinct:,} distinct hashes, {args.latency * 1000:.0f}ms per lookup')
+    print(f'{"mode":<12} {"seconds":>9} {"URLs/s":>9} {"requests":>9} {"result nodes":>13}')
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for mode in ('per URL', 'bulk'):
+            with MockVirusTotal(latency=args.latency) as mock, mock.patch_parse_hash():
+                cache_path = os.path.join(temp_dir, f'{mode.replace(" ", "_")}.sqlite')
+                seconds, lookup_nodes = run(corpus, http, cache_path, bulk=mode == 'bulk')
+                print(f'{mode:<12} {seconds:>9.2f} {args.count / seconds:>9,.0f} {mock.counts["requests"]:>9,} '
+                      f'{lookup_nodes:>13,}')
+    http.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compare known domain list lookups via the inverted index against scanning every list.
+
+Run with: python -m unfurl.tests.benchmarks.bench_known_domains
+"""
+
+import time
+
+from unfurl import known_domains
+
+sample_domains = [
+    'google.com', 'dfir.blog', 'bit.ly', 'github.com', 'example.com', 'microsoft.com',
+    'mastodon.social', 'not-a-real-domain-for-unfurl.com', 'dropbox.com', 'yahoo.co.jp',
+]
+
+
+def scan_known_domain_lists(known, domain):
+    """The original lookup: check membership in each list, then summarize the hits."""
+    lists_found_in = []
+    for known_list in known.warning_lists.values():
+        if domain in known_list.list:
+            lists_found_in.append({'name': known_list.name, 'description': known_list.description})
+    return known_domains.summarize_hits(lists_found_in)
+
+
+def time_lookups(lookup, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for domain in sample_domains:
+            lookup(domain)
+    return (time.perf_counter() - start) / (rounds * len(sample_domains))
+
+
+def main():
+    start = time.perf_counter()
+    known = known_domains.get_known_domains()
+    print(f'Loaded {len(known)} lists in {time.perf_counter() - start:.2f}s')
+
+    start = time.perf_counter()
+    known.search('warm-up.example')
+    print(f'Built inverted index in {time.perf_counter() - start:.2f}s')
+
+    for domain in sample_domains:
+        assert known.search(domain) == scan_known_domain_lists(known, domain), domain
+
+    scan_time = time_lookups(lambda d: scan_known_domain_lists(known, d), rounds=1)
+    index_time = time_lookups(known.search, rounds=10000)
+    print(f'List scan:      {scan_time * 1e6:12.1f} µs/lookup')
+    print(f'Inverted index: {index_time * 1e6:12.1f} µs/lookup ({scan_time / index_time:,.0f}x faster)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compare how many nodes fit in a MB with the slotted Node against the original dict-based Node.
+
+The nodes are made from the items queued while unfurling the unit test inputs, repeated many times over.
+
+Run with: python -m unfurl.tests.benchmarks.bench_node_memory
+"""
+
+import gc
+import textwrap
+import time
+import tracemalloc
+
+from unfurl.core import Unfurl
+from unfurl.tests.benchmarks.bench_dispatch import load_corpus
+
+node_count = 200_000
+
+
+class DictNode:
+    """The original Node: a plain object, with its label made when it's created."""
+
+    def __init__(self, node_id, data_type, key, value, label=None, hover=None,
+                 parent_id=None, incoming_edge_config=None, extra_options=None):
+        self.node_id = node_id
+        self.data_type = data_type
+        self.key = key
+        self.value = value
+        self.label = label
+        self.hover = hover
+        self.parent_id = parent_id
+        self.incoming_edge_config = incoming_edge_config
+        self.extra_options = extra_options
+
+        if self.label is None:
+            if self.key and self.value:
+                self.label = f'{self.key}: {self.value}'
+            elif self.value:
+                self.label = self.value
+            elif self.key:
+                self.label = f'{self.key}:'
+
+
+def original_wrap_hover_text(hover_text):
+    """The original utils.wrap_hover_text, which made a new wrapped string for every node."""
+    if not hover_text or not isinstance(hover_text, str):
+        return None
+    if '<a' in hover_text or '<br' in hover_text or len(hover_text) < 70:
+        return hover_text
+    return '<br>'.join(textwrap.wrap(hover_text, width=60))
+
+
+class RecordingUnfurl(Unfurl):
+    def __init__(self, recorded_items):
+        super().__init__()
+        self.recorded_items = recorded_items
+
+    def parse(self, queued_item):
+        self.recorded_items.append(queued_item)
+        super().parse(queued_item)
+
+
+def record_queued_items():
+    recorded_items = []
+    for item in load_corpus():
+        unfurl = RecordingUnfurl(recorded_items)
+        unfurl.add_to_queue(data_type='url', key=None, value=item)
+        unfurl.parse_queue()
+    return recorded_items
+
+
+def copy_str(value):
+    """Make a new copy of a string, like parsing the same thing again in another URL would."""
+    return (value + '.')[:-1] if isinstance(value, str) else value
+
+
+def make_dict_node(node_id, item):
+    return DictNode(
+        node_id, data_type=item['data_type'], key=copy_str(item['key']), value=item['value'],
+        label=item['label'], hover=original_wrap_hover_text(item['hover']), parent_id=item.get('parent_id'),
+        incoming_edge_config=item.get('incoming_edge_config'), extra_options=item.get('extra_options'))
+
+
+def make_slotted_node(node_id, item):
+    return Unfurl.Node(
+        node_id, data_type=item['data_type'], key=copy_str(item['key']), value=item['value'],
+        label=item['label'], hover=item['hover'], parent_id=item.get('parent_id'),
+        incoming_edge_config=item.get('incoming_edge_config'), extra_options=item.get('extra_options'),
+        wrap_hover=True)
+
+
+def measure(make_node, items):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    nodes = [make_node(node_id, items[node_id % len(items)]) for node_id in range(node_count)]
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Output every node, as the JSON output does
+    start = time.perf_counter()
+    for node in nodes:
+        Unfurl.transform_node(node)
+    output_time = time.perf_counter() - start
+
+    return size, elapsed, output_time
+
+
+def main():
+    items = record_queued_items()
+    print(f'Making {node_count:,} nodes from {len(items)} queued items from the unit test inputs')
+
+    results = {}
+    for name, make_node in (('Dict Node', make_dict_node), ('Slotted Node', make_slotted_node)):
+        results[name] = measure(make_node, items)
+
+    print(f'{"":14}{"nodes/MB":>10}{"bytes/node":>12}{"create":>10}{"output":>10}')
+    for name, (size, elapsed, output_time) in results.items():
+        print(f'{name:14}{node_count / (size / 2 ** 20):>10,.0f}{size / node_count:>12.0f}'
+              f'{elapsed:>9.2f}s{output_time:>9.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Unfurl a million URLs with one Unfurl instance, and check its memory use stays flat.
+
+Uses the synthetic corpus from bench_batch, with a low node_limit so parsing often stops with items still queued.
+The peak resident memory of the process is shown every 100,000 URLs (Unix only).
+
+Run with: python -m unfurl.tests.benchmarks.bench_reset [--count 1000000]
+"""
+
+import argparse
+import resource
+import time
+
+from unfurl import batch
+from unfurl.core import Unfurl
+from unfurl.tests.benchmarks.bench_batch import synthetic_corpus
+
+report_every = 100_000
+
+
+def max_rss_mb():
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--node-limit', type=int, default=10)
+    args = parser.parse_args()
+
+    unfurl_instance = Unfurl(remote_lookups=False, node_limit=args.node_limit)
+    start = time.perf_counter()
+    first_report = None
+    print(f'{"URLs":>10}{"time":>9}{"max RSS":>11}')
+    for number, item in enumerate(synthetic_corpus(args.count), start=1):
+        batch.unfurl_one(unfurl_instance, item, 'url', Unfurl.generate_json)
+        if number % report_every == 0 or number == args.count:
+            first_report = first_report or max_rss_mb()
+            print(f'{number:>10,}{time.perf_counter() - start:>8.0f}s{max_rss_mb():>8.1f} MB')
+
+    print(f'Grew {max_rss_mb() - first_report:.1f} MB after the first {min(report_every, args.count):,} URLs')
+
+
+if __name__ == '__main__':
+    main()
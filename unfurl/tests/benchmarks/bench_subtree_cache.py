@@ -0,0 +1,60 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compare unfurling a batch of URLs with and without the subtree cache, and check both give the same results.
+
+Uses the synthetic corpus from bench_batch: the URLs from the unit tests, each repeated with a different query
+parameter added. Every URL is different, but most of their parts (query parameters, encoded values) recur.
+
+Run with: python -m unfurl.tests.benchmarks.bench_subtree_cache [--count 20000] [--cache-size 10000]
+"""
+
+import argparse
+import time
+
+from unfurl.core import Unfurl
+from unfurl.tests.benchmarks.bench_batch import synthetic_corpus
+
+
+def unfurl_corpus(unfurl_instance, count):
+    start = time.perf_counter()
+    results = [result for _, result in unfurl_instance.run_many(synthetic_corpus(count), return_type='text')]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=20_000)
+    parser.add_argument('--cache-size', type=int, default=10_000)
+    args = parser.parse_args()
+
+    # Load the known domains and parsers first, so that isn't counted against either
+    list(Unfurl(remote_lookups=False).run_many(['https://www.example.com/']))
+
+    uncached_time, uncached_results = unfurl_corpus(Unfurl(remote_lookups=False), args.count)
+    cached_unfurl = Unfurl(remote_lookups=False, subtree_cache_size=args.cache_size)
+    cached_time, cached_results = unfurl_corpus(cached_unfurl, args.count)
+    assert cached_results == uncached_results, 'Results with the subtree cache are different'
+
+    counts = cached_unfurl.subtree_cache_counts
+    print(f'Unfurled {args.count:,} URLs')
+    print(f'{"No cache":22}{uncached_time:>8.1f}s{args.count / uncached_time:>10,.0f} URLs/s')
+    print(f'{"Subtree cache":22}{cached_time:>8.1f}s{args.count / cached_time:>10,.0f} URLs/s'
+          f'{uncached_time / cached_time:>8.1f}x')
+    print(f'Cache hits: {counts["hits"]:,}; misses: {counts["misses"]:,}; '
+          f'uncacheable: {counts["uncacheable"]:,} (parsers looked at other nodes)')
+
+
+if __name__ == '__main__':
+    main()
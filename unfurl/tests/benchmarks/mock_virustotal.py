@@ -0,0 +1,171 @@
+# Copyright 2026 Ryan Benson
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A stand-in for the VirusTotal (and Nitrxgen) hash lookup APIs, to test and benchmark hash lookups offline.
+
+It answers GET /api/v3/files/<hash> like VirusTotal's API v3 (with an x-apikey header; 401 without one), and
+GET /md5db/<hash> like Nitrxgen. Whether a hash is "found" depends only on the hash, so results are the same
+every run. Each response can be delayed (latency, in seconds) to stand in for the round trip to the real
+service, and a per-minute quota can be set, after which requests get 429s like VirusTotal's. Setting
+error_status (like 429 or 503) answers every request with that error instead.
+
+Point parse_hash at it with MockVirusTotal.patch_parse_hash(). To run it on its own:
+
+Run with: python -m unfurl.tests.benchmarks.mock_virustotal [--port 8001] [--latency 0.1] [--per-minute 4]
+"""
+
+import argparse
+import collections
+import contextlib
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from unfurl.parsers import parse_hash
+
+
+def is_known(hash_value):
+    # About half of all hashes are "found"
+    return int(hashlib.md5(hash_value.lower().encode()).hexdigest()[0], 16) % 2 == 0
+
+
+def file_attributes(hash_value):
+    return {
+        'type_description': 'Win32 EXE',
+        'meaningful_name': f'sample_{hash_value[:8]}.exe',
+        'reputation': int(hash_value[-2:], 16) % 100 - 50,
+    }
+
+
+class MockVirusTotalHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockVirusTotal'
+
+    def do_GET(self):
+        mock = self.server.mock
+        with mock.lock:
+            mock.counts['requests'] += 1
+            now = time.monotonic()
+            while mock.recent and now - mock.recent[0] >= 60:
+                mock.recent.popleft()
+            over_quota = mock.per_minute is not None and len(mock.recent) >= mock.per_minute
+            if not over_quota:
+                mock.recent.append(now)
+        if mock.latency:
+            time.sleep(mock.latency)
+
+        if mock.error_status is not None:
+            mock.counts['errors'] += 1
+            self.send_body(mock.error_status, b'<html><body>Error</body></html>', 'text/html')
+
+        elif self.path.startswith('/api/v3/files/'):
+            hash_value = self.path[len('/api/v3/files/'):]
+            if not self.headers.get('x-apikey'):
+                self.send_json(401, {'error': {'code': 'WrongCredentialsError', 'message': 'Wrong API key'}})
+            elif over_quota:
+                mock.counts['over_quota'] += 1
+                self.send_json(429, {'error': {'code': 'QuotaExceededError', 'message': 'Quota exceeded'}})
+            elif is_known(hash_value):
+                mock.counts['found'] += 1
+                self.send_json(200, {'data': {'id': hash_value, 'type': 'file',
+                                              'attributes': file_attributes(hash_value)}})
+            else:
+                self.send_json(404, {'error': {'code': 'NotFoundError', 'message': f'File "{hash_value}" not found'}})
+
+        elif self.path.startswith('/md5db/'):
+            hash_value = self.path[len('/md5db/'):]
+            self.send_body(200, f'plaintext-{hash_value[:6]}'.encode() if is_known(hash_value) else b'', 'text/plain')
+
+        else:
+            self.send_json(404, {'error': {'code': 'NotFoundError', 'message': 'Not found'}})
+
+    def send_json(self, status, body):
+        self.send_body(status, json.dumps(body).encode(), 'application/json')
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MockVirusTotal:
+    """Runs the mock API on 127.0.0.1 in a background thread (as a context manager, or with start() and stop())."""
+
+    def __init__(self, port=0, latency=0.0, per_minute=None):
+        self.latency = latency
+        self.per_minute = per_minute
+        self.error_status = None
+        self.counts = collections.Counter()
+        self.recent = collections.deque()
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), MockVirusTotalHandler)
+        self.server.daemon_threads = True
+        self.server.mock = self
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_port}'
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @contextlib.contextmanager
+    def patch_parse_hash(self):
+        """Send parse_hash's lookups to this server, rather than VirusTotal and Nitrxgen, while in the block."""
+        original = parse_hash.VIRUSTOTAL_URL, parse_hash.NITRXGEN_URL
+        parse_hash.VIRUSTOTAL_URL = f'{self.url}/api/v3/files/'
+        parse_hash.NITRXGEN_URL = f'{self.url}/md5db/'
+        try:
+            yield self
+        finally:
+            parse_hash.VIRUSTOTAL_URL, parse_hash.NITRXGEN_URL = original
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.1)
+    parser.add_argument('--per-minute', type=int)
+    args = parser.parse_args()
+
+    mock = MockVirusTotal(args.port, latency=args.latency, per_minute=args.per_minute)
+    print(f'Mock VirusTotal API at {mock.url}/api/v3/files/<hash> (and Nitrxgen at {mock.url}/md5db/<hash>)')
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
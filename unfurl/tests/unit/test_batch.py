@@ -0,0 +1,130 @@
+from unfurl import batch
+from unfurl import core
+from unfurl.core import Unfurl
+import collections
+import functools
+import threading
+import unittest
+
+urls = [f'https://example.com/{number}?t={1600000000 + number}' for number in range(20)]
+
+
+def output_json(unfurl_instance):
+    return unfurl_instance.generate_json()
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        unfurl_instance = Unfurl(remote_lookups=False)
+        self.expected = [(url, batch.unfurl_one(unfurl_instance, url, 'url', output_json)) for url in urls]
+
+    def test_parallel_ordered(self):
+        """ Test that unfurling in worker processes gives the same results, in the same order"""
+
+        results = batch.unfurl_in_parallel(
+            iter(urls), output_json, jobs=2, unfurl_options={'remote_lookups': False}, chunk_size=3)
+        self.assertEqual(self.expected, list(results))
+
+    def test_parallel_unordered(self):
+        """ Test that unordered results are the same, in any order"""
+
+        results = batch.unfurl_in_parallel(
+            iter(urls), output_json, jobs=2, unfurl_options={'remote_lookups': False}, ordered=False, chunk_size=3)
+        self.assertCountEqual(self.expected, list(results))
+
+    def test_run_batch(self):
+        """ Test that run_batch gives the same results as run, for each item"""
+
+        results = list(core.run_batch(iter(urls[:3]), remote_lookups=False))
+        self.assertEqual([(url, core.run(url)) for url in urls[:3]], results)
+        self.assertEqual(results, list(core.run_batch(urls[:3], remote_lookups=False, jobs=2)))
+
+    def test_run_many(self):
+        """ Test reusing one instance for many items, with their own data types, as they're needed"""
+
+        test = Unfurl(remote_lookups=False)
+        results = test.run_many(iter([urls[0], ('1600000000', 'integer'), urls[1]]), return_type='text')
+
+        url, text_tree = next(results)
+        self.assertEqual(urls[0], url)
+        self.assertTrue(text_tree.startswith(f'[1] {urls[0]}'))
+        self.assertEqual(0, test.total_nodes)
+
+        item, text_tree = next(results)
+        self.assertEqual(('1600000000', 'integer'), item)
+        self.assertIn('2020-09-13 12:26:40', text_tree)
+
+        self.assertTrue(next(results)[1].startswith(f'[1] {urls[1]}'))
+
+    def test_deduplicate(self):
+        """ Test that each distinct item is only unfurled once, and every item gets its result, in order"""
+
+        unfurled = []
+
+        def unfurl_items(items):
+            for item in items:
+                unfurled.append(item)
+                yield item, item.upper()
+
+        items = ['a', 'b', 'a', 'c', 'b', 'a', 'd', 'a']
+        counts = collections.Counter()
+        results = list(batch.deduplicate(iter(items), unfurl_items, cache_size=2, counts=counts))
+
+        self.assertEqual([(item, item.upper()) for item in items], results)
+        # Only the last two distinct items are remembered, so 'b' (then 'a') dropped out and were unfurled again
+        self.assertEqual(['a', 'b', 'c', 'b', 'a', 'd'], unfurled)
+        self.assertEqual({'unfurled': 6, 'duplicates': 2}, counts)
+
+    def test_deduplicate_streams(self):
+        """ Test that duplicates are yielded as they're read, not held until the next distinct item"""
+
+        read = []
+
+        def items():
+            for item in ['a', 'a', 'b']:
+                read.append(item)
+                yield item
+
+        def unfurl_items(items):
+            for item in items:
+                yield item, item.upper()
+
+        results = batch.deduplicate(items(), unfurl_items, read_ahead=1)
+        self.assertEqual([('a', 'A'), ('a', 'A')], [next(results), next(results)])
+        self.assertEqual(['a', 'a'], read)
+        self.assertEqual([('b', 'B')], list(results))
+
+        # Like reading from `tail -f`: the result comes out while the next line is still on its way
+        next_line = threading.Event()
+
+        def slow_items():
+            yield 'a'
+            next_line.wait(5)
+            yield 'b'
+
+        results = batch.deduplicate(slow_items(), unfurl_items)
+        self.assertEqual(('a', 'A'), next(results))
+        self.assertFalse(next_line.is_set())
+        next_line.set()
+        self.assertEqual([('b', 'B')], list(results))
+
+    def test_deduplicate_parallel(self):
+        """ Test deduplicating items unfurled in worker processes"""
+
+        items = urls[:5] * 3
+        expected = [(url, dict(result)) for url, result in self.expected[:5]] * 3
+        counts = collections.Counter()
+        unfurl_items = functools.partial(
+            batch.unfurl_in_parallel, output=output_json, jobs=2, unfurl_options={'remote_lookups': False},
+            chunk_size=2)
+
+        self.assertEqual(expected, list(batch.deduplicate(items, unfurl_items, counts=counts)))
+        self.assertEqual({'unfurled': 5, 'duplicates': 10}, counts)
+
+        results = batch.deduplicate(items, unfurl_items, ordered=False)
+        self.assertCountEqual(expected, list(results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+from contextlib import redirect_stderr, redirect_stdout
+from unfurl import checkpoint
+from unfurl import cli
+from unittest import mock
+import functools
+import io
+import json
+import os
+import tempfile
+import unittest
+
+urls = ['https://example.com/a?t=1600000000', 'https://example.org/b']
+
+
+def fake_stdin(lines):
+    return io.TextIOWrapper(io.BytesIO(''.join(f'{line}\n' for line in lines).encode()))
+
+
+def run_cli(*arguments, stdin_lines=()):
+    output = io.StringIO()
+    with mock.patch('sys.argv', ['unfurl', *arguments]), mock.patch('sys.stdin', fake_stdin(stdin_lines)), \
+            redirect_stdout(output):
+        cli.command_line_interface()
+    return output.getvalue()
+
+
+class TestCli(unittest.TestCase):
+
+    def test_items_from_file(self):
+        """ Test that lines are read from a file one at a time"""
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = os.path.join(temp_dir, 'urls.txt')
+            with open(input_path, 'w') as f:
+                f.write('\n'.join(urls))
+
+            items = cli.iter_items_to_unfurl(input_path)
+            self.assertEqual(urls[0], next(items))
+            self.assertEqual(urls[1:], list(items))
+
+    def test_single_item(self):
+        """ Test that something that isn't a file path is unfurled as is"""
+
+        self.assertEqual(['https://example.com/c'], list(cli.iter_items_to_unfurl('https://example.com/c')))
+
+    def test_items_from_stdin(self):
+        """ Test reading the items to unfurl from stdin"""
+
+        with mock.patch('sys.stdin', fake_stdin(urls)):
+            self.assertEqual(urls, list(cli.iter_items_to_unfurl('-')))
+
+        output = run_cli('-', stdin_lines=urls)
+        self.assertIn('[1] https://example.com/a?t=1600000000', output)
+        self.assertIn('2020-09-13 12:26:40', output)
+        self.assertIn('[1] https://example.org/b', output)
+
+    def test_jsonl_output(self):
+        """ Test saving one JSON object per input line"""
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = os.path.join(temp_dir, 'unfurled.jsonl')
+            run_cli('-', '--format', 'jsonl', '-o', output_path, stdin_lines=urls)
+            with open(output_path, encoding='utf-8') as f:
+                records = [json.loads(line) for line in f]
+
+        self.assertEqual(urls, [record['input'] for record in records])
+        self.assertIn('2020-09-13 12:26:40+00:00', [node['value'] for node in records[0]['nodes']])
+
+    def test_csv_column(self):
+        """ Test unfurling one column of a tab-separated file, adding the values found as new columns"""
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = os.path.join(temp_dir, 'timeline.tsv')
+            with open(input_path, 'w') as f:
+                f.write('when\tlink\n2021\thttps://example.com/a?t=1600000000\n2022\thttps://example.org/b\n')
+
+            output = run_cli(input_path, '--column', 'link', '--delimiter', '\\t', '--fields', 'timestamps', 'domains')
+
+        self.assertEqual([
+            'when\tlink\tunfurl_timestamps\tunfurl_domains',
+            '2021\thttps://example.com/a?t=1600000000\t2020-09-13 12:26:40+00:00\texample.com',
+            '2022\thttps://example.org/b\t\texample.org',
+        ], output.splitlines())
+
+    def test_resume_after_crash(self):
+        """ Test that --resume continues from the last checkpoint, with each line in the output once"""
+
+        many_urls = [f'https://example.com/{number}?t=16000000{number:02}' for number in range(7)]
+        real_output_unfurled = cli.output_unfurled
+
+        def crash_on_fifth_item(*args, **kwargs):
+            crash_on_fifth_item.calls += 1
+            if crash_on_fifth_item.calls == 5:
+                raise RuntimeError('crashed')
+            return real_output_unfurled(*args, **kwargs)
+
+        for output_format in ('text', 'jsonl'):
+            with self.subTest(output_format=output_format), tempfile.TemporaryDirectory() as temp_dir:
+                input_path = os.path.join(temp_dir, 'urls.txt')
+                with open(input_path, 'w') as f:
+                    f.write('\n'.join(many_urls))
+                expected_path = os.path.join(temp_dir, 'expected')
+                output_path = os.path.join(temp_dir, 'unfurled')
+                options = (input_path, '--format', output_format, '--dedupe-cache-size', '0')
+
+                run_cli(*options, '-o', expected_path)
+                self.assertFalse(os.path.exists(f'{expected_path}.checkpoint'))
+
+                crash_on_fifth_item.calls = 0
+                with mock.patch.object(cli.checkpoints, 'Checkpoint',
+                                       functools.partial(checkpoint.Checkpoint, every=3)), \
+                        mock.patch.object(cli, 'output_unfurled', crash_on_fifth_item), \
+                        self.assertRaises(RuntimeError):
+                    run_cli(*options, '-o', output_path)
+                with open(f'{output_path}.checkpoint') as f:
+                    self.assertEqual(3, json.load(f)['items_done'])
+
+                with redirect_stderr(io.StringIO()) as stderr:
+                    run_cli(*options, '-o', output_path, '--resume')
+                self.assertIn('Resuming after 3 lines', stderr.getvalue())
+
+                with open(expected_path, 'rb') as expected, open(output_path, 'rb') as resumed:
+                    self.assertEqual(expected.read(), resumed.read())
+                self.assertFalse(os.path.exists(f'{output_path}.checkpoint'))
+
+    def test_resume_needs_matching_checkpoint(self):
+        """ Test that --resume refuses to continue without a checkpoint, or with different options"""
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = os.path.join(temp_dir, 'urls.txt')
+            with open(input_path, 'w') as f:
+                f.write('\n'.join(urls))
+            output_path = os.path.join(temp_dir, 'unfurled.csv')
+
+            with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                run_cli(input_path, '-o', output_path, '--resume')
+
+            state = {'input_path': os.path.abspath(input_path), 'input_offset': 0, 'output_offset': 0,
+                     'items_done': 0, 'options': {'format': 'jsonl'}}
+            with open(f'{output_path}.checkpoint', 'w') as f:
+                json.dump(state, f)
+            open(output_path, 'w').close()
+            with redirect_stderr(io.StringIO()) as stderr, self.assertRaises(SystemExit):
+                run_cli(input_path, '-o', output_path, '--resume')
+            self.assertIn('different options', stderr.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
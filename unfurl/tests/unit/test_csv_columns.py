@@ -0,0 +1,57 @@
+from unfurl import batch
+from unfurl import csv_columns
+from unfurl.core import Unfurl
+import functools
+import unittest
+
+search_url = 'https://www.google.com/search?q=unfurl+forensics&ei=7Gl5X8zOFcWa5wKF3p7YBA'
+tweet_url = 'https://twitter.com/x/status/1189981447452340224'
+
+
+class TestCsvColumns(unittest.TestCase):
+
+    def setUp(self):
+        self.unfurl_items = functools.partial(
+            batch.unfurl_serially, Unfurl(remote_lookups=False), data_type='url', output=csv_columns.extract_fields)
+
+    def test_extract_fields(self):
+        """ Test extracting timestamps, domains and search terms from the graph"""
+
+        test = Unfurl(remote_lookups=False)
+        self.assertEqual(
+            ['2020-10-04 06:21:32.354124+00:00', 'google.com', 'unfurl forensics'],
+            batch.unfurl_one(test, search_url, 'url', csv_columns.extract_fields))
+        hostnames = functools.partial(csv_columns.extract_fields, fields=['hostnames'])
+        self.assertEqual(['www.google.com'], batch.unfurl_one(test, search_url, 'url', hostnames))
+
+    def test_unfurl_column(self):
+        """ Test that the other columns are passed through, with the extracted fields added at the end"""
+
+        rows = [['id', 'url', 'note'], ['1', search_url, 'x, y'], ['2'], ['3', tweet_url, '']]
+        self.assertEqual([
+            ['id', 'url', 'note', 'unfurl_timestamps', 'unfurl_domains', 'unfurl_search_terms'],
+            ['1', search_url, 'x, y', '2020-10-04 06:21:32.354124+00:00', 'google.com', 'unfurl forensics'],
+            ['2', '', '', ''],
+            ['3', tweet_url, '', '2019-10-31 19:04:20.515+00:00', 'twitter.com', ''],
+        ], list(csv_columns.unfurl_column(rows, 'url', self.unfurl_items)))
+
+    def test_unfurl_column_in_parallel(self):
+        """ Test that rows unfurled in worker processes come out in order, with their own results"""
+
+        rows = [['url']] + [[search_url], [tweet_url]] * 5
+        unfurl_items = functools.partial(
+            batch.unfurl_in_parallel, output=csv_columns.extract_fields, jobs=2,
+            unfurl_options={'remote_lookups': False}, chunk_size=3)
+        self.assertEqual(
+            list(csv_columns.unfurl_column(rows, 'url', self.unfurl_items)),
+            list(csv_columns.unfurl_column(rows, 'url', unfurl_items)))
+
+    def test_missing_column(self):
+        """ Test that a column that isn't in the header is an error"""
+
+        with self.assertRaises(ValueError):
+            next(csv_columns.unfurl_column([['id', 'link']], 'url', self.unfurl_items))
+
+
+if __name__ == '__main__':
+    unittest.main()
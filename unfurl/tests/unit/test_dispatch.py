@@ -0,0 +1,47 @@
+from unfurl import dispatch
+from unfurl.core import Unfurl
+import unittest
+
+
+def parser_names(data_type, key=None, node_id=5):
+    node = Unfurl.Node(node_id=node_id, data_type=data_type, key=key, value='1')
+    return [name for _, name, _ in dispatch.get_parser_dispatch().parsers_for(node)]
+
+
+class TestDispatch(unittest.TestCase):
+
+    def test_data_type_dispatch(self):
+        """ Test that parsers only get nodes of the data types they accept"""
+
+        names = parser_names('url.query.pair', key='q')
+        self.assertIn('parse_bing', names)
+        self.assertIn('parse_google', names)
+        self.assertNotIn('parse_domain', names)
+        self.assertNotIn('parse_initial_node', names)
+
+        # Parsers without 'accepts' (like the timestamp parser) see every node
+        self.assertIn('parse_timestamp', names)
+
+    def test_prefix_and_key_dispatch(self):
+        """ Test prefix data type matches and key matches"""
+
+        self.assertIn('parse_google', parser_names('google.ei'))
+        self.assertIn('parse_youtube', parser_names('url.fragment', key='t'))
+        self.assertNotIn('parse_youtube', parser_names('url.fragment', key='a'))
+
+    def test_root_dispatch(self):
+        """ Test that parsers that accept the root node get it, whatever its data type"""
+
+        self.assertIn('parse_initial_node', parser_names('url', node_id=1))
+        self.assertNotIn('parse_initial_node', parser_names('url', node_id=2))
+
+    def test_parsers_in_order(self):
+        """ Test that selected parsers keep the order in unfurl.parsers.__all__"""
+
+        plan = dispatch.get_parser_dispatch().parsers_for(Unfurl.Node(node_id=1, data_type='url', key=None, value='x'))
+        positions = [position for position, _, _ in plan]
+        self.assertEqual(sorted(positions), positions)
+
+
+if __name__ == '__main__':
+    unittest.main()
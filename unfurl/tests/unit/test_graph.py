@@ -0,0 +1,64 @@
+from unfurl.core import Unfurl
+import networkx
+import unittest
+
+
+class TestNodeGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.test = Unfurl()
+        self.test.add_to_queue(
+            data_type='url', key=None,
+            value='https://www.example.com/a/b?q=https%3A%2F%2Fexample.org%2Fc%3Fd%3De&f=1700000000')
+        self.test.parse_queue()
+
+    def test_networkx_view(self):
+        """ Test that the networkx view has the same nodes and edges, in the same order"""
+
+        graph = self.test.graph
+        self.assertIsInstance(graph, networkx.DiGraph)
+        self.assertEqual(list(self.test.nodes.values()), list(graph.nodes()))
+        self.assertEqual(list(self.test.node_graph.iter_edges()), list(graph.edges()))
+
+        # The view is only rebuilt when the graph changes
+        self.assertIs(graph, self.test.graph)
+        self.test.create_node(data_type='descriptor', key=None, value='new', label=None, hover=None, parent_id=1)
+        self.assertIsNot(graph, self.test.graph)
+        self.assertEqual(len(self.test.nodes), self.test.graph.number_of_nodes())
+
+    def test_tree_data(self):
+        """ Test that tree data for the text tree matches what networkx makes"""
+
+        expected = networkx.readwrite.json_graph.tree_data(self.test.graph, root=self.test.nodes[1])
+        self.assertTrue(self.test.node_graph.is_tree())
+        self.assertEqual(expected, self.test.node_graph.tree_data())
+
+    def test_parents_and_children(self):
+        """ Test looking up parents and children"""
+
+        graph = self.test.graph
+        for node in self.test.nodes.values():
+            self.assertEqual(list(graph.successors(node)), self.test.get_successor_nodes(node))
+            if node.parent_id:
+                self.assertEqual(list(graph.predecessors(node)), self.test.get_predecessor_node(node))
+            else:
+                self.assertFalse(self.test.get_predecessor_node(node))
+
+    def test_multiple_parents(self):
+        """ Test a node with more than one parent"""
+
+        node_id = self.test.create_node(
+            data_type='descriptor', key=None, value='shared', label=None, hover=None, parent_id=[2, 3])
+        node = self.test.nodes[node_id]
+
+        self.assertEqual([self.test.nodes[2], self.test.nodes[3]], self.test.get_predecessor_node(node))
+        self.assertIn(node, self.test.get_successor_nodes(self.test.nodes[3]))
+        self.assertFalse(self.test.node_graph.is_tree())
+
+        # It's not a tree anymore, so making a text tree fails like it did with networkx
+        with self.assertRaises(TypeError):
+            self.test.generate_text_tree()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+from unfurl import batch
+from unfurl import hash_lookups
+from unfurl import host_limits
+from unfurl import http_client
+from unfurl.core import Unfurl
+from unfurl.lookup_cache import LookupCache
+from unfurl.tests.benchmarks.mock_virustotal import MockVirusTotal
+import functools
+import os
+import tempfile
+import unittest
+
+api_keys = {'virustotal': 'fake_key'}
+md5 = '5f4dcc3b5aa765d61d8327deb882cf99'
+sha256 = '5e884898da28047151d0e56f8dc6292773603d0d6aabbdd62a11ef721d1542d8'
+
+
+def lookup_nodes(unfurl_instance):
+    return sorted(
+        (node.key, node.label) for node in unfurl_instance.nodes.values()
+        if node.key in ('Plaintext', 'Hash found on VirusTotal'))
+
+
+class TestHashLookups(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.http = http_client.HttpClient(retries=0, limits=host_limits.HostLimits(requests_per_second=0))
+        self.mock = MockVirusTotal().start()
+        self.patch = self.mock.patch_parse_hash()
+        self.patch.__enter__()
+
+    def tearDown(self):
+        self.patch.__exit__(None, None, None)
+        self.mock.stop()
+        self.http.close()
+        self.temp_dir.cleanup()
+
+    def unfurl_items(self, items, bulk, quotas=None, lookup_cache=None):
+        unfurl_options = {
+            'remote_lookups': True, 'http': self.http,
+            'lookup_cache': lookup_cache or LookupCache(os.path.join(self.temp_dir.name, f'{bulk}.sqlite'))}
+        batcher = None
+        if bulk:
+            batcher = hash_lookups.HashLookupBatcher(unfurl_options, window=2, quotas=quotas or {})
+            batcher.scanner.api_keys = api_keys
+            unfurl_options = batcher.unfurl_options
+        unfurl_instance = Unfurl(**unfurl_options)
+        unfurl_instance.api_keys = api_keys
+        unfurl_items = functools.partial(batch.unfurl_serially, unfurl_instance, data_type='url', output=lookup_nodes)
+        if batcher is not None:
+            unfurl_items = functools.partial(
+                hash_lookups.prefetch_hash_lookups, unfurl_items=unfurl_items, batcher=batcher)
+        return [result for _, result in unfurl_items(items)], batcher
+
+    def test_bulk_lookups(self):
+        """ Test that each distinct hash is looked up once in bulk, with the same results as looking up each"""
+
+        items = [f'https://example.com/?h={md5}', f'https://example.com/?h={sha256}&n=1',
+                 f'https://example.com/?h={md5}&n=2', f'https://example.com/?h={sha256}&n=3']
+        one_at_a_time, _ = self.unfurl_items(items, bulk=False)
+        requests_one_at_a_time = self.mock.counts['requests']
+
+        bulk, batcher = self.unfurl_items(items, bulk=True)
+        self.assertEqual(one_at_a_time, bulk)
+        self.assertTrue(any(bulk))
+        # MD5s are looked up on VirusTotal and Nitrxgen, SHA-256s just on VirusTotal
+        self.assertEqual(3, self.mock.counts['requests'] - requests_one_at_a_time)
+        self.assertEqual({'hashes': 3, 'looked_up': 3}, dict(batcher.counts))
+
+    def test_quota(self):
+        """ Test that no more lookups are made than a provider's quota allows, in bulk or after"""
+
+        items = [f'https://example.com/?h={md5}', f'https://example.com/?h={sha256}']
+        results, batcher = self.unfurl_items(
+            items, bulk=True, quotas={'virustotal': hash_lookups.Quota(per_day=1)})
+
+        self.assertEqual({'hashes': 3, 'looked_up': 2, 'over_quota': 1}, dict(batcher.counts))
+        self.assertEqual(2, self.mock.counts['requests'])
+        self.assertNotIn('Hash found on VirusTotal', [key for key, _ in results[0]])
+
+        # The day's quota is used up for later runs with the same lookup cache, too
+        _, batcher = self.unfurl_items(
+            [f'https://example.com/?h={sha256[::-1]}'], bulk=True, quotas={'virustotal': hash_lookups.Quota(per_day=1)})
+        self.assertEqual({'hashes': 1, 'over_quota': 1}, dict(batcher.counts))
+        self.assertEqual(2, self.mock.counts['requests'])
+        self.assertEqual(1, batcher.lookup_cache.daily_usage('virustotal'))
+
+    def test_failed_lookup_not_cached(self):
+        """ Test that a VirusTotal lookup that's refused (like for being over quota) isn't saved as not found"""
+
+        self.mock.per_minute = 0
+        _, batcher = self.unfurl_items([f'https://example.com/?h={sha256}'], bulk=True)
+        self.assertEqual({'hashes': 1, 'failed': 1}, dict(batcher.counts))
+        self.assertEqual(0, len(batcher.lookup_cache))
+
+    def test_lookup_cache_reused_after_batch(self):
+        """ Test that a lookup cache used for a batch still makes lookups for later items that aren't batched"""
+
+        lookup_cache = LookupCache(os.path.join(self.temp_dir.name, 'reused.sqlite'))
+        self.unfurl_items([f'https://example.com/?h={sha256}'], bulk=True, lookup_cache=lookup_cache)
+        self.assertEqual(frozenset(), lookup_cache.prefetched)
+
+        requests_in_batch = self.mock.counts['requests']
+        other_sha256 = sha256[::-1]
+        self.unfurl_items([f'https://example.com/?h={other_sha256}'], bulk=False, lookup_cache=lookup_cache)
+        self.assertEqual(1, self.mock.counts['requests'] - requests_in_batch)
+        self.assertNotIn('not_prefetched', lookup_cache.counts)
+
+    def test_rate_limited_lookups_not_cached(self):
+        """ Test that lookups that are rate limited aren't saved, and don't use up the day's quota"""
+
+        self.mock.error_status = 429
+        quotas = {'nitrxgen': hash_lookups.Quota(per_day=5), 'virustotal': hash_lookups.Quota(per_day=5)}
+        results, batcher = self.unfurl_items([f'https://example.com/?h={md5}'], bulk=True, quotas=quotas)
+
+        self.assertEqual({'hashes': 2, 'failed': 2}, dict(batcher.counts))
+        self.assertEqual([], results[0])
+        self.assertEqual(0, len(batcher.lookup_cache))
+        self.assertEqual(0, batcher.lookup_cache.daily_usage('nitrxgen'))
+        self.assertEqual(0, batcher.lookup_cache.daily_usage('virustotal'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+from unfurl import host_limits
+from unfurl import http_client
+from unittest.mock import MagicMock
+import requests
+import socket
+import unittest
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestHostLimits(unittest.TestCase):
+
+    def test_token_bucket(self):
+        """ Test that a token bucket allows a burst, then limits to its rate"""
+
+        clock = FakeClock()
+        bucket = host_limits.TokenBucket(rate=2, burst=3, clock=clock)
+        self.assertEqual([0, 0, 0], [bucket.reserve() for _ in range(3)])
+        self.assertEqual(0.5, bucket.reserve())
+        self.assertEqual(1.0, bucket.reserve())
+
+        clock.now += 10
+        self.assertEqual(0, bucket.reserve())
+
+    def test_circuit_breaker(self):
+        """ Test that a circuit breaker opens after repeated failures, and closes after a successful trial"""
+
+        clock = FakeClock()
+        breaker = host_limits.CircuitBreaker(failure_threshold=2, cooldown=60, clock=clock)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.record_failure())
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.record_failure())
+        self.assertEqual(host_limits.OPEN, breaker.state)
+        self.assertFalse(breaker.allow())
+
+        # After the cooldown, one trial request is let through at a time
+        clock.now += 60
+        self.assertTrue(breaker.allow())
+        self.assertEqual(host_limits.HALF_OPEN, breaker.state)
+        self.assertFalse(breaker.allow())
+
+        # A failed trial opens it again, for another cooldown
+        self.assertTrue(breaker.record_failure())
+        self.assertFalse(breaker.allow())
+        clock.now += 60
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(host_limits.CLOSED, breaker.state)
+        self.assertTrue(breaker.allow())
+        self.assertEqual({'failures': 3, 'opened': 2, 'short_circuited': 3}, dict(breaker.counts))
+
+    def test_dead_host_short_circuited(self):
+        """ Test that requests to a host that can't be reached stop once its circuit breaker opens"""
+
+        # A port nothing is listening on, so connections are refused straight away
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+
+        client = http_client.HttpClient(retries=0, limits=host_limits.HostLimits(failure_threshold=2))
+        client.session.request = MagicMock(wraps=client.session.request)
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                client.get(f'http://127.0.0.1:{port}/')
+        with self.assertRaises(host_limits.HostUnavailableError):
+            client.get(f'http://127.0.0.1:{port}/again')
+
+        self.assertEqual(2, client.session.request.call_count)
+        self.assertEqual(
+            {'127.0.0.1': {'state': 'open', 'failures': 2, 'opened': 1, 'short_circuited': 1}},
+            client.host_limits.stats())
+
+        # Other hosts aren't affected
+        client.session.request = MagicMock()
+        client.get('https://example.com/')
+        client.session.request.assert_called_once()
+        client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unfurl import http_client
+from unfurl.core import Unfurl
+from unittest.mock import MagicMock
+import configparser
+import threading
+import unittest
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = set()
+
+    def do_GET(self):
+        CountingHandler.connections.add(self.client_address)
+        body = b'ok'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHttpClient(unittest.TestCase):
+
+    def test_connections_reused(self):
+        """ Test that requests to the same host reuse one kept-alive connection"""
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), CountingHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        client = http_client.HttpClient()
+        try:
+            for _ in range(3):
+                self.assertEqual('ok', client.get(f'http://127.0.0.1:{server.server_port}/').text)
+        finally:
+            client.close()
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(1, len(CountingHandler.connections))
+
+    def test_settings_from_config(self):
+        """ Test reading the timeout, retries and proxies from unfurl.ini"""
+
+        config = configparser.ConfigParser()
+        config.read_string('[HTTP]\ntimeout = 5\nretries = 0\nhttps_proxy = http://proxy.example:3128\n')
+        client = http_client.HttpClient.from_config(config)
+
+        self.assertEqual(5, client.timeout)
+        self.assertEqual({'https': 'http://proxy.example:3128'}, client.session.proxies)
+        self.assertEqual(0, client.session.get_adapter('https://example.com/').max_retries.status)
+
+        client.session.request = MagicMock()
+        client.get('https://example.com/')
+        self.assertEqual(5, client.session.request.call_args.kwargs['timeout'])
+
+    def test_retries(self):
+        """ Test that only idempotent requests are retried, and connecting is only tried once by default"""
+
+        client = http_client.HttpClient(connect_retries=1)
+        retries = client.session.get_adapter('https://example.com/').max_retries
+        self.assertEqual((1, 0, 2), (retries.connect, retries.read, retries.status))
+        self.assertNotIn('POST', retries.allowed_methods)
+        self.assertEqual(0, client.single_try_session.get_adapter('https://example.com/').max_retries.total)
+
+        client.session.request = MagicMock()
+        client.single_try_session.request = MagicMock()
+        client.get('https://example.com/')
+        client.post('https://example.com/')
+        client.session.request.assert_called_once()
+        client.single_try_session.request.assert_called_once()
+
+        self.assertEqual(0, http_client.HttpClient().session.get_adapter('https://a.example/').max_retries.connect)
+
+    def test_shared_client_settings(self):
+        """ Test that the shared client is made again when it's asked for with different settings"""
+
+        config = configparser.ConfigParser()
+        config.read_string('[HTTP]\ntimeout = 5\n')
+        client = http_client.get_http_client(config)
+        self.assertEqual(5, client.timeout)
+        self.assertIs(client, http_client.get_http_client(config))
+        self.assertIs(client, http_client.get_http_client())
+
+        config['HTTP']['timeout'] = '7'
+        self.assertEqual(7, http_client.get_http_client(config).timeout)
+        http_client._forget_http_client()
+
+    def test_stand_in_client(self):
+        """ Test that parsers make their remote lookups with the instance's HTTP client"""
+
+        stand_in = MagicMock()
+        stand_in.get.return_value.text = 'password'
+        stand_in.get.return_value.status_code = 404
+
+        test = Unfurl(remote_lookups=True, http=stand_in)
+        test.api_keys = {'virustotal': 'fake_key'}
+        test.add_to_queue(data_type='hash.md5', key=None, value='5f4dcc3b5aa765d61d8327deb882cf99')
+        test.parse_queue()
+
+        requested_urls = sorted(call.args[0] for call in stand_in.get.call_args_list)
+        self.assertEqual([
+            'https://www.nitrxgen.net/md5db/5f4dcc3b5aa765d61d8327deb882cf99',
+            'https://www.virustotal.com/api/v3/files/5f4dcc3b5aa765d61d8327deb882cf99'], requested_urls)
+        self.assertIn('password', [node.value for node in test.nodes.values()])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+from unfurl import jsonl
+from unfurl.core import Unfurl
+from unittest import mock
+import io
+import json
+import unittest
+
+record = {
+    'input': 'https://example.com/ü',
+    'nodes': [{'id': 1, 'value': b'\x01', 'big': 2 ** 70, 'parent_id': [1, 2]}]
+}
+
+
+class TestJsonLines(unittest.TestCase):
+
+    def test_dumps(self):
+        """ Test that records are one line of compact JSON, with or without orjson"""
+
+        expected = ('{"input":"https://example.com/ü","nodes":[{"id":1,"value":"b\'\\\\x01\'","big":'
+                    '1180591620717411303424,"parent_id":[1,2]}]}\n').encode('utf-8')
+        self.assertEqual(expected, jsonl.dumps(record))
+        with mock.patch.object(jsonl, 'orjson', None):
+            self.assertEqual(expected, jsonl.dumps(record))
+
+    def test_writer_buffers(self):
+        """ Test that lines are only written once the buffer is full, or when flushed"""
+
+        output = io.BytesIO()
+        with jsonl.JsonLinesWriter(output, buffer_size=200) as writer:
+            writer.write({'input': 'a'})
+            self.assertEqual(b'', output.getvalue())
+            writer.write(record)
+            writer.write(record)
+            self.assertEqual(3, len(output.getvalue().splitlines()))
+            writer.write({'input': 'b'})
+        self.assertEqual(4, len(output.getvalue().splitlines()))
+
+    def test_compact_json(self):
+        """ Test that the compact JSON for a graph can be serialized and has each node's parent"""
+
+        test = Unfurl(remote_lookups=False)
+        test.add_to_queue(data_type='url', key=None, value='https://example.com/?t=1600000000')
+        test.parse_queue()
+
+        nodes = json.loads(jsonl.dumps(test.generate_compact_json()))['nodes']
+        self.assertEqual(len(test.nodes), len(nodes))
+        self.assertEqual({'id': 1, 'data_type': 'url', 'key': None, 'value': 'https://example.com/?t=1600000000',
+                          'label': 'https://example.com/?t=1600000000'}, nodes[0])
+        self.assertEqual(
+            [(node.node_id, node.parent_id) for node in test.nodes.values() if node.parent_id],
+            [(node['id'], node['parent_id']) for node in nodes if 'parent_id' in node])
+
+
+if __name__ == '__main__':
+    unittest.main()
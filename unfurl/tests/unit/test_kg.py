@@ -38,7 +38,7 @@ class TestKnowledgeGraph(unittest.TestCase):
         kg_nodes = [n for n in test.nodes.values() if n.data_type == 'google.knowledge_graph']
         self.assertEqual(len(kg_nodes), 0)
 
-    @patch('unfurl.parsers.parse_kg.requests.get')
+    @patch('unfurl.http_client.HttpClient.get')
     def test_kg_lookup_success(self, mock_get):
         """KG parser should resolve a /g/ ID to a name via the API."""
         mock_response = MagicMock()
@@ -65,7 +65,7 @@ class TestKnowledgeGraph(unittest.TestCase):
         self.assertIn('File system forensic analysis', kg_nodes[0].value)
         self.assertIn('Book by Brian Carrier', kg_nodes[0].value)
 
-    @patch('unfurl.parsers.parse_kg.requests.get')
+    @patch('unfurl.http_client.HttpClient.get')
     def test_kg_lookup_api_error(self, mock_get):
         """KG parser should handle API errors gracefully."""
         mock_get.side_effect = Exception('API error')
@@ -80,7 +80,7 @@ class TestKnowledgeGraph(unittest.TestCase):
         kg_nodes = [n for n in test.nodes.values() if n.data_type == 'google.knowledge_graph']
         self.assertEqual(len(kg_nodes), 0)
 
-    @patch('unfurl.parsers.parse_kg.requests.get')
+    @patch('unfurl.http_client.HttpClient.get')
     def test_kg_lookup_empty_response(self, mock_get):
         """KG parser should handle empty API responses."""
         mock_response = MagicMock()
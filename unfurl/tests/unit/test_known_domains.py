@@ -0,0 +1,109 @@
+from unfurl import known_domains
+from unfurl.core import Unfurl
+import os
+import tempfile
+import unittest
+
+
+class TestKnownDomains(unittest.TestCase):
+
+    def test_shared_between_instances(self):
+        """ Test that all Unfurl instances use the same copy of the known domain lists"""
+
+        first = Unfurl()
+        second = Unfurl()
+        self.assertIs(first.known_domain_lists, second.known_domain_lists)
+        self.assertIs(known_domains.get_known_domains(), known_domains.get_known_domains())
+
+    def test_lists_are_read_only(self):
+        """ Test that the shared known domain lists can't be modified by one instance"""
+
+        test = Unfurl()
+        with self.assertRaises(TypeError):
+            test.known_domain_lists['Some new list'] = None
+
+    def test_renamed_and_removed_lists(self):
+        """ Test the adjustments Unfurl makes to the MISP warning lists"""
+
+        lists = known_domains.get_known_domains().warning_lists
+        self.assertNotIn('OSINT.DigitalSide.IT Warning List', lists)
+        self.assertEqual('List of known Google domains', lists['List of known google domains'].name)
+
+    def test_search_index(self):
+        """ Test lookups through the inverted domain index"""
+
+        known = known_domains.get_known_domains()
+        hits = known.search('google.com')
+
+        # google.com is on the Google list, and the "Top N" lists collapse into a single popularity hit
+        self.assertTrue(any(hit['name'] == 'List of known Google domains' for hit in hits))
+        self.assertEqual(1, len([hit for hit in hits if hit['name'].startswith('Domain is extremely popular')]))
+        self.assertFalse(any(hit['name'].startswith('Top') for hit in hits))
+
+        self.assertEqual([], known.search('not-a-real-domain-for-unfurl.com'))
+
+        # Changing returned hits shouldn't change the shared index
+        hits[0]['name'] = 'changed'
+        self.assertNotEqual('changed', known.search('google.com')[0]['name'])
+
+    def test_refresh(self):
+        """ Test that refreshing replaces the shared copy for existing and new instances"""
+
+        test = Unfurl()
+        original = known_domains.get_known_domains()
+        refreshed = known_domains.refresh_known_domains()
+
+        self.assertIsNot(original, refreshed)
+        self.assertIs(refreshed, known_domains.get_known_domains())
+        self.assertIs(refreshed.warning_lists, test.known_domain_lists)
+
+        # The refreshed lists should still work for lookups
+        hits = test.search_known_domain_lists('google.com')
+        self.assertTrue(any(hit['name'] == 'List of known Google domains' for hit in hits))
+
+
+class TestDomainSnapshot(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.snapshot_path = known_domains.compile_snapshot(os.path.join(cls.temp_dir.name, 'domains.snapshot'))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def test_snapshot_matches_lists(self):
+        """ Test that lookups against a compiled snapshot match lookups against the lists"""
+
+        snapshot = known_domains.open_snapshot(self.snapshot_path)
+        self.assertIsInstance(snapshot, known_domains.SnapshotKnownDomains)
+
+        known = known_domains.get_known_domains()
+        for domain in ('google.com', 'bit.ly', 'dfir.blog', 'github.com', 'not-a-real-domain-for-unfurl.com', ''):
+            self.assertEqual(known.search(domain), snapshot.search(domain))
+            self.assertEqual(known.lists_containing(domain), snapshot.lists_containing(domain))
+
+        self.assertIn('List of known URL Shorteners domains', snapshot.lists_containing('bit.ly'))
+        self.assertEqual(len(known), len(snapshot))
+
+    def test_snapshot_psl(self):
+        """ Test that the Public Suffix List is compiled into the snapshot"""
+
+        snapshot = known_domains.open_snapshot(self.snapshot_path)
+        self.assertIn('co.uk', snapshot.psl_lines())
+
+    def test_invalid_snapshot_ignored(self):
+        """ Test that a file that isn't a valid snapshot is ignored, rather than used"""
+
+        bad_path = os.path.join(self.temp_dir.name, 'bad.snapshot')
+        with open(bad_path, 'wb') as f:
+            f.write(b'not a snapshot at all')
+        with self.assertLogs('unfurl.known_domains', level='WARNING'):
+            self.assertIsNone(known_domains.open_snapshot(bad_path))
+
+        self.assertIsNone(known_domains.open_snapshot(os.path.join(self.temp_dir.name, 'missing.snapshot')))
+
+
+if __name__ == '__main__':
+    unittest.main()
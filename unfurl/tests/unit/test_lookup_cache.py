@@ -0,0 +1,138 @@
+from unfurl.core import Unfurl
+from unfurl.lookup_cache import LookupCache
+from unittest.mock import MagicMock
+import os
+import pickle
+import requests
+import tempfile
+import unittest
+
+md5 = '5f4dcc3b5aa765d61d8327deb882cf99'
+
+
+class TestLookupCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.temp_dir.name, 'lookups.sqlite')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_lookup_reused(self):
+        """ Test that a lookup is only made once, and its result saved for later runs"""
+
+        lookup = MagicMock(return_value='https://example.com/long')
+        lookup_cache = LookupCache(self.cache_path)
+        self.assertEqual('https://example.com/long', lookup_cache.lookup('shortlink', 'https://t.co/a', lookup, 'a'))
+        self.assertEqual('https://example.com/long', lookup_cache.lookup('shortlink', 'https://t.co/a', lookup, 'a'))
+        lookup.assert_called_once_with('a')
+        lookup_cache.close()
+
+        self.assertEqual('https://example.com/long', LookupCache(self.cache_path).get('shortlink', 'https://t.co/a'))
+
+    def test_expiry(self):
+        """ Test that results expire after their provider's TTL, and lookups that found nothing sooner"""
+
+        lookup_cache = LookupCache(self.cache_path, ttls={'shortlink': 60, 'trackers': 0}, negative_ttl=0)
+        lookup_cache.put('shortlink', 'https://t.co/a', 'https://example.com/long')
+        lookup_cache.put('shortlink', 'https://t.co/b', {})
+        lookup_cache.put('trackers', 'magnet:?xt=a', {'udp://tracker': {'seeds': 1}})
+
+        self.assertEqual('https://example.com/long', lookup_cache.get('shortlink', 'https://t.co/a'))
+        self.assertIsNone(lookup_cache.get('shortlink', 'https://t.co/b'))
+        self.assertIsNone(lookup_cache.get('trackers', 'magnet:?xt=a'))
+        self.assertEqual(2, lookup_cache.remove_expired())
+        self.assertEqual(1, len(lookup_cache))
+
+    def test_offline_and_refresh(self):
+        """ Test that offline only uses saved results, and refresh makes every lookup again"""
+
+        LookupCache(self.cache_path).put('nitrxgen', md5, 'password')
+        lookup = MagicMock(return_value='new')
+
+        offline = LookupCache(self.cache_path, offline=True)
+        self.assertEqual('password', offline.lookup('nitrxgen', md5, lookup))
+        self.assertIsNone(offline.lookup('nitrxgen', 'another hash', lookup))
+        lookup.assert_not_called()
+
+        refresh = LookupCache(self.cache_path, refresh=True)
+        self.assertEqual('new', refresh.lookup('nitrxgen', md5, lookup))
+        self.assertEqual('new', offline.get('nitrxgen', md5))
+
+    def test_failed_lookup_not_saved(self):
+        """ Test that a lookup that raises an exception isn't saved"""
+
+        lookup_cache = LookupCache(self.cache_path)
+        with self.assertRaises(ConnectionError):
+            lookup_cache.lookup('nitrxgen', md5, MagicMock(side_effect=ConnectionError))
+        self.assertEqual(0, len(lookup_cache))
+
+    def test_transient_failures_not_saved(self):
+        """ Test that a shortlink lookup that gets a server error or times out isn't saved, but a 404 is"""
+
+        def response(status_code):
+            stand_in_response = requests.models.Response()
+            stand_in_response.status_code = status_code
+            return stand_in_response
+
+        stand_in = MagicMock()
+        lookup_cache = LookupCache(self.cache_path)
+        test = Unfurl(remote_lookups=True, http=stand_in, lookup_cache=lookup_cache)
+        test.api_keys = {}
+
+        for failure in (response(503), response(429), requests.exceptions.Timeout('timed out')):
+            stand_in.get.side_effect = [failure]
+            test.add_to_queue(data_type='url', key=None, value='https://trib.al/abc')
+            test.parse_queue()
+            self.assertEqual(0, len(lookup_cache))
+            test.reset_graph_state()
+        self.assertEqual(3, stand_in.get.call_count)
+
+        stand_in.get.side_effect = [response(404)]
+        test.add_to_queue(data_type='url', key=None, value='https://trib.al/abc')
+        test.parse_queue()
+        self.assertEqual(1, len(lookup_cache))
+
+    def test_nitrxgen_server_error_not_saved(self):
+        """ Test that a Nitrxgen error page isn't taken as the plaintext of a hash, or saved"""
+
+        error_page = requests.models.Response()
+        error_page.status_code = 503
+        error_page._content = b'<html>Service Unavailable</html>'
+        stand_in = MagicMock()
+        stand_in.get.return_value = error_page
+        lookup_cache = LookupCache(self.cache_path)
+        test = Unfurl(remote_lookups=True, http=stand_in, lookup_cache=lookup_cache)
+        test.api_keys = {}
+
+        test.add_to_queue(data_type='hash.md5', key=None, value=md5)
+        test.parse_queue()
+        self.assertNotIn('Plaintext', [node.key for node in test.nodes.values()])
+        self.assertEqual(0, len(lookup_cache))
+
+    def test_unfurl_with_lookup_cache(self):
+        """ Test that Unfurl reuses saved lookups, across graphs and in another process"""
+
+        stand_in = MagicMock()
+        stand_in.get.return_value.text = 'password'
+        stand_in.get.return_value.status_code = 200
+        lookup_cache = LookupCache(self.cache_path)
+        test = Unfurl(remote_lookups=True, http=stand_in, lookup_cache=lookup_cache)
+        test.api_keys = {}
+
+        for _ in range(2):
+            test.add_to_queue(data_type='hash.md5', key=None, value=md5)
+            test.parse_queue()
+            self.assertIn('password', [node.value for node in test.nodes.values()])
+            test.reset_graph_state()
+        stand_in.get.assert_called_once()
+        self.assertEqual({'misses': 1, 'hits': 1}, lookup_cache.counts)
+
+        # Worker processes get a copy, which opens the database again
+        copied_cache = pickle.loads(pickle.dumps(lookup_cache))
+        self.assertEqual('password', copied_cache.get('nitrxgen', md5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+from unfurl.core import Unfurl
+import threading
+import time
+import unittest
+
+
+def slow_upper(value, delay=0.3):
+    time.sleep(delay)
+    return value.upper()
+
+
+def has_node_for(unfurl_instance, value):
+    return any(node.value == value for node in unfurl_instance.nodes.values())
+
+
+class TestLookups(unittest.TestCase):
+
+    def submit(self, test, function, *args):
+        test.submit_lookup(function, *args, callback=lambda result: test.add_to_queue(
+            data_type='text', key='Lookup', value=result, parent_id=1))
+
+    def test_lookup_result_added(self):
+        """ Test that the result of a remote lookup is added to the graph once it's done"""
+
+        test = Unfurl(remote_lookups=False)
+        test.add_to_queue(data_type='url', key=None, value='https://example.com/a?b=c')
+        self.submit(test, slow_upper, 'found')
+        test.parse_queue()
+
+        lookup_nodes = [node for node in test.nodes.values() if node.key == 'Lookup']
+        self.assertEqual(['FOUND'], [node.value for node in lookup_nodes])
+        self.assertEqual(1, test.node_graph.parent_ids[lookup_nodes[0].node_id])
+        self.assertTrue(has_node_for(test, 'example.com'))
+        self.assertFalse(test.lookups.pending)
+
+    def test_lookups_run_at_the_same_time(self):
+        """ Test that slow lookups don't wait on each other"""
+
+        test = Unfurl(remote_lookups=False)
+        test.add_to_queue(data_type='url', key=None, value='https://example.com/')
+        for value in 'abcd':
+            self.submit(test, slow_upper, value)
+
+        start = time.perf_counter()
+        test.parse_queue()
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertCountEqual('ABCD', [node.value for node in test.nodes.values() if node.key == 'Lookup'])
+
+    def test_lookup_wait_is_bounded(self):
+        """ Test that a lookup that takes too long is abandoned"""
+
+        never_done = threading.Event()
+        test = Unfurl(remote_lookups=False, lookup_wait=0.1)
+        test.add_to_queue(data_type='url', key=None, value='https://example.com/')
+        self.submit(test, never_done.wait, 5)
+
+        start = time.perf_counter()
+        with self.assertLogs('unfurl.lookups', level='WARNING'):
+            test.parse_queue()
+        never_done.set()
+
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(1, test.lookups.counts['abandoned'])
+        self.assertFalse([node for node in test.nodes.values() if node.key == 'Lookup'])
+
+    def test_failed_lookup(self):
+        """ Test that a lookup that fails is logged, and the rest of the graph is still unfurled"""
+
+        def fail():
+            raise ConnectionError('no network')
+
+        test = Unfurl(remote_lookups=False)
+        test.add_to_queue(data_type='url', key=None, value='https://example.com/')
+        self.submit(test, fail)
+        with self.assertLogs('unfurl.lookups', level='ERROR'):
+            test.parse_queue()
+
+        self.assertEqual(1, test.lookups.counts['failed'])
+        self.assertTrue(has_node_for(test, 'example.com'))
+
+
+if __name__ == '__main__':
+    unittest.main()
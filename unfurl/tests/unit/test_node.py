@@ -0,0 +1,63 @@
+from unfurl.core import Unfurl
+import unittest
+
+long_hover = ('This is a long hover text that is used for testing how unfurl wraps hover text when it is '
+              'output, rather than when the node is made.')
+
+
+class TestNode(unittest.TestCase):
+
+    def test_slots(self):
+        """ Test that nodes don't have a __dict__, or accept unknown attributes"""
+
+        node = Unfurl.Node(node_id=1, data_type='url', key=None, value='https://example.com')
+        self.assertFalse(hasattr(node, '__dict__'))
+        with self.assertRaises(AttributeError):
+            node.something_else = 1
+
+    def test_label(self):
+        """ Test that labels are made from the key and value if not given"""
+
+        self.assertEqual('q: unfurl', Unfurl.Node(node_id=2, data_type='url.query.pair', key='q', value='unfurl').label)
+        self.assertEqual('unfurl', Unfurl.Node(node_id=2, data_type='string', key=None, value='unfurl').label)
+        self.assertEqual('q:', Unfurl.Node(node_id=2, data_type='url.query.pair', key='q', value='').label)
+        self.assertIsNone(Unfurl.Node(node_id=2, data_type='string', key=None, value=None).label)
+
+        node = Unfurl.Node(node_id=2, data_type='string', key='k', value='v', label='Given label')
+        self.assertEqual('Given label', node.label)
+        node.label = 'Changed'
+        self.assertEqual('Changed', node.to_dict()['label'])
+
+    def test_hover(self):
+        """ Test that hover text from the queue is wrapped, but hover text set on the node isn't"""
+
+        test = Unfurl()
+        node_id = test.create_node(
+            data_type='string', key=None, value='x', label=None, hover=long_hover, wrap_hover=True)
+        node = test.nodes[node_id]
+        self.assertIn('<br>', node.hover)
+        self.assertEqual(long_hover, node.hover.replace('<br>', ' '))
+
+        node.hover = long_hover
+        self.assertEqual(long_hover, node.hover)
+
+    def test_interned(self):
+        """ Test that data types and keys are interned"""
+
+        key = ''.join(['utm_', 'source'])
+        first = Unfurl.Node(node_id=2, data_type='url.query.pair', key=key, value='a')
+        second = Unfurl.Node(node_id=3, data_type='url.query.pair', key=''.join(['utm_', 'source']), value='b')
+        self.assertIs(first.key, second.key)
+
+    def test_to_dict(self):
+        """ Test the fields in a node's dict"""
+
+        node = Unfurl.Node(node_id=2, data_type='url.query.pair', key='q', value='unfurl', parent_id=1)
+        self.assertEqual(
+            ['node_id', 'data_type', 'key', 'value', 'label', 'hover', 'parent_id', 'incoming_edge_config',
+             'extra_options'],
+            list(node.to_dict().keys()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+from unfurl.core import Unfurl
+import unittest
+
+
+class TestPreceding(unittest.TestCase):
+
+    def test_nested_url_context(self):
+        """ Test that nodes get the preceding domain and path of the closest URL they came from"""
+
+        test = Unfurl()
+        test.add_to_queue(
+            data_type='url', key=None,
+            value='https://www.google.com/url?q=https%3A%2F%2Fmastodon.social%2F%40unfurl%2F109876543210987654')
+        test.parse_queue()
+
+        nodes = {(node.data_type, node.key): node for node in test.nodes.values()}
+
+        outer_pair = nodes[('url.query.pair', 'q')]
+        self.assertEqual('www.google.com', outer_pair.preceding_domain)
+        self.assertEqual('/url', outer_pair.preceding_path)
+        self.assertTrue(test.preceding_domain_contains(outer_pair, 'google'))
+
+        inner_segment = nodes[('url.path.segment', 2)]
+        self.assertEqual('mastodon.social', test.find_preceding_domain(inner_segment))
+        self.assertEqual('/@unfurl/109876543210987654', test.find_preceding_path(inner_segment))
+        self.assertTrue(test.preceding_domain_matches(inner_segment, 'mastodon.social'))
+        self.assertTrue(test.preceding_domain_matches_any(inner_segment, {'example.com', 'mastodon.social'}))
+        self.assertFalse(test.preceding_domain_matches_any(inner_segment, {'social.example', 'don.social'}))
+
+    def test_hostname_in_authority(self):
+        """ Test the preceding domain when the hostname is part of a larger authority"""
+
+        test = Unfurl()
+        test.add_to_queue(data_type='url', key=None, value='https://user@sub.example.com:8443/a/b?c=d')
+        test.parse_queue()
+
+        pair = next(node for node in test.nodes.values() if node.data_type == 'url.query.pair')
+        self.assertEqual('sub.example.com', pair.preceding_domain)
+        self.assertTrue(test.preceding_domain_matches_any(pair, ['example.com']))
+
+    def test_no_url(self):
+        """ Test that nodes not from a URL have no preceding domain or path"""
+
+        test = Unfurl()
+        test.add_to_queue(data_type='url', key=None, value='1700000000')
+        test.parse_queue()
+
+        for node in test.nodes.values():
+            self.assertEqual('', node.preceding_domain)
+            self.assertEqual('', node.preceding_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
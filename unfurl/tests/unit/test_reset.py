@@ -0,0 +1,67 @@
+from unfurl import batch
+from unfurl.core import Unfurl
+import gc
+import tracemalloc
+import unittest
+
+google_url = 'https://www.google.com/search?q=unfurl&ved=0ahUKEwiYz8fX7YDnAhUP_J4KHdQyBzMQ4dUDCAs'
+big_url = 'https://example.com/a/b/c?utm_source=x&utm_medium=y&t=1600000000&id=123#fragment'
+
+
+def unfurl_item(test, item):
+    return batch.unfurl_one(test, item, 'url', Unfurl.generate_json)
+
+
+class TestReset(unittest.TestCase):
+
+    def test_reset_clears_queue(self):
+        """ Test that items still queued when parsing stopped at node_limit aren't added to the next graph"""
+
+        test = Unfurl(remote_lookups=False, node_limit=5)
+        test.add_to_queue(data_type='url', key=None, value=big_url)
+        test.parse_queue()
+        self.assertFalse(test.queue.empty())
+
+        test.reset_graph_state()
+        self.assertTrue(test.queue.empty())
+        result = unfurl_item(test, 'https://example.org/')
+        self.assertNotIn('example.com', str(result))
+
+    def test_reset_clears_stash(self):
+        """ Test that the stash (keyed by node ids, which start over) is cleared"""
+
+        test = Unfurl(remote_lookups=False)
+        test.add_to_queue(data_type='url', key=None, value=google_url)
+        test.parse_queue()
+        self.assertIn('proto_context', test.stash)
+
+        test.reset_graph_state()
+        self.assertEqual({}, test.stash)
+
+    def test_memory_flat(self):
+        """ Test that unfurling many items with one instance doesn't keep using more memory"""
+
+        test = Unfurl(remote_lookups=False, node_limit=8)
+        items = [google_url, big_url, 'https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42']
+
+        def unfurl_items(label):
+            for number in range(30):
+                for item in items:
+                    unfurl_item(test, f'{item}&{label}={number}')
+            gc.collect()
+            return tracemalloc.get_traced_memory()[0]
+
+        tracemalloc.start()
+        try:
+            # The first time through fills up any (bounded) caches, like the one in urllib.parse.urlsplit()
+            unfurl_items('warm_up')
+            before = unfurl_items('first')
+            growth = unfurl_items('second') - before
+        finally:
+            tracemalloc.stop()
+
+        self.assertLess(growth, 16 * 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
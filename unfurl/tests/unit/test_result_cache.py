@@ -0,0 +1,117 @@
+from unfurl import batch
+from unfurl import core
+from unfurl.result_cache import ResultCache, parser_fingerprint
+from unittest.mock import patch
+import collections
+import os
+import requests
+import tempfile
+import unittest
+
+url = 'https://example.com/?t=1600000000'
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.temp_dir.name, 'results.sqlite')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_saved_results(self):
+        """ Test that results are saved and found again by value, data_type and options"""
+
+        result_cache = ResultCache(self.cache_path)
+        self.assertTrue(result_cache.put(url, {'nodes': [1]}, 'url', remote_lookups=False))
+        result_cache.close()
+
+        result_cache = ResultCache(self.cache_path)
+        self.assertEqual({'nodes': [1]}, result_cache.get(url, 'url', remote_lookups=False))
+        self.assertIsNone(result_cache.get(url, 'url', remote_lookups=True))
+        self.assertIsNone(result_cache.get(url, 'string', remote_lookups=False))
+
+    def test_fingerprint(self):
+        """ Test that results from a different version of the parsers are removed"""
+
+        self.assertEqual(64, len(parser_fingerprint()))
+        ResultCache(self.cache_path, fingerprint='older').put(url, 'old result')
+
+        result_cache = ResultCache(self.cache_path)
+        self.assertEqual(0, len(result_cache))
+        self.assertIsNone(result_cache.get(url))
+
+    def test_not_json(self):
+        """ Test that results that wouldn't come back the same from JSON aren't saved"""
+
+        result_cache = ResultCache(self.cache_path)
+        self.assertFalse(result_cache.put(url, {1: 'int key'}))
+        self.assertFalse(result_cache.put(url, {'value': b'bytes'}))
+        self.assertEqual(0, len(result_cache))
+
+    def test_expiry(self):
+        """ Test that a result saved with a ttl isn't used after it"""
+
+        result_cache = ResultCache(self.cache_path)
+        result_cache.put(url, 'expired', 'url', ttl=-1, remote_lookups=True)
+        result_cache.put(url, 'current', 'url', ttl=60, remote_lookups=False)
+        self.assertIsNone(result_cache.get(url, 'url', remote_lookups=True))
+        self.assertEqual('current', result_cache.get(url, 'url', remote_lookups=False))
+
+    @patch('unfurl.http_client.HttpClient.get')
+    def test_failed_lookup_not_saved(self, mock_get):
+        """ Test that a result missing a remote lookup (that timed out) isn't saved, but a complete one is"""
+
+        shortlink = 'https://trib.al/abc'
+        result_cache = ResultCache(self.cache_path)
+        mock_get.side_effect = requests.exceptions.Timeout('timed out')
+        core.run(shortlink, remote_lookups=True, result_cache=result_cache)
+        list(core.run_batch([shortlink], remote_lookups=True, result_cache=result_cache))
+        self.assertEqual(0, len(result_cache))
+
+        # The shortlink doesn't redirect; that's an answer, kept no longer than a shortlink lookup would be
+        mock_get.side_effect = None
+        mock_get.return_value = requests.models.Response()
+        mock_get.return_value.status_code = 404
+        result = core.run(shortlink, remote_lookups=True, result_cache=result_cache)
+        self.assertEqual(1, len(result_cache))
+        expires, created = result_cache.connection.execute('SELECT expires, created FROM results').fetchone()
+        self.assertAlmostEqual(30 * 24 * 60 * 60, expires - created, delta=5)
+        batch_results = list(core.run_batch([shortlink], remote_lookups=True, result_cache=result_cache))
+        self.assertEqual([(shortlink, result)], batch_results)
+
+    def test_run(self):
+        """ Test that run() saves its result, and returns the saved result the next time"""
+
+        result_cache = ResultCache(self.cache_path)
+        expected = core.run(url)
+        self.assertEqual(expected, core.run(url, result_cache=result_cache))
+        self.assertEqual(1, len(result_cache))
+
+        # Make the saved result different, to see it's what is returned
+        key_options = {'return_type': 'json', 'remote_lookups': False, 'extra_options': None, 'node_limit': 500,
+                       'max_children_per_node': None}
+        result_cache.put(url, {'saved': True}, 'url', **key_options)
+        self.assertEqual({'saved': True}, core.run(url, result_cache=result_cache))
+        self.assertEqual({'saved': True}, list(core.run_batch([url], result_cache=result_cache))[0][1])
+
+    def test_deduplicate(self):
+        """ Test that a batch uses saved results, and saves new ones"""
+
+        result_cache = ResultCache(self.cache_path).for_options('url', output='upper')
+        result_cache.put('a', 'saved A')
+
+        def unfurl_items(items):
+            for item in items:
+                yield item, item.upper()
+
+        counts = collections.Counter()
+        results = list(batch.deduplicate(['a', 'b', 'a'], unfurl_items, counts=counts, result_cache=result_cache))
+        self.assertEqual([('a', 'saved A'), ('b', 'B'), ('a', 'saved A')], results)
+        self.assertEqual({'cached': 1, 'unfurled': 1, 'duplicates': 1}, counts)
+        self.assertEqual('B', result_cache.get('b'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+from unfurl.core import Unfurl
+from unfurl.scheduler import WorkScheduler
+from urllib.parse import quote
+import json
+import unittest
+
+# A URL with a long JSON blob, queued before the timestamp
+blob = json.dumps({f'k{i}': f'value{i}' for i in range(40)})
+big_url = f'https://example.com/page?data={quote(blob)}&ts=1700000000'
+
+
+def unfurl_big_url(**kwargs):
+    test = Unfurl(**kwargs)
+    test.add_to_queue(data_type='url', key=None, value=big_url)
+    test.parse_queue()
+    return test
+
+
+def timestamps(test):
+    return [node.value for node in test.nodes.values() if node.data_type.startswith('timestamp')]
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_fifo_within_budget(self):
+        """ Test that items come out in the order they were queued when they all fit in the budget"""
+
+        scheduler = WorkScheduler()
+        for value, data_type in enumerate(['string', 'timestamp.epoch-seconds', 'url', 'string']):
+            scheduler.put({'data_type': data_type, 'value': value})
+        self.assertEqual(4, scheduler.qsize())
+        self.assertEqual([0, 1, 2, 3], [scheduler.get(budget_left=10)['value'] for _ in range(4)])
+        self.assertTrue(scheduler.empty())
+
+    def test_priority_over_budget(self):
+        """ Test that items come out by priority (then depth) when there are more than the budget"""
+
+        scheduler = WorkScheduler()
+        scheduler.put({'data_type': 'string', 'value': 'string'})
+        scheduler.put({'data_type': 'url', 'value': 'deep url'}, depth=5)
+        scheduler.put({'data_type': 'url', 'value': 'url'}, depth=1)
+        scheduler.put({'data_type': 'timestamp.webkit', 'value': 'timestamp'}, depth=1)
+        self.assertEqual(
+            ['url', 'timestamp', 'deep url', 'string'], [scheduler.get(budget_left=2)['value'] for _ in range(4)])
+
+    def test_node_limit_keeps_timestamps(self):
+        """ Test that a low node limit still gets the domain and timestamp nodes"""
+
+        test = unfurl_big_url()
+        self.assertEqual(53, test.total_nodes)
+        self.assertEqual(['2023-11-14 22:13:20+00:00'], timestamps(test))
+
+        test = unfurl_big_url(node_limit=30)
+        self.assertEqual(30, test.total_nodes)
+        self.assertEqual(['2023-11-14 22:13:20+00:00'], timestamps(test))
+        self.assertIn('example.com', [node.value for node in test.nodes.values() if node.data_type == 'url.domain'])
+
+    def test_max_children_per_node(self):
+        """ Test that children beyond max_children_per_node are dropped"""
+
+        test = unfurl_big_url(max_children_per_node=5)
+        self.assertEqual(18, test.total_nodes)
+        self.assertEqual(35, test.queue.dropped['max_children_per_node'])
+        self.assertTrue(all(len(test.get_successor_nodes(node)) <= 5 for node in test.nodes.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
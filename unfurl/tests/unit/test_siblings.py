@@ -0,0 +1,45 @@
+from unfurl.core import Unfurl
+import unittest
+
+
+class TestSiblings(unittest.TestCase):
+
+    def test_sibling_lookups(self):
+        """ Test finding sibling nodes by data_type, key, and value"""
+
+        test = Unfurl()
+        test.add_to_queue(data_type='url', key=None, value='https://example.com/in/some-name/detail')
+        test.parse_queue()
+
+        segments = {node.key: node for node in test.nodes.values() if node.data_type == 'url.path.segment'}
+        self.assertTrue(test.check_sibling_nodes(segments[2], data_type='url.path.segment', key=1, value='in'))
+        self.assertFalse(test.check_sibling_nodes(segments[2], data_type='url.path.segment', key=1, value='out'))
+
+        # A node isn't its own sibling
+        self.assertFalse(test.check_sibling_nodes(segments[1], data_type='url.path.segment', key=1))
+
+        # Partial criteria still work, and the first matching sibling (in creation order) is returned
+        self.assertIs(segments[2], test.check_sibling_nodes(segments[1], data_type='url.path.segment', return_node=True))
+        self.assertIs(segments[3], test.check_sibling_nodes(segments[1], value='detail', return_node=True))
+
+        root = test.nodes[1]
+        self.assertFalse(test.check_sibling_nodes(root, data_type='url'))
+
+    def test_sibling_index_follows_data_type_changes(self):
+        """ Test that the sibling index is updated when a parser changes a node's data_type"""
+
+        test = Unfurl()
+        test.add_to_queue(
+            data_type='url', key=None,
+            value='https://example.com/?j=%7B%22a%22%3A%20%22https%3A%2F%2Fexample.org%2Fpath%22%2C%20%22b%22%3A%20%22text%22%7D')
+        test.parse_queue()
+
+        # parse_url turned the JSON value "https://example.org/path" from 'json' into a 'url'
+        sibling_b = next(node for node in test.nodes.values() if node.key == 'b')
+        url_node = test.check_sibling_nodes(sibling_b, data_type='url', key='a', return_node=True)
+        self.assertEqual('https://example.org/path', url_node.value)
+        self.assertFalse(test.check_sibling_nodes(sibling_b, data_type='json', key='a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+from unfurl.core import Unfurl
+from unfurl.parsers import parse_protobuf
+from unittest import mock
+import unittest
+
+urls = [
+    'https://www.google.com/search?q=unfurl&ved=0ahUKEwiYz8fX7YDnAhUP_J4KHdQyBzMQ4dUDCAs',
+    'https://discordapp.com/channels/427876741990711298/551531058039095296',
+    'https://www.google.com/search?q=other&ved=0ahUKEwiYz8fX7YDnAhUP_J4KHdQyBzMQ4dUDCAs',
+]
+
+
+def unfurl_urls(test):
+    return [result for _, result in test.run_many(urls, return_type='text')]
+
+
+class TestSubtreeCache(unittest.TestCase):
+
+    def test_same_results(self):
+        """ Test that the results are the same with the subtree cache, the first time and after"""
+
+        expected = unfurl_urls(Unfurl(remote_lookups=False))
+        test = Unfurl(remote_lookups=False, subtree_cache_size=1000)
+        self.assertEqual(expected, unfurl_urls(test))
+        self.assertEqual(expected, unfurl_urls(test))
+        self.assertGreater(test.subtree_cache_counts['hits'], test.subtree_cache_counts['misses'])
+
+    def test_decoded_once(self):
+        """ Test that a protobuf that's in many URLs is only decoded once"""
+
+        test = Unfurl(remote_lookups=False, subtree_cache_size=1000)
+        with mock.patch.object(
+                parse_protobuf.blackboxprotobuf, 'decode_message',
+                wraps=parse_protobuf.blackboxprotobuf.decode_message) as decode_message:
+            unfurl_urls(test)
+            decode_calls = decode_message.call_count
+            unfurl_urls(test)
+        self.assertGreater(decode_calls, 0)
+        self.assertEqual(decode_calls, decode_message.call_count)
+
+    def test_context_read_not_cached(self):
+        """ Test that what parsers did isn't reused if they looked at other nodes (like siblings)"""
+
+        test = Unfurl(remote_lookups=False, subtree_cache_size=1000)
+        test.add_to_queue(data_type='url', key=None, value=urls[1])
+        test.parse_queue()
+
+        # The Discord parser checks the sibling path segments to know what kind of ID this is
+        channel_id = [node for node in test.nodes.values() if node.value == '551531058039095296'][0]
+        self.assertIsNone(test.subtree_cache.get(test.subtree_cache_key(channel_id)))
+        self.assertGreater(test.subtree_cache_counts['uncacheable'], 0)
+
+    def test_cache_size(self):
+        """ Test that only the last subtree_cache_size distinct nodes are kept"""
+
+        test = Unfurl(remote_lookups=False, subtree_cache_size=5)
+        unfurl_urls(test)
+        self.assertEqual(5, len(test.subtree_cache))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+from unfurl.core import Unfurl
+import unittest
+
+
+class TestValueShape(unittest.TestCase):
+
+    def test_shape_checks(self):
+        """ Test the value shape checks used by the sniffing parsers"""
+
+        node = Unfurl.Node(node_id=2, data_type='url.query.pair', key='id', value='1700000000')
+        self.assertTrue(node.shape.is_digits)
+        self.assertTrue(node.shape.is_long_int)
+        self.assertTrue(node.shape.is_hex)
+        self.assertFalse(node.shape.is_letters)
+
+        node = Unfurl.Node(node_id=2, data_type='url.query.pair', key='q', value='dW5mdXJs')
+        self.assertTrue(node.shape.is_urlsafe_b64)
+        self.assertTrue(node.shape.is_standard_b64)
+        self.assertEqual(0, node.shape.length_mod_4)
+        self.assertEqual(b'unfurl', node.shape.b64_decoded)
+
+        node = Unfurl.Node(node_id=2, data_type='url.query.pair', key='q', value='dW5mdXJsIQ')
+        self.assertEqual('dW5mdXJsIQ==', node.shape.b64_padded)
+        self.assertEqual(b'unfurl!', node.shape.b64_decoded)
+
+    def test_non_string_values(self):
+        """ Test that non-string values are checked as strings"""
+
+        node = Unfurl.Node(node_id=2, data_type='integer', key=None, value=1700000000)
+        self.assertFalse(node.shape.is_str)
+        self.assertEqual('1700000000', node.shape.text)
+        self.assertTrue(node.shape.is_digits)
+
+    def test_shape_cached(self):
+        """ Test that a node's shape is only worked out once, unless the value changes"""
+
+        node = Unfurl.Node(node_id=2, data_type='string', key=None, value='abcdef12')
+        self.assertIs(node.shape, node.shape)
+
+        node.value = 'something else'
+        self.assertFalse(node.shape.is_hex)
+        self.assertNotIn('_shape', node.to_dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
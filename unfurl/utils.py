@@ -14,11 +14,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import base64
 import ipaddress
 import re
 import textwrap
 import zlib
 from datetime import datetime
+import sys
+from functools import cached_property, lru_cache
 from typing import Union
 
 long_int_re = re.compile(r'\d{8,}')
@@ -35,6 +38,104 @@ cisco_7_re = re.compile(r'\d{2}[A-F0-9]{4,}', re.IGNORECASE)
 octal_ip_re = re.compile(r'(0[0-7]{3})\.(0[0-7]{3})\.(0[0-7]{3})\.(0[0-7]{3})')
 
 
+def add_b64_padding(encoded_string: str) -> Union[str, bool]:
+    encoded_string = encoded_string.rstrip('=')
+    remainder = len(encoded_string) % 4
+    if remainder == 1:
+        return False
+    elif remainder == 2:
+        return f'{encoded_string}=='
+    elif remainder == 3:
+        return f'{encoded_string}='
+    else:
+        return encoded_string
+
+
+class ValueShape:
+    """
+    What a node's value "looks like" (all digits, hex, base64, etc.), for parsers that sniff values.
+
+    Many parsers check the same node value against the same regexes; a ValueShape is created once per node
+    (see Unfurl.Node.shape) and each check is only done the first time a parser asks for it. Checks are made
+    against the value as a string (text), so parsers should still check is_str if they need an actual string.
+    """
+
+    def __init__(self, value):
+        self.value = value
+        self.is_str = isinstance(value, str)
+
+    @cached_property
+    def text(self) -> str:
+        return self.value if self.is_str else str(self.value)
+
+    @cached_property
+    def length_mod_4(self) -> int:
+        return len(self.text) % 4
+
+    @cached_property
+    def is_digits(self) -> bool:
+        return bool(digits_re.fullmatch(self.text))
+
+    @cached_property
+    def is_long_int(self) -> bool:
+        return self.is_digits and len(self.text) >= 8
+
+    @cached_property
+    def is_float(self) -> bool:
+        return bool(float_re.fullmatch(self.text))
+
+    @cached_property
+    def is_hex(self) -> bool:
+        return bool(hex_re.fullmatch(self.text))
+
+    @cached_property
+    def is_letters(self) -> bool:
+        return bool(letters_re.fullmatch(self.text))
+
+    @cached_property
+    def has_digits(self) -> bool:
+        return bool(digits_re.search(self.text))
+
+    @cached_property
+    def has_letters(self) -> bool:
+        return bool(letters_re.search(self.text))
+
+    @cached_property
+    def is_digits_and_slash(self) -> bool:
+        return bool(digits_and_slash_re.fullmatch(self.text))
+
+    @cached_property
+    def is_letters_and_slash(self) -> bool:
+        return bool(letters_and_slash_re.fullmatch(self.text))
+
+    @cached_property
+    def is_urlsafe_b64(self) -> bool:
+        return bool(urlsafe_b64_re.fullmatch(self.text))
+
+    @cached_property
+    def is_standard_b64(self) -> bool:
+        return bool(standard_b64_re.fullmatch(self.text))
+
+    @cached_property
+    def b64_padded(self) -> Union[str, bool]:
+        """The value with its base64 padding fixed, or False if it's the wrong length to be base64."""
+        return add_b64_padding(self.text)
+
+    @cached_property
+    def b64_decoded(self) -> Union[bytes, None]:
+        """The value decoded as URL-safe base64 (or if that doesn't match, standard base64), or None."""
+        if not self.b64_padded:
+            return None
+        try:
+            if self.is_urlsafe_b64:
+                return base64.urlsafe_b64decode(self.b64_padded)
+            elif self.is_standard_b64:
+                return base64.b64decode(self.b64_padded)
+        except ValueError:
+            return None
+        return None
+
+
 def parse_ip_address(potential_ip):
     if re.fullmatch(digits_re, potential_ip):
         potential_ip = int(potential_ip)
@@ -51,6 +152,13 @@ def parse_ip_address(potential_ip):
     return parsed_ip
 
 
+def intern_if_str(value):
+    """Intern value if it's a string (so repeated copies of it share memory); return anything else as-is."""
+    if type(value) is str:
+        return sys.intern(value)
+    return value
+
+
 def wrap_hover_text(hover_text: Union[str, None]) -> Union[str, None]:
     if not hover_text:
         return None
@@ -58,6 +166,12 @@ def wrap_hover_text(hover_text: Union[str, None]) -> Union[str, None]:
     if not isinstance(hover_text, str):
         return None
 
+    return _wrap_hover_string(hover_text)
+
+
+# Most hover text is one of a few long strings used over and over, so remember how each was wrapped
+@lru_cache(maxsize=4096)
+def _wrap_hover_string(hover_text: str) -> str:
     # If there are any manually-inserted <br> or links, leave it
     # alone. This isn't perfect detection, but it'll do.
     if '<a' in hover_text or '<br' in hover_text: